@@ -17,6 +17,7 @@ import { logger } from '../../utils/logger.js';
 import { createOfferSchema, declineOfferSchema, listOffersQuerySchema, uuidParamSchema, validateBody, validateParams, validateQuery } from '../schemas.js';
 import { recommendations } from '../../integrations/recommendations-client.js';
 import { comparablePricingService } from '../../services/comparable-pricing.js';
+import { agent2 } from '../../integrations/agent2-client.js';
 
 export async function offerRoutes(fastify: FastifyInstance) {
 
@@ -212,6 +213,7 @@ export async function offerRoutes(fastify: FastifyInstance) {
     // Check expiry
     if (offer.expires_at && new Date(offer.expires_at) < new Date()) {
       await db.update('offers', { id }, { status: 'expired' });
+      await agent2.releaseSpending(id);
       return reply.status(410).send({ error: 'This offer has expired, partner.' });
     }
 
@@ -222,6 +224,9 @@ export async function offerRoutes(fastify: FastifyInstance) {
       accepted_at: new Date().toISOString(),
     });
 
+    // Accepted offers are real spend: keep them against today's limit
+    await agent2.confirmSpending(id);
+
     // Invalidate cache
     await cache.del(cache.keys.offer(id));
 
@@ -329,6 +334,7 @@ export async function offerRoutes(fastify: FastifyInstance) {
 
     await db.update('offers', { id }, { status: 'declined' });
     await cache.del(cache.keys.offer(id));
+    await agent2.releaseSpending(id);
 
     await db.create('audit_log', {
       entity_type: 'offer',
@@ -21,6 +21,7 @@ import { integrationRoutes } from './api/routes/integrations.js';
 import { profitRoutes } from './api/routes/profits.js';
 import { loyaltyRoutes } from './api/routes/loyalty.js';
 import { logger } from './utils/logger.js';
+import { agent2 } from './integrations/agent2-client.js';
 
 const fastify = Fastify({
   logger: true,
@@ -155,6 +156,10 @@ async function start() {
         );
         if (result.rowCount && result.rowCount > 0) {
           logger.info({ count: result.rowCount }, 'Expired stale offers');
+          // Give their reserved amounts back to the daily spending limit
+          for (const row of result.rows) {
+            await agent2.releaseSpending(row.id);
+          }
         }
       } catch (err) {
         logger.error({ err }, 'Offer expiry check failed');
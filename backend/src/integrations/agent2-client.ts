@@ -7,6 +7,8 @@ import { logger } from '../utils/logger.js';
 
 const BASE_URL = config.agents.agent2Url;
 const TIMEOUT_MS = 30_000;
+// Budget advertised to Agent 2 so it stops work (and returns partial data) before we abort
+const DEADLINE_HEADER = 'X-Request-Timeout-Ms';
 
 export interface VisionResult {
   category: string;
@@ -39,9 +41,12 @@ export interface VisionResult {
     location?: string;
     imei?: string;
   };
+  // Canonical product id (keys the quote cache)
+  productId?: string;
 }
 
 export interface MarketplaceResult {
+  product_id?: string;
   listings: Array<{ source: string; price: number; title: string; sold_date?: string }>;
   stats: {
     count: number;
@@ -54,6 +59,8 @@ export interface MarketplaceResult {
   };
   sources_checked: string[];
   cache_hit: boolean;
+  data_freshness?: 'live' | 'partial' | 'stale';
+  deadline_exceeded?: boolean;
 }
 
 export interface ComparableSale {
@@ -87,6 +94,9 @@ export interface PricingResult {
     category_coverage: string;
     explanation: string;
   };
+  cache_hit?: boolean;
+  cached_at?: string;
+  data_freshness?: string;
 }
 
 async function agent2Fetch<T>(path: string, body: Record<string, unknown>): Promise<T> {
@@ -99,14 +109,19 @@ async function agent2Fetch<T>(path: string, body: Record<string, unknown>): Prom
 
     const res = await fetch(url, {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: {
+        'Content-Type': 'application/json',
+        [DEADLINE_HEADER]: String(TIMEOUT_MS),
+      },
       body: JSON.stringify(body),
       signal: controller.signal,
     });
 
     if (!res.ok) {
       const text = await res.text();
-      throw new Error(`Agent 2 responded ${res.status}: ${text}`);
+      const error: any = new Error(`Agent 2 responded ${res.status}: ${text}`);
+      error.status = res.status;
+      throw error;
     }
 
     const data = (await res.json()) as T;
@@ -144,19 +159,65 @@ export const agent2 = {
     });
   },
 
-  /** Calculate FMV and generate offer amount */
+  /**
+   * Calculate FMV and generate offer amount.
+   * product_id caches the FMV for repeat quotes; offer_id reserves the offer
+   * against Agent 2's daily spending limit (409 when it's reached).
+   */
   async price(
     marketplaceStats: MarketplaceResult['stats'],
     category: string,
     condition: string,
+    productId?: string,
+    offerId?: string,
   ): Promise<PricingResult> {
     return agent2Fetch<PricingResult>('/api/v1/price', {
       marketplace_stats: marketplaceStats,
       category,
       condition,
+      product_id: productId,
+      offer_id: offerId,
     });
   },
 
+  /** Price a repeat quote from the FMV cache, without marketplace research; null on a miss */
+  async cachedQuote(
+    productId: string,
+    category: string,
+    condition: string,
+    offerId?: string,
+  ): Promise<PricingResult | null> {
+    try {
+      return await agent2Fetch<PricingResult>('/api/v1/price', {
+        product_id: productId,
+        category,
+        condition,
+        offer_id: offerId,
+      });
+    } catch (err: any) {
+      if (err.status === 404) return null;
+      throw err;
+    }
+  },
+
+  /** Return a declined or expired offer's amount to the daily spending limit (best effort) */
+  async releaseSpending(offerId: string): Promise<void> {
+    try {
+      await agent2Fetch(`/api/v1/pricing/spending/${offerId}/release`, {});
+    } catch (err: any) {
+      logger.warn({ offerId, error: err.message }, 'Spending release failed; reservation expires with the offer');
+    }
+  },
+
+  /** Keep an accepted offer's amount against today's spending limit (best effort) */
+  async confirmSpending(offerId: string): Promise<void> {
+    try {
+      await agent2Fetch(`/api/v1/pricing/spending/${offerId}/confirm`, {});
+    } catch (err: any) {
+      logger.warn({ offerId, error: err.message }, 'Spending confirm failed');
+    }
+  },
+
   /** Optimize prices for stale listings (batch analysis) */
   async optimizePrices(
     offers: Array<{
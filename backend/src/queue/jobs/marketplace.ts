@@ -1,6 +1,8 @@
 /**
  * Marketplace Job Handler — calls Agent 2 to research prices.
  * On success, chains to pricing via the orchestrator.
+ * Repeat quotes for a known product are priced from Agent 2's quote cache
+ * first, skipping marketplace research and the pricing job.
  */
 import { Job } from 'bullmq';
 import { agent2 } from '../../integrations/agent2-client.js';
@@ -13,13 +15,23 @@ interface MarketplaceJobData {
   model: string;
   category: string;
   condition: string;
+  productId?: string;
 }
 
 export async function processMarketplaceJob(job: Job<MarketplaceJobData>): Promise<void> {
-  const { offerId, brand, model, category, condition } = job.data;
+  const { offerId, brand, model, category, condition, productId } = job.data;
   logger.info({ offerId, jobId: job.id, brand, model }, 'Marketplace job started');
 
   try {
+    if (productId) {
+      const cached = await agent2.cachedQuote(productId, category, condition, offerId);
+      if (cached) {
+        logger.info({ offerId, productId, cachedAt: cached.cached_at }, 'Priced from quote cache');
+        await offerOrchestrator.onCachedQuote(offerId, cached);
+        return;
+      }
+    }
+
     const result = await agent2.research(brand, model, category, condition);
 
     logger.info({
@@ -31,6 +43,12 @@ export async function processMarketplaceJob(job: Job<MarketplaceJobData>): Promi
 
     await offerOrchestrator.onMarketplaceComplete(offerId, result);
   } catch (err: any) {
+    if (err.status === 409) {
+      // Cached quote hit Agent 2's daily spending limit; retrying won't help
+      await offerOrchestrator.escalate(offerId, 'daily_limit', 'Daily spending limit reached');
+      return;
+    }
+
     logger.error({ offerId, error: err.message }, 'Marketplace job failed');
 
     if (job.attemptsMade >= (job.opts.attempts || 1) - 1) {
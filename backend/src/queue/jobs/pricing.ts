@@ -20,14 +20,15 @@ interface PricingJobData {
   };
   category: string;
   condition: string;
+  productId?: string;
 }
 
 export async function processPricingJob(job: Job<PricingJobData>): Promise<void> {
-  const { offerId, marketplaceStats, category, condition } = job.data;
+  const { offerId, marketplaceStats, category, condition, productId } = job.data;
   logger.info({ offerId, jobId: job.id, category, condition }, 'Pricing job started');
 
   try {
-    const result = await agent2.price(marketplaceStats, category, condition);
+    const result = await agent2.price(marketplaceStats, category, condition, productId, offerId);
 
     logger.info({
       offerId,
@@ -38,6 +39,12 @@ export async function processPricingJob(job: Job<PricingJobData>): Promise<void>
 
     await offerOrchestrator.onPricingComplete(offerId, result);
   } catch (err: any) {
+    if (err.status === 409) {
+      // Agent 2's daily spending limit is reached; retrying won't help
+      await offerOrchestrator.escalate(offerId, 'daily_limit', 'Daily spending limit reached');
+      return;
+    }
+
     logger.error({ offerId, error: err.message }, 'Pricing job failed');
 
     if (job.attemptsMade >= (job.opts.attempts || 1) - 1) {
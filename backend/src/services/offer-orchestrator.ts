@@ -14,6 +14,7 @@ import { config } from '../config.js';
 import { fraudClient } from '../integrations/fraud-client.js';
 import { profitCalculator } from './profit-calculator.js';
 import { pricingExplainer } from './pricing-explainer.js';
+import type { PricingResult } from '../integrations/agent2-client.js';
 
 export type OfferStage = 'uploaded' | 'vision' | 'marketplace' | 'pricing' | 'fraud-check' | 'jake-voice' | 'ready' | 'escalated' | 'failed';
 
@@ -126,6 +127,7 @@ export const offerOrchestrator = {
       location?: string;
       imei?: string;
     };
+    productId?: string;
   }): Promise<void> {
     // Update offer with vision data
     await db.update('offers', { id: offerId }, {
@@ -162,6 +164,7 @@ export const offerOrchestrator = {
       model: visionResult.model,
       category: visionResult.category,
       condition: visionResult.condition,
+      productId: visionResult.productId,
     }, {
       jobId: `marketplace-${offerId}`,
       attempts: 2,
@@ -175,6 +178,7 @@ export const offerOrchestrator = {
    * Called when marketplace research completes — store results, chain to pricing.
    */
   async onMarketplaceComplete(offerId: string, marketResult: {
+    product_id?: string;
     stats: { count: number; median: number; mean: number; std_dev: number };
     sources_checked: string[];
     cache_hit: boolean;
@@ -202,6 +206,7 @@ export const offerOrchestrator = {
       marketplaceStats: marketResult.stats,
       category: offer.item_category,
       condition: offer.item_condition,
+      productId: marketResult.product_id,
     }, {
       jobId: `pricing-${offerId}`,
       attempts: 2,
@@ -211,6 +216,19 @@ export const offerOrchestrator = {
     await this.setStage(offerId, 'pricing');
   },
 
+  /**
+   * Called when a repeat quote was priced from Agent 2's quote cache —
+   * no marketplace research ran, so go straight to pricing completion.
+   */
+  async onCachedQuote(offerId: string, pricingResult: PricingResult): Promise<void> {
+    await db.update('offers', { id: offerId }, {
+      market_data: JSON.stringify({ cache_hit: true, quote_cached_at: pricingResult.cached_at || null }),
+    });
+
+    await this.setStage(offerId, 'pricing');
+    await this.onPricingComplete(offerId, pricingResult);
+  },
+
   /**
    * Called when pricing completes — store results, chain to jake voice.
    */
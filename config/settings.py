@@ -35,16 +35,39 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
     api_version: str = "v1"
     enable_cors: bool = True
+    response_compression_min_bytes: int = 1024  # Smaller responses are sent uncompressed
 
     # Pricing Config
     min_offer_amount: float = 5.0
     max_electronics_offer: float = 2000.0
     daily_spending_limit: float = 10000.0
+    spending_reservation_ttl: int = 86400  # Offer lifetime (backend OFFER_EXPIRY_HOURS); unconfirmed reservations expire after it
+    fmv_fusion_method: str = "configured"  # Source weights: "configured" or "inverse_variance"
+    pricing_rules_path: Optional[str] = None  # Defaults to config/pricing_rules.json
+    pricing_rules_poll_seconds: float = 10.0  # Hot-reload check (file mtime and Redis)
 
     # Cache TTL (seconds)
     cache_ttl_popular: int = 14400  # 4 hours
     cache_ttl_mid_freq: int = 86400  # 24 hours
     cache_ttl_rare: int = 0  # No cache
+    quote_cache_ttl: int = 3600  # FMV results reused for repeat quotes (0 disables)
+
+    # Product catalog
+    catalog_snapshot_path: Optional[str] = None  # JSON snapshot loaded at startup
+
+    # Marketplace sampling
+    adaptive_sampling_enabled: bool = False  # Small first batch, expand if unstable
+    condition_stratified_stats: bool = False  # One fetch, per-condition stats cached together
+
+    # Research cache pre-warming (refreshes condition-stats entries before TTL)
+    prewarm_enabled: bool = False
+    prewarm_top_n: int = 200  # Hot products kept warm around the clock
+    prewarm_rate_share: float = 0.2  # Share of the eBay rate budget per worker
+    prewarm_off_peak_start_hour: int = 2  # UTC; long-tail products warmed in this window
+    prewarm_off_peak_end_hour: int = 6
+
+    # Request deadlines (seconds)
+    research_deadline_seconds: float = 25.0  # Backend gives up at 30s
 
     class Config:
         env_file = ".env"
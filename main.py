@@ -2,9 +2,18 @@
 JakeBuysIt - Agent 2: AI Vision & Pricing Engine
 Main FastAPI application entry point.
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from config.settings import settings
+from services.marketplace.catalog import product_catalog
+from services.marketplace.suggest import suggestion_index
+from services.marketplace.prewarm import research_prewarmer
+from services.pricing.inventory import inventory_index
+from services.pricing.rules import pricing_rules
+from services.monitoring.metrics import metrics
+from services.middleware.compression import CompressionMiddleware
+import asyncio
+import os
 import structlog
 
 # Configure structured logging
@@ -28,6 +37,12 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Brotli/gzip for large (listing-heavy) responses
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.response_compression_min_bytes
+)
+
 # CORS Configuration
 if settings.enable_cors:
     app.add_middleware(
@@ -45,6 +60,27 @@ async def startup_event():
     logger.info("starting_pricing_engine", env=settings.app_env)
     # TODO: Initialize database connections, Redis, etc.
 
+    # Restore the product catalog from the last snapshot
+    if settings.catalog_snapshot_path and os.path.exists(settings.catalog_snapshot_path):
+        try:
+            with open(settings.catalog_snapshot_path) as f:
+                product_catalog.load_snapshot(f.read())
+        except Exception as e:
+            logger.error("catalog_snapshot_load_failed", error=str(e))
+
+    # Keep the autocomplete index current without blocking requests
+    asyncio.create_task(suggestion_index.run_background_rebuilds())
+
+    # Share inventory counts (offer saturation) across workers
+    asyncio.create_task(inventory_index.run_background_sync())
+
+    # Pick up pricing rule changes (file or Redis) without a restart
+    asyncio.create_task(pricing_rules.run_background_reload())
+
+    # Refresh research for popular products before their cache expires
+    if settings.prewarm_enabled:
+        asyncio.create_task(research_prewarmer.run())
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -52,6 +88,14 @@ async def shutdown_event():
     logger.info("shutting_down_pricing_engine")
     # TODO: Close database connections, Redis, etc.
 
+    # Persist the product catalog for the next start
+    if settings.catalog_snapshot_path:
+        try:
+            with open(settings.catalog_snapshot_path, "w") as f:
+                f.write(product_catalog.snapshot())
+        except Exception as e:
+            logger.error("catalog_snapshot_save_failed", error=str(e))
+
 
 @app.get("/")
 async def root():
@@ -76,6 +120,13 @@ async def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (merged across workers in multiprocess mode)."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 # Import routers
 from services.vision.router import router as vision_router
 from services.marketplace.router import router as marketplace_router
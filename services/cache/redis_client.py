@@ -3,9 +3,11 @@ Redis client wrapper for caching marketplace data.
 """
 import redis
 import json
+import time
 import structlog
 from typing import Optional, Any
 from config.settings import settings
+from services.monitoring.metrics import metrics
 
 logger = structlog.get_logger()
 
@@ -22,14 +24,19 @@ class RedisCache:
 
     async def get(self, key: str) -> Optional[dict]:
         """Get cached value."""
+        start = time.perf_counter()
         try:
             value = self.client.get(key)
             if value:
                 logger.debug("cache_hit", key=key)
-                return json.loads(value)
+                result = json.loads(value)
+                metrics.observe_cache("redis", "get", "hit", time.perf_counter() - start)
+                return result
             logger.debug("cache_miss", key=key)
+            metrics.observe_cache("redis", "get", "miss", time.perf_counter() - start)
             return None
         except Exception as e:
+            metrics.observe_cache("redis", "get", "error", time.perf_counter() - start)
             logger.error("cache_get_error", key=key, error=str(e))
             return None
 
@@ -40,15 +47,18 @@ class RedisCache:
         ttl: Optional[int] = None
     ) -> bool:
         """Set cached value with optional TTL (seconds)."""
+        start = time.perf_counter()
         try:
             serialized = json.dumps(value)
             if ttl:
                 self.client.setex(key, ttl, serialized)
             else:
                 self.client.set(key, serialized)
+            metrics.observe_cache("redis", "set", "ok", time.perf_counter() - start)
             logger.debug("cache_set", key=key, ttl=ttl)
             return True
         except Exception as e:
+            metrics.observe_cache("redis", "set", "error", time.perf_counter() - start)
             logger.error("cache_set_error", key=key, error=str(e))
             return False
 
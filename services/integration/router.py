@@ -2,15 +2,23 @@
 Integration router for Agent 4 Backend.
 Provides endpoints matching the contract defined in agent2-client.ts
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Query
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 import structlog
 
 from vision.identify import vision_identifier
 from marketplace.aggregator import marketplace_aggregator
+from marketplace.deadline import Deadline
+from marketplace.catalog import product_catalog
+from marketplace.prewarm import research_prewarmer
+from marketplace.projection import FieldProjection
 from pricing.fmv import fmv_engine
 from pricing.offer import offer_engine
+from pricing.quote_cache import quote_cache
+from pricing.inventory import inventory_index
+from pricing.trends import price_trends
 
 logger = structlog.get_logger()
 router = APIRouter()
@@ -56,6 +64,7 @@ class VisionResult(BaseModel):
     seoTitle: Optional[str] = None
     productMetadata: Optional[ProductMetadata] = None
     serialInfo: Optional[SerialInfo] = None
+    productId: Optional[str] = None
 
 
 class ResearchRequest(BaseModel):
@@ -63,6 +72,12 @@ class ResearchRequest(BaseModel):
     model: str
     category: str
     condition: Optional[str] = None
+    adaptive: Optional[bool] = None
+    upc: Optional[str] = None
+    model_number: Optional[str] = None
+    stratify_conditions: Optional[bool] = None
+    identifiers: Optional[Dict[str, Optional[str]]] = None
+    productMetadata: Optional[ProductMetadata] = None
 
 
 class MarketplaceStats(BaseModel):
@@ -76,16 +91,22 @@ class MarketplaceStats(BaseModel):
 
 
 class MarketplaceResult(BaseModel):
+    product_id: Optional[str] = None
     listings: List[Dict]
     stats: MarketplaceStats
     sources_checked: List[str]
     cache_hit: bool
+    data_freshness: Optional[str] = None
+    deadline_exceeded: bool = False
+    condition_stats: Optional[Dict[str, MarketplaceStats]] = None
 
 
 class PriceRequest(BaseModel):
-    marketplace_stats: Dict
+    marketplace_stats: Optional[Dict] = None  # Omit to price from the quote cache only
     category: str
     condition: str
+    product_id: Optional[str] = None  # Canonical id from /identify or /research
+    offer_id: Optional[str] = None  # Set when issuing; reserves against the daily limit
 
 
 class ComparableSale(BaseModel):
@@ -109,6 +130,10 @@ class PricingResult(BaseModel):
     pricing_confidence: Optional[int] = None
     comparable_sales: List[ComparableSale] = []
     confidence_factors: Optional[Dict] = None
+    cache_hit: bool = False
+    data_freshness: Optional[str] = None
+    cached_at: Optional[str] = None
+    spending: Optional[Dict] = None
 
 
 @router.post("/identify", response_model=VisionResult)
@@ -151,6 +176,17 @@ async def identify_item(request: IdentifyRequest):
                 imei=result.serial_info.imei
             )
 
+        # Feed the product catalog so later research resolves to this product
+        product_id = product_catalog.register(
+            brand=result.brand,
+            model=result.model,
+            category=result.category,
+            upc=result.identifiers.upc,
+            model_number=result.identifiers.model_number,
+            storage=result.product_metadata.storage if result.product_metadata else None,
+            aliases=[result.seo_title] if result.seo_title else []
+        )
+
         return VisionResult(
             category=result.category,
             subcategory=result.subcategory,
@@ -168,7 +204,8 @@ async def identify_item(request: IdentifyRequest):
             conditionNotes=result.condition_assessment.notes if result.condition_assessment else None,
             seoTitle=result.seo_title,
             productMetadata=product_metadata,
-            serialInfo=serial_info
+            serialInfo=serial_info,
+            productId=product_id
         )
 
     except Exception as e:
@@ -177,11 +214,21 @@ async def identify_item(request: IdentifyRequest):
 
 
 @router.post("/research", response_model=MarketplaceResult)
-async def research_marketplace(request: ResearchRequest):
+async def research_marketplace(
+    request: ResearchRequest,
+    timeout_ms: Optional[str] = Header(None, alias=Deadline.HEADER),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return (e.g., 'stats,sources_checked')"
+    )
+):
     """
     Research marketplace prices for an identified item.
 
     Agent 4 Integration Endpoint - matches contract in agent2-client.ts
+    Honors the caller's X-Request-Timeout-Ms and returns partial data
+    (data_freshness="partial") instead of running past it.
+    With `fields=`, only those fields are built (usually skipping listings).
     """
     try:
         logger.info(
@@ -196,12 +243,27 @@ async def research_marketplace(request: ResearchRequest):
             brand=request.brand,
             model=request.model,
             category=request.category,
-            condition=request.condition
+            condition=request.condition,
+            deadline=Deadline.from_header(timeout_ms),
+            adaptive=request.adaptive,
+            upc=request.upc,
+            model_number=request.model_number,
+            stratify_conditions=request.stratify_conditions,
+            identifiers=request.identifiers,
+            metadata=request.productMetadata
         )
 
-        # Map to Agent 4's expected format
-        return MarketplaceResult(
-            listings=[
+        # Demand tracking for cache pre-warming
+        research_prewarmer.record(
+            request.brand,
+            request.model,
+            request.category,
+            product_id=result["product_id"],
+            refreshed=not result["cache_hit"]
+        )
+
+        def build_listings():
+            return [
                 {
                     "source": listing.source,
                     "price": listing.price,
@@ -209,18 +271,34 @@ async def research_marketplace(request: ResearchRequest):
                     "sold_date": listing.sold_date.isoformat() if listing.sold_date else None
                 }
                 for listing in result["listings"]
-            ],
-            stats=MarketplaceStats(
-                count=result["stats"].count,
-                median=result["stats"].median,
-                mean=result["stats"].mean,
-                std_dev=result["stats"].std_dev,
-                percentiles=result["stats"].percentiles,
-                min_price=result["stats"].min_price,
-                max_price=result["stats"].max_price
-            ),
+            ]
+
+        def build_stats():
+            return MarketplaceStats(**result["stats"])
+
+        projection = FieldProjection.parse(fields)
+        if projection is not None:
+            return JSONResponse(projection.build({
+                "product_id": lambda: result["product_id"],
+                "listings": build_listings,
+                "stats": lambda: build_stats().model_dump(),
+                "sources_checked": lambda: result["sources_checked"],
+                "cache_hit": lambda: result["cache_hit"],
+                "data_freshness": lambda: result["data_freshness"],
+                "deadline_exceeded": lambda: result["deadline_exceeded"],
+                "condition_stats": lambda: result["condition_stats"]
+            }))
+
+        # Map to Agent 4's expected format
+        return MarketplaceResult(
+            product_id=result["product_id"],
+            listings=build_listings(),
+            stats=build_stats(),
             sources_checked=result["sources_checked"],
-            cache_hit=result["cache_hit"]
+            cache_hit=result["cache_hit"],
+            data_freshness=result["data_freshness"],
+            deadline_exceeded=result["deadline_exceeded"],
+            condition_stats=result["condition_stats"]
         )
 
     except Exception as e:
@@ -235,20 +313,39 @@ async def calculate_price(request: PriceRequest):
 
     Agent 4 Integration Endpoint - matches contract in agent2-client.ts
     Combines FMV calculation + offer generation into one response.
+
+    With `product_id`, FMV results are cached per product, condition and
+    category. Send `product_id` without `marketplace_stats` to price a
+    repeat quote from the cache (404 on a miss: research, then call again
+    with the stats); only the offer step is re-run.
     """
     try:
         logger.info(
             "integration_price_called",
             category=request.category,
-            condition=request.condition
+            condition=request.condition,
+            product_id=request.product_id
         )
 
-        # Step 1: Calculate FMV
-        fmv_result = fmv_engine.calculate_fmv(
-            marketplace_stats=request.marketplace_stats,
-            category=request.category,
-            condition=request.condition
-        )
+        # Step 1: FMV from the quote cache, or calculated from fresh stats
+        freshness = None
+        if request.marketplace_stats is None:
+            cached = await quote_cache.get(request.product_id, request.condition, request.category)
+            if cached is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="No cached quote for this product. Research marketplace data first."
+                )
+            fmv_result, freshness = cached
+        else:
+            fmv_result = fmv_engine.calculate_fmv(
+                marketplace_stats=request.marketplace_stats,
+                category=request.category,
+                condition=request.condition
+            )
+            await quote_cache.set(request.product_id, request.condition, request.category, fmv_result)
+            if request.product_id:
+                price_trends.observe(request.product_id, request.condition, fmv_result.fmv)
 
         # Step 2: Calculate offer with pricing confidence and comparable sales
         offer_result = offer_engine.calculate_offer(
@@ -256,9 +353,15 @@ async def calculate_price(request: PriceRequest):
             condition=request.condition,
             category=request.category,
             pricing_confidence=fmv_result.confidence,
-            comparable_sales=fmv_result.comparable_sales
+            comparable_sales=fmv_result.comparable_sales,
+            inventory_count=inventory_index.count(request.product_id, request.category),
+            offer_id=request.offer_id,
+            trend=price_trends.snapshot(request.product_id, request.condition)
         )
 
+        if offer_result["spending"] is not None and not offer_result["spending"]["reserved"]:
+            raise HTTPException(status_code=409, detail="Daily spending limit reached")
+
         # Step 3: Combine results
         offer_to_market_ratio = (
             offer_result["offer_amount"] / fmv_result.fmv
@@ -289,9 +392,16 @@ async def calculate_price(request: PriceRequest):
             range=fmv_result.range,
             pricing_confidence=fmv_result.confidence,
             comparable_sales=comparable_sales_mapped,
-            confidence_factors=fmv_result.confidence_factors
+            confidence_factors=fmv_result.confidence_factors,
+            cache_hit=freshness is not None,
+            data_freshness=fmv_result.data_freshness,
+            cached_at=freshness["cached_at"] if freshness else None,
+            spending=offer_result["spending"]
         )
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         logger.error("price_integration_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,7 +2,7 @@
 Unified FastAPI Server for JakeBuysIt Python Services
 Mounts all service routers: vision, pricing, marketplace, integration
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import structlog
@@ -12,6 +12,14 @@ from integration.router import router as integration_router
 from vision.router import router as vision_router
 from pricing.router import router as pricing_router
 from marketplace.router import router as marketplace_router
+from marketplace.suggest import suggestion_index
+from marketplace.prewarm import research_prewarmer
+from pricing.inventory import inventory_index
+from pricing.rules import pricing_rules
+from config.settings import settings
+from services.monitoring.metrics import metrics
+from services.middleware.compression import CompressionMiddleware
+import asyncio
 
 # Configure logging
 structlog.configure(
@@ -31,6 +39,12 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Brotli/gzip for large (listing-heavy) responses
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.response_compression_min_bytes
+)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +54,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def startup_event():
+    """Start background jobs."""
+    # Keep the autocomplete index current without blocking requests
+    asyncio.create_task(suggestion_index.run_background_rebuilds())
+
+    # Share inventory counts (offer saturation) across workers
+    asyncio.create_task(inventory_index.run_background_sync())
+
+    # Pick up pricing rule changes (file or Redis) without a restart
+    asyncio.create_task(pricing_rules.run_background_reload())
+
+    # Refresh research for popular products before their cache expires
+    if settings.prewarm_enabled:
+        asyncio.create_task(research_prewarmer.run())
+
+
 # Mount routers
 app.include_router(integration_router, prefix="/api/v1/integration", tags=["integration"])
 app.include_router(vision_router, prefix="/api/v1/vision", tags=["vision"])
@@ -55,6 +86,12 @@ async def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (merged across workers in multiprocess mode)"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
 @app.get("/")
 async def root():
     """Root endpoint with API info"""
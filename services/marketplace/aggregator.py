@@ -6,13 +6,31 @@ Features:
 - Live data fetching from eBay + Facebook
 - Fallback to cached data on errors
 - Data freshness tracking
+- Request deadlines with partial results
+- Adaptive sample sizing (small first batch, expand only when unstable)
+- Canonical product ids from the product catalog
+- Title relevance filter (accessories, parts, off-target listings)
+- Near-duplicate collapse (relists, cross-posts)
+- Condition-stratified stats from one fetch, cached together per product
+- Query fan-out over UPC, model number and full-name variants
 """
+import asyncio
 import structlog
 import numpy as np
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 from .models import MarketplaceListing, MarketplaceStats
 from .ebay import ebay_client
 from .facebook import facebook_client
+from .dedup import listing_deduplicator
+from .relevance import title_relevance_scorer
+from .deadline import Deadline
+from .catalog import product_catalog
+from .suggest import suggestion_index
+from .planner import query_planner, QueryVariant
+from services.cache.redis_client import redis_cache
+from services.pricing.stats import bootstrap_intervals, grouped_weighted_quantiles, weighted_quantiles
+from services.monitoring.metrics import metrics
+from config.settings import settings
 
 logger = structlog.get_logger()
 
@@ -20,13 +38,47 @@ logger = structlog.get_logger()
 class MarketplaceAggregator:
     """Aggregates and analyzes marketplace data from multiple sources."""
 
+    # Listings requested per source for a full lookup
+    FULL_EBAY_LIMIT = 100
+    FULL_FACEBOOK_LIMIT = 30
+
+    # Adaptive sampling: first batch size and stability criteria
+    ADAPTIVE_INITIAL_EBAY_LIMIT = 25
+    ADAPTIVE_INITIAL_FACEBOOK_LIMIT = 10
+    ADAPTIVE_SORT = "newlyListed"  # Price-sorted pages would bias the sample
+    ADAPTIVE_MIN_COUNT = 12  # Fewer listings than this is never "stable"
+    ADAPTIVE_MAX_CV = 0.25  # Coefficient of variation
+    ADAPTIVE_MAX_IQR_RATIO = 0.30  # IQR / median
+    ADAPTIVE_MAX_CI_WIDTH = 0.10  # Bootstrap 95% CI width of the median / median
+    ADAPTIVE_HIGH_VALUE = 500.0  # Always fetch the full sample above this median
+    ADAPTIVE_MIN_EXPAND_SECONDS = 3.0  # Budget needed to bother with a second batch
+    BOOTSTRAP_RESAMPLES = 200
+
+    # Confidence intervals on the median and mean (cached with the stats, used for FMV ranges)
+    CI_RESAMPLES = 1000
+    CI_MIN_LISTINGS = 5
+
+    # Condition-stratified research
+    MIN_CONDITION_LISTINGS = 5  # Thinner strata are quoted from all used listings
+    CONDITION_STATS_TTL = 14400  # 4 hours, same as popular products
+
+    @metrics.track_stage("marketplace_research")
     async def research_product(
         self,
         brand: str,
         model: str,
         category: str,
         condition: str = None,
-        use_live_data: bool = True
+        use_live_data: bool = True,
+        deadline: Optional[Deadline] = None,
+        adaptive: Optional[bool] = None,
+        upc: Optional[str] = None,
+        model_number: Optional[str] = None,
+        stratify_conditions: Optional[bool] = None,
+        identifiers: Optional[Any] = None,
+        metadata: Optional[Any] = None,
+        refresh_cache: bool = False,
+        record_demand: bool = True
     ) -> Dict:
         """
         Research a product across multiple marketplaces.
@@ -37,9 +89,29 @@ class MarketplaceAggregator:
             category: Product category
             condition: Item condition
             use_live_data: If True, fetch live data; if False, use cached only
+            deadline: Request deadline; sources still running when it passes
+                are cancelled and the partial results are returned
+            adaptive: Fetch a small first batch and only fetch more when the
+                price estimate is unstable or the item is high-value
+                (defaults to settings.adaptive_sampling_enabled)
+            upc: UPC from identification, used to resolve the canonical product
+            model_number: Model number from identification
+            stratify_conditions: Fetch every used condition in one query and
+                cache per-condition stats together, so a quote in any
+                condition is served from the same entry
+                (defaults to settings.condition_stratified_stats)
+            identifiers: ProductIdentifiers (or dict); UPC/EAN and model
+                number become extra eBay query variants
+            metadata: ProductMetadata (or dict); variant, generation and
+                storage form a more specific query variant
+            refresh_cache: Skip the condition-stats cache read and overwrite
+                the entry with fresh data (used by the pre-warmer)
+            record_demand: Count this request in catalog observations and
+                autocomplete popularity (False for background refreshes)
 
         Returns:
-            Dict with listings, stats, and data freshness indicator
+            Dict with canonical product id, listings, stats, and data
+            freshness indicator ("live", "cached", "partial" or "stale")
         """
         logger.info(
             "researching_product",
@@ -49,44 +121,135 @@ class MarketplaceAggregator:
             use_live_data=use_live_data
         )
 
+        # Resolve to the canonical product so equivalent names share one query
+        identified_id = product_catalog.resolve(upc=upc, model_number=model_number)
+        requested = self._requested_text(model, metadata)
+        product_id = (
+            identified_id
+            or product_catalog.resolve(brand=brand, model=requested)
+            or product_catalog.resolve(brand=brand, model=model)
+        )
+        product = product_catalog.get(product_id) if product_id else None
+
+        # A UPC pins the exact unit, but a model number covers every storage
+        # size: only price a storage variant when the caller named it
+        if product and product["storage"] and not (
+            (upc and identified_id == product_catalog.resolve(upc=upc))
+            or product_catalog.mentions_storage(product, requested)
+        ):
+            product_id = product_catalog.canonical_id(product["brand"], product["model"])
+            product = product_catalog.get(product_id)
+
         # Build search query
-        query = f"{brand} {model}".strip()
+        if product:
+            query = f"{product['brand']} {product['model']}"
+            if product["storage"]:
+                query = f"{query} {product['storage']}"
+        else:
+            query = f"{brand} {model}".strip()
+
+        # Search by every identifier we have; a single variant is just `query`
+        query_brand = product["brand"] if product else brand
+        query_model = product["model"] if product else model
+        if identifiers is None and (upc or model_number):
+            identifiers = {"upc": upc, "model_number": model_number}
+        if metadata is None and product and product["storage"]:
+            metadata = {"storage": product["storage"]}
+        variants = query_planner.plan(query_brand, query_model, identifiers, metadata)
+        if len(variants) == 1:
+            variants = None
 
         # Track data freshness
         data_freshness = "live"
-        sources_checked = []
 
-        # Fetch from eBay (primary source for sold data)
-        ebay_listings = []
-        try:
-            ebay_listings = await ebay_client.search_sold_listings(
-                query=query,
-                category=category,
-                condition=condition,
-                sold_within_days=90,  # 90 days for broader dataset
-                limit=100,
-                real_time=use_live_data
+        # Every source shares one request deadline
+        deadline = deadline or Deadline.default()
+
+        if adaptive is None:
+            adaptive = settings.adaptive_sampling_enabled
+
+        if stratify_conditions is None:
+            stratify_conditions = settings.condition_stratified_stats
+
+        # New items aren't in the all-used fetch; quote them from their own query
+        if condition == "New":
+            stratify_conditions = False
+
+        fetch_condition = condition
+        condition_cache_key = None
+        if stratify_conditions:
+            condition_cache_key = redis_cache.generate_cache_key(
+                "condition_stats",
+                product=product_id or product_catalog.canonical_id(brand, model) or query.lower(),
+                category=category
+            )
+            cached = None if refresh_cache else await redis_cache.get(condition_cache_key)
+            if cached:
+                logger.info("condition_stats_cache_hit", cache_key=condition_cache_key, condition=condition)
+                return self._condition_stats_result(cached, condition)
+
+            # One query for every used condition; small adaptive batches
+            # would leave the rarer conditions without data
+            fetch_condition = ebay_client.ALL_USED_CONDITIONS
+            adaptive = False
+
+        sampling = None
+        if adaptive:
+            # Small first batch; only fetch more if the estimate is unstable
+            fetched = await self._fetch_sources(
+                query, category, fetch_condition, use_live_data, deadline,
+                variants=variants, brand=brand, model=model,
+                ebay_limit=self.ADAPTIVE_INITIAL_EBAY_LIMIT,
+                facebook_limit=self.ADAPTIVE_INITIAL_FACEBOOK_LIMIT,
+                sort=self.ADAPTIVE_SORT
+            )
+            sampling = self._assess_sample(
+                title_relevance_scorer.filter_listings(
+                    fetched["ebay"] + fetched["facebook"], brand, model
+                )
+            )
+
+            if sampling["expand"] and not fetched["deadline_exceeded"]:
+                if deadline.allows(self.ADAPTIVE_MIN_EXPAND_SECONDS):
+                    more = await self._fetch_sources(
+                        query, category, fetch_condition, use_live_data, deadline,
+                        variants=variants, brand=brand, model=model,
+                        ebay_limit=self.FULL_EBAY_LIMIT - self.ADAPTIVE_INITIAL_EBAY_LIMIT,
+                        facebook_limit=self.FULL_FACEBOOK_LIMIT,
+                        ebay_offset=self.ADAPTIVE_INITIAL_EBAY_LIMIT,
+                        sort=self.ADAPTIVE_SORT
+                    )
+                    fetched = self._merge_batches(fetched, more)
+                    sampling["batches"] = 2
+                else:
+                    sampling["reason"] += "_no_time_to_expand"
+
+            logger.info(
+                "adaptive_sampling_completed",
+                batches=sampling["batches"],
+                reason=sampling["reason"],
+                cv=sampling["cv"]
             )
-            sources_checked.append("ebay")
-            logger.info("ebay_research_completed", count=len(ebay_listings))
-        except Exception as e:
-            logger.error("ebay_research_failed", error=str(e))
+        else:
+            fetched = await self._fetch_sources(
+                query, category, fetch_condition, use_live_data, deadline,
+                variants=variants, brand=brand, model=model,
+                ebay_limit=self.FULL_EBAY_LIMIT,
+                facebook_limit=self.FULL_FACEBOOK_LIMIT
+            )
+
+        ebay_listings = fetched["ebay"]
+        facebook_listings = fetched["facebook"]
+        sources_checked = fetched["sources_checked"]
+        deadline_exceeded = fetched["deadline_exceeded"]
+        query_plan = fetched["query_plan"]
+
+        if fetched["ebay_failed"]:
             data_freshness = "stale"
 
-        # Fetch from Facebook Marketplace (for current market prices)
-        facebook_listings = []
-        if use_live_data:
-            try:
-                facebook_listings = await facebook_client.search_listings(
-                    query=query,
-                    category=category,
-                    limit=30
-                )
-                sources_checked.append("facebook")
-                logger.info("facebook_research_completed", count=len(facebook_listings))
-            except Exception as e:
-                logger.error("facebook_research_failed", error=str(e))
-                # Don't mark as stale if eBay succeeded
+        # Some sources were cut off: what we have is best-effort
+        if deadline_exceeded and data_freshness == "live":
+            data_freshness = "partial"
 
         # TODO: Fetch from Amazon
         # amazon_listings = await amazon_client.search(...)
@@ -104,23 +267,126 @@ class MarketplaceAggregator:
             logger.warning("no_marketplace_data", query=query)
             data_freshness = "stale"
 
-        # Filter outliers
-        filtered_listings = self._filter_outliers(all_listings)
+        # Drop accessories, parts and listings for other products
+        relevant_listings = title_relevance_scorer.filter_listings(all_listings, brand, model)
 
-        # Compute recency weights (without corrupting actual prices)
-        recency_weights = self._compute_recency_weights(filtered_listings)
+        # Collapse relists and cross-posts of the same physical item
+        unique_listings, duplicate_groups = listing_deduplicator.deduplicate(relevant_listings)
 
-        # Compute statistics with recency-weighted mean
-        stats = self._compute_statistics(filtered_listings, weights=recency_weights)
+        condition_stats = None
+        overall_stats = None
+        if stratify_conditions:
+            strata = self._stratify_by_condition(unique_listings)
+            condition_stats = {
+                code: self._summarize_listings(stratum)[1]
+                for code, stratum in strata.items()
+            }
+
+            # Unstratified quotes and thin strata fall back to the default
+            # condition set, not every used condition (parts units skew low)
+            default_listings = [
+                l for l in unique_listings
+                if l.condition_code is None or l.condition_code in ebay_client.DEFAULT_CONDITION_CODES
+            ] or unique_listings
+            overall_stats = self._summarize_listings(default_listings)[1]
+
+            # Quote the requested condition from its own stratum
+            if condition in strata and len(strata[condition]) >= self.MIN_CONDITION_LISTINGS:
+                unique_listings = strata[condition]
+            else:
+                unique_listings = default_listings
+
+        # Filter outliers, weight by recency and compute statistics
+        filtered_listings, stats_dict = self._summarize_listings(unique_listings)
+        stats = MarketplaceStats(**stats_dict)
 
         logger.info(
             "product_research_completed",
             total_listings=len(all_listings),
+            irrelevant_removed=len(all_listings) - len(relevant_listings),
+            duplicates_collapsed=len(relevant_listings) - len(unique_listings),
             filtered_listings=len(filtered_listings),
             median_price=stats.median,
-            data_freshness=data_freshness
+            data_freshness=data_freshness,
+            deadline_exceeded=deadline_exceeded
         )
 
+        # Remember this product; the requested name only becomes an alias
+        # when an exact identifier (UPC, model number) vouched for it
+        if filtered_listings and record_demand:
+            product_id = product_catalog.register(
+                brand=product["brand"] if product else brand,
+                model=product["model"] if product else model,
+                category=category,
+                upc=upc,
+                model_number=model_number,
+                storage=product["storage"] if product else None,
+                aliases=[f"{brand} {model}"] if identified_id else []
+            ) or product_id
+
+        # Past queries feed brand/model autocomplete
+        if record_demand:
+            suggestion_index.record(f"{brand} {model}", product_id=product_id)
+
+        if condition_stats is not None and data_freshness == "live":
+            # Every condition's stats in one entry: any condition quote hits
+            await redis_cache.set(
+                condition_cache_key,
+                {
+                    "product_id": product_id,
+                    "sources_checked": sources_checked,
+                    "overall": overall_stats,
+                    "conditions": condition_stats
+                },
+                ttl=self.CONDITION_STATS_TTL
+            )
+
+        return {
+            "product_id": product_id,
+            "listings": filtered_listings,
+            "stats": stats_dict,
+            "sources_checked": sources_checked,
+            "data_freshness": data_freshness,
+            "deadline_exceeded": deadline_exceeded,
+            "sampling": sampling,
+            "query_plan": query_plan,
+            "irrelevant_removed": len(all_listings) - len(relevant_listings),
+            "duplicates_collapsed": len(relevant_listings) - len(unique_listings),
+            "duplicate_groups": duplicate_groups,
+            "condition_stats": self._strip_listings(condition_stats),
+            "cache_hit": False
+        }
+
+    def _stratify_by_condition(
+        self,
+        listings: List[MarketplaceListing]
+    ) -> Dict[str, List[MarketplaceListing]]:
+        """Group listings by normalized condition code (untagged listings are skipped)."""
+        strata: Dict[str, List[MarketplaceListing]] = {}
+        for listing in listings:
+            if listing.condition_code:
+                strata.setdefault(listing.condition_code, []).append(listing)
+        return strata
+
+    def _summarize_listings(
+        self,
+        listings: List[MarketplaceListing]
+    ) -> Tuple[List[MarketplaceListing], Dict]:
+        """
+        Filter outliers, weight by recency and compute statistics.
+
+        Returns:
+            (filtered listings, stats dict including the serialized listings)
+        """
+        # Filter outliers
+        filtered_listings = self._filter_outliers(listings)
+
+        # Compute recency weights (without corrupting actual prices)
+        recency_weights = self._compute_recency_weights(filtered_listings)
+
+        # Compute statistics with recency-weighted mean
+        stats = self._compute_statistics(filtered_listings, weights=recency_weights)
+
         # Convert stats to dict and add listings
         stats_dict = stats.dict()
         stats_dict["listings"] = [
@@ -128,21 +394,222 @@ class MarketplaceAggregator:
                 "title": l.title,
                 "price": l.price,
                 "condition": l.condition,
+                "condition_code": l.condition_code,
                 "sold_date": l.sold_date.isoformat() if l.sold_date else None,
                 "source": l.source,
-                "url": l.url
+                "url": l.url,
+                "collapsed_count": l.collapsed_count
             }
             for l in filtered_listings
         ]
 
+        return filtered_listings, stats_dict
+
+    def _requested_text(self, model: Optional[str], metadata: Optional[Any]) -> str:
+        """What the caller asked for: model text plus any metadata storage."""
+        storage = metadata.get("storage") if isinstance(metadata, dict) else getattr(metadata, "storage", None)
+        return f"{model or ''} {storage or ''}".strip()
+
+    def _condition_stats_result(self, cached: Dict, condition: Optional[str]) -> Dict:
+        """Build a research result for one condition from cached stratified stats."""
+        stats_dict = cached["conditions"].get(condition)
+        if stats_dict is None or stats_dict["count"] < self.MIN_CONDITION_LISTINGS:
+            stats_dict = cached["overall"]
+
         return {
-            "listings": filtered_listings,
+            "product_id": cached["product_id"],
+            "listings": [MarketplaceListing(**l) for l in stats_dict["listings"]],
             "stats": stats_dict,
-            "sources_checked": sources_checked,
-            "data_freshness": data_freshness,
-            "cache_hit": False
+            "sources_checked": cached["sources_checked"],
+            "data_freshness": "cached",
+            "deadline_exceeded": False,
+            "sampling": None,
+            "query_plan": None,
+            "irrelevant_removed": 0,
+            "duplicates_collapsed": 0,
+            "duplicate_groups": [],
+            "condition_stats": self._strip_listings(cached["conditions"]),
+            "cache_hit": True
+        }
+
+    def _strip_listings(self, condition_stats: Optional[Dict]) -> Optional[Dict]:
+        """Per-condition stats without the listings (for responses)."""
+        if condition_stats is None:
+            return None
+        return {
+            code: {k: v for k, v in stats.items() if k != "listings"}
+            for code, stats in condition_stats.items()
+        }
+
+    async def _fetch_sources(
+        self,
+        query: str,
+        category: str,
+        condition: Optional[str],
+        use_live_data: bool,
+        deadline: Deadline,
+        ebay_limit: int,
+        facebook_limit: int,
+        ebay_offset: int = 0,
+        sort: str = "price",
+        variants: Optional[List[QueryVariant]] = None,
+        brand: str = "",
+        model: str = ""
+    ) -> Dict:
+        """
+        Fetch one batch from every source concurrently within the deadline.
+
+        eBay is the primary source for sold data; Facebook Marketplace adds
+        current market prices when live data is requested. With several
+        query variants, eBay is searched through the query planner.
+
+        Returns:
+            Dict with per-source listings, sources checked, whether eBay
+            failed, whether the deadline cut any source off and the query
+            plan report (None for a single query)
+        """
+        ebay_kwargs = {
+            "category": category,
+            "condition": condition,
+            "sold_within_days": 90,  # 90 days for broader dataset
+            "limit": ebay_limit,
+            "offset": ebay_offset,
+            "sort": sort,
+            "real_time": use_live_data
+        }
+        if variants:
+            ebay_search = query_planner.search(variants, brand, model, deadline, **ebay_kwargs)
+        else:
+            ebay_search = ebay_client.search_sold_listings(query=query, deadline=deadline, **ebay_kwargs)
+
+        tasks = {
+            "ebay": asyncio.create_task(ebay_search)
+        }
+        if use_live_data and facebook_limit > 0:
+            tasks["facebook"] = asyncio.create_task(facebook_client.search_listings(
+                query=query,
+                category=category,
+                limit=facebook_limit,
+                deadline=deadline
+            ))
+
+        done, pending = await asyncio.wait(tasks.values(), timeout=deadline.remaining())
+
+        # Cancel abandoned work as soon as the deadline passes
+        if pending:
+            for task in pending:
+                task.cancel()
+            logger.warning(
+                "research_deadline_exceeded",
+                budget_seconds=deadline.budget,
+                cancelled=[name for name, task in tasks.items() if task in pending]
+            )
+
+        result = {
+            "ebay": [],
+            "facebook": [],
+            "sources_checked": [],
+            "ebay_failed": False,
+            "deadline_exceeded": bool(pending),
+            "query_plan": None
+        }
+
+        if tasks["ebay"] in done:
+            try:
+                result["ebay"] = tasks["ebay"].result()
+                if variants:
+                    result["ebay"], result["query_plan"] = result["ebay"]
+                result["sources_checked"].append("ebay")
+                logger.info("ebay_research_completed", count=len(result["ebay"]))
+            except Exception as e:
+                logger.error("ebay_research_failed", error=str(e))
+                result["ebay_failed"] = True
+
+        if "facebook" in tasks and tasks["facebook"] in done:
+            try:
+                result["facebook"] = tasks["facebook"].result()
+                result["sources_checked"].append("facebook")
+                logger.info("facebook_research_completed", count=len(result["facebook"]))
+            except Exception as e:
+                logger.error("facebook_research_failed", error=str(e))
+                # Don't mark as stale if eBay succeeded
+
+        return result
+
+    def _merge_batches(self, first: Dict, second: Dict) -> Dict:
+        """
+        Merge an adaptive follow-up batch into the first batch.
+
+        eBay pages are appended; the Facebook re-scrape supersedes the
+        smaller first scrape when it succeeded.
+        """
+        return {
+            "ebay": first["ebay"] + second["ebay"],
+            "facebook": (
+                second["facebook"] if "facebook" in second["sources_checked"]
+                else first["facebook"]
+            ),
+            "sources_checked": first["sources_checked"] + [
+                s for s in second["sources_checked"]
+                if s not in first["sources_checked"]
+            ],
+            "ebay_failed": first["ebay_failed"] and second["ebay_failed"],
+            "deadline_exceeded": second["deadline_exceeded"],
+            "query_plan": first["query_plan"]
         }
 
+    def _assess_sample(self, listings: List[MarketplaceListing]) -> Dict:
+        """
+        Decide whether a first batch is enough to price the item.
+
+        Computes dispersion (CV, IQR / median) and a bootstrap 95% CI on
+        the median in one vectorized pass.
+
+        Returns:
+            Dict with the dispersion metrics, whether to fetch more
+            ("expand") and the reason
+        """
+        prices = np.array([l.price for l in listings if l.price > 0], dtype=float)
+        assessment = {
+            "mode": "adaptive",
+            "batches": 1,
+            "count": len(prices),
+            "cv": None,
+            "iqr_ratio": None,
+            "median_ci": None,
+            "expand": True,
+            "reason": "too_few_listings"
+        }
+
+        if len(prices) < self.ADAPTIVE_MIN_COUNT:
+            return assessment
+
+        # Linear-interpolated percentiles, as the expansion thresholds were tuned on
+        q1, median, q3 = np.percentile(prices, [25, 50, 75])
+        cv = float(np.std(prices) / np.mean(prices))
+        iqr_ratio = float((q3 - q1) / median) if median > 0 else float("inf")
+
+        ci_low, ci_high = bootstrap_intervals(prices, resamples=self.BOOTSTRAP_RESAMPLES)["median"]
+        ci_width = float((ci_high - ci_low) / median) if median > 0 else float("inf")
+
+        assessment.update({
+            "cv": round(cv, 3),
+            "iqr_ratio": round(iqr_ratio, 3),
+            "median_ci": [round(float(ci_low), 2), round(float(ci_high), 2)]
+        })
+
+        if median >= self.ADAPTIVE_HIGH_VALUE:
+            assessment["reason"] = "high_value"
+        elif cv > self.ADAPTIVE_MAX_CV or iqr_ratio > self.ADAPTIVE_MAX_IQR_RATIO:
+            assessment["reason"] = "high_dispersion"
+        elif ci_width > self.ADAPTIVE_MAX_CI_WIDTH:
+            assessment["reason"] = "unstable_median"
+        else:
+            assessment["expand"] = False
+            assessment["reason"] = "stable"
+
+        return assessment
+
     def _filter_outliers(self, listings: List[MarketplaceListing]) -> List[MarketplaceListing]:
         """
         Filter outliers using IQR (Interquartile Range) method.
@@ -155,9 +622,9 @@ class MarketplaceAggregator:
         # Extract prices
         prices = np.array([l.price for l in listings])
 
-        # Calculate IQR
-        q1 = np.percentile(prices, 25)
-        q3 = np.percentile(prices, 75)
+        # Calculate IQR (linear interpolation: the fence decides which
+        # listings count as outliers, so it keeps numpy's default)
+        q1, q3 = np.percentile(prices, [25, 75])
         iqr = q3 - q1
 
         # Define bounds
@@ -215,7 +682,7 @@ class MarketplaceAggregator:
         return weights
 
     def _compute_statistics(self, listings: List[MarketplaceListing], weights: List[float] = None) -> MarketplaceStats:
-        """Compute statistical metrics for listings, using recency weights for the mean."""
+        """Compute statistical metrics for listings, weighted by recency."""
         if not listings:
             return MarketplaceStats(
                 count=0,
@@ -225,32 +692,77 @@ class MarketplaceAggregator:
                 percentiles={}
             )
 
-        prices = np.array([l.price for l in listings])
-
-        # Use recency weights for mean calculation (gives recent sales more influence)
-        # Median and percentiles use unweighted prices to stay robust against outliers
-        if weights is not None:
-            w = np.array(weights)
-            weighted_mean = float(np.average(prices, weights=w))
-        else:
-            weighted_mean = float(np.mean(prices))
+        prices = np.array([l.price for l in listings], dtype=float)
+
+        # Recency weights give recent sales more influence on the mean, median
+        # and percentiles (outliers were already filtered, so the quantiles
+        # stay robust); one sort serves every quantile
+        w = np.array(weights, dtype=float) if weights is not None else np.ones(len(prices))
+        weighted_mean = float(np.average(prices, weights=w))
+        p25, p50, p75 = (float(q) for q in weighted_quantiles(prices, w, (0.25, 0.5, 0.75)))
+
+        # Sampling uncertainty of the median and mean, for real FMV ranges
+        intervals = None
+        if len(prices) >= self.CI_MIN_LISTINGS:
+            intervals = bootstrap_intervals(
+                prices,
+                weights=w if weights is not None else None,
+                resamples=self.CI_RESAMPLES
+            )
 
         stats = MarketplaceStats(
             count=len(prices),
-            median=float(np.median(prices)),
+            median=p50,
             mean=weighted_mean,
             std_dev=float(np.std(prices)),
             percentiles={
-                "p25": float(np.percentile(prices, 25)),
-                "p50": float(np.percentile(prices, 50)),
-                "p75": float(np.percentile(prices, 75))
+                "p25": p25,
+                "p50": p50,
+                "p75": p75
             },
             min_price=float(np.min(prices)),
-            max_price=float(np.max(prices))
+            max_price=float(np.max(prices)),
+            median_ci=[round(v, 2) for v in intervals["median"]] if intervals else None,
+            mean_ci=[round(v, 2) for v in intervals["mean"]] if intervals else None,
+            sources=self._source_statistics(listings, prices, w)
         )
 
         return stats
 
+    def _source_statistics(
+        self,
+        listings: List[MarketplaceListing],
+        prices: np.ndarray,
+        weights: np.ndarray
+    ) -> Dict[str, Dict]:
+        """
+        Per-source stats for FMV fusion, all sources in one grouped pass.
+
+        Returns:
+            Source -> {"count", "median", "mean", "std_dev", "p25", "p75"}
+        """
+        names, codes = np.unique([l.source for l in listings], return_inverse=True)
+        n = len(names)
+
+        counts = np.bincount(codes, minlength=n)
+        means = np.bincount(codes, weights=prices * weights, minlength=n) / \
+            np.bincount(codes, weights=weights, minlength=n)
+        raw_means = np.bincount(codes, weights=prices, minlength=n) / counts
+        variances = np.bincount(codes, weights=prices ** 2, minlength=n) / counts - raw_means ** 2
+        quantiles = grouped_weighted_quantiles(prices, weights, codes, n, (0.25, 0.5, 0.75))
+
+        return {
+            str(name): {
+                "count": int(counts[i]),
+                "median": float(quantiles[i, 1]),
+                "mean": float(means[i]),
+                "std_dev": float(np.sqrt(max(variances[i], 0.0))),
+                "p25": float(quantiles[i, 0]),
+                "p75": float(quantiles[i, 2])
+            }
+            for i, name in enumerate(names)
+        }
+
 
 # Global instance
 marketplace_aggregator = MarketplaceAggregator()
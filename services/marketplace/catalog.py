@@ -0,0 +1,286 @@
+"""
+Product catalog index - resolves identifiers to canonical products.
+
+Maps UPCs, model numbers and alias strings (vision titles, research
+queries) to one stable canonical product id, so research, caching and
+inventory counts can all key on the same product.
+
+Features:
+- Exact lookups by UPC, model number and normalized alias (O(1) dicts)
+- Inverted token index for free-text alias matching
+- Populated incrementally from identifications and research results
+- Deterministic ids, so every worker derives the same id for a product
+"""
+import re
+import json
+import threading
+import structlog
+from typing import Dict, List, Optional, Set, Iterable
+
+logger = structlog.get_logger()
+
+
+class ProductCatalog:
+    """In-memory catalog of canonical products with identifier indexes."""
+
+    _TOKEN_RE = re.compile(r"[a-z0-9]+")
+    _CAPACITY_RE = re.compile(r"\b(\d+)\s+(gb|tb|mb)\b")
+
+    # Free-text matches must cover at least this share of a product's alias tokens
+    MIN_TOKEN_COVERAGE = 0.6
+
+    def __init__(self):
+        self.products: Dict[str, Dict] = {}
+        self._by_upc: Dict[str, str] = {}
+        self._by_model_number: Dict[str, str] = {}
+        self._by_alias: Dict[str, str] = {}
+        self._token_index: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        brand: str,
+        model: str,
+        category: Optional[str] = None,
+        upc: Optional[str] = None,
+        model_number: Optional[str] = None,
+        storage: Optional[str] = None,
+        aliases: Iterable[str] = ()
+    ) -> Optional[str]:
+        """
+        Add or update a product from an identification or research result.
+
+        Args:
+            brand: Brand name
+            model: Model name
+            category: Product category
+            upc: UPC/EAN barcode
+            model_number: Manufacturer model number (e.g. "A2084")
+            storage: Storage capacity, part of the identity for devices
+            aliases: Extra strings that refer to this product (titles, queries)
+
+        Returns:
+            Canonical product id, or None if brand/model are missing
+        """
+        product_id = self.canonical_id(brand, model, storage)
+        if product_id is None:
+            return None
+
+        with self._lock:
+            product = self.products.get(product_id)
+            if product is None:
+                product = {
+                    "product_id": product_id,
+                    "brand": brand.strip(),
+                    "model": model.strip(),
+                    "storage": storage.strip() if storage else None,
+                    "category": category,
+                    "upcs": [],
+                    "model_numbers": [],
+                    "aliases": [],
+                    "observations": 0
+                }
+                self.products[product_id] = product
+                logger.info("catalog_product_added", product_id=product_id)
+
+            product["observations"] += 1
+            if category and not product["category"]:
+                product["category"] = category
+
+            upc_key = self._normalize_code(upc)
+            if upc_key and upc_key not in self._by_upc:
+                self._by_upc[upc_key] = product_id
+                product["upcs"].append(upc_key)
+
+            number_key = self._normalize_code(model_number)
+            if number_key and number_key not in self._by_model_number:
+                self._by_model_number[number_key] = product_id
+                product["model_numbers"].append(number_key)
+
+            # A storage variant only answers to names that include its storage;
+            # the bare "brand model" belongs to the storage-less product
+            if storage:
+                names = [f"{brand} {model} {storage}", f"{model} {storage}"]
+            else:
+                names = [f"{brand} {model}", model]
+            for alias in list(names) + list(aliases):
+                self._add_alias(product, alias)
+
+        return product_id
+
+    def resolve(
+        self,
+        upc: Optional[str] = None,
+        model_number: Optional[str] = None,
+        brand: Optional[str] = None,
+        model: Optional[str] = None,
+        text: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Resolve identifiers to a canonical product id.
+
+        Tries the most specific identifier first: UPC, model number, exact
+        alias, then free-text token matching.
+
+        Returns:
+            Canonical product id, or None if nothing matches
+        """
+        upc_key = self._normalize_code(upc)
+        if upc_key and upc_key in self._by_upc:
+            return self._by_upc[upc_key]
+
+        number_key = self._normalize_code(model_number)
+        if number_key and number_key in self._by_model_number:
+            return self._by_model_number[number_key]
+
+        if not text:
+            text = " ".join(part for part in (brand, model) if part)
+        if not text:
+            return None
+
+        alias_key = self._normalize_text(text)
+        if alias_key in self._by_alias:
+            return self._by_alias[alias_key]
+
+        return self._match_tokens(alias_key.split())
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        """Get a catalog entry by canonical id."""
+        return self.products.get(product_id)
+
+    def canonical_id(
+        self,
+        brand: Optional[str],
+        model: Optional[str],
+        storage: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Derive the canonical id for a product ("apple/iphone-13-pro/256gb").
+
+        Storage is appended only when the model name doesn't already include it.
+        """
+        brand_slug = "-".join(self._TOKEN_RE.findall((brand or "").lower()))
+        model_tokens = self._TOKEN_RE.findall((model or "").lower())
+        if not brand_slug or not model_tokens:
+            return None
+
+        # Drop a repeated brand prefix ("Apple Apple iPhone")
+        brand_tokens = brand_slug.split("-")
+        if model_tokens[:len(brand_tokens)] == brand_tokens and len(model_tokens) > len(brand_tokens):
+            model_tokens = model_tokens[len(brand_tokens):]
+
+        parts = [brand_slug, "-".join(model_tokens)]
+        storage_slug = "".join(self._TOKEN_RE.findall((storage or "").lower()))
+        if storage_slug and storage_slug not in model_tokens:
+            parts.append(storage_slug)
+        return "/".join(parts)
+
+    def snapshot(self) -> str:
+        """Serialize the catalog to JSON (for persistence between restarts)."""
+        return json.dumps(list(self.products.values()))
+
+    def load_snapshot(self, data: str) -> int:
+        """
+        Load products from a JSON snapshot, merging into the current catalog.
+
+        Returns:
+            Number of products loaded
+        """
+        entries = json.loads(data)
+        for entry in entries:
+            product_id = self.register(
+                brand=entry["brand"],
+                model=entry["model"],
+                category=entry.get("category"),
+                storage=entry.get("storage"),
+                aliases=entry.get("aliases", [])
+            )
+            for upc in entry.get("upcs", []):
+                self.register(entry["brand"], entry["model"], upc=upc, storage=entry.get("storage"))
+            for number in entry.get("model_numbers", []):
+                self.register(entry["brand"], entry["model"], model_number=number, storage=entry.get("storage"))
+            if product_id:
+                self.products[product_id]["observations"] = entry.get("observations", 1)
+
+        logger.info("catalog_snapshot_loaded", products=len(entries))
+        return len(entries)
+
+    def _add_alias(self, product: Dict, alias: str):
+        """Index an alias string for exact and token lookups (lock held)."""
+        key = self._normalize_text(alias)
+        if not key or key in product["aliases"]:
+            return
+        if not self.mentions_storage(product, key):
+            return
+
+        # First product to claim an alias keeps it; tokens still index both
+        self._by_alias.setdefault(key, product["product_id"])
+        product["aliases"].append(key)
+        for token in key.split():
+            self._token_index.setdefault(token, set()).add(product["product_id"])
+
+    def _match_tokens(self, tokens: List[str]) -> Optional[str]:
+        """
+        Find the product matching all query tokens via the inverted index.
+
+        Intersects posting lists starting from the rarest token, keeps only
+        candidates whose every model token (and storage, if the product has
+        one) is in the query (so "iPhone 13" never resolves to "iPhone 13
+        Pro" or "iPhone 13 128GB"), then picks the candidate whose
+        aliases are best covered by the query, breaking ties by how often
+        the product has been seen.
+        """
+        postings = [self._token_index.get(token) for token in set(tokens)]
+        if not postings or any(p is None for p in postings):
+            return None
+
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                return None
+
+        query = set(tokens)
+        best_id = None
+        best_key = None
+        for product_id in candidates:
+            product = self.products[product_id]
+            if not query.issuperset(self._TOKEN_RE.findall(product["model"].lower())):
+                continue
+            if not self.mentions_storage(product, " ".join(tokens)):
+                continue
+            coverage = max(
+                len(query & set(alias.split())) / len(alias.split())
+                for alias in product["aliases"]
+            )
+            key = (coverage, product["observations"])
+            if best_key is None or key > best_key:
+                best_id, best_key = product_id, key
+
+        if best_key is None or best_key[0] < self.MIN_TOKEN_COVERAGE:
+            return None
+        return best_id
+
+    def mentions_storage(self, product: Dict, text: str) -> bool:
+        """
+        Whether text names the product's storage ("256GB" or "256 GB");
+        always true for products without storage.
+        """
+        storage_slug = "".join(self._TOKEN_RE.findall((product.get("storage") or "").lower()))
+        return not storage_slug or storage_slug in self._normalize_text(text).split()
+
+    def _normalize_text(self, text: Optional[str]) -> str:
+        # "256 GB" and "256GB" are the same token
+        text = self._CAPACITY_RE.sub(r"\1\2", (text or "").lower())
+        return " ".join(self._TOKEN_RE.findall(text))
+
+    def _normalize_code(self, code: Optional[str]) -> Optional[str]:
+        if not code:
+            return None
+        normalized = "".join(self._TOKEN_RE.findall(code.lower()))
+        return normalized or None
+
+
+# Global instance
+product_catalog = ProductCatalog()
@@ -0,0 +1,64 @@
+"""
+Request deadlines for marketplace research.
+
+A deadline is created once per request (from the caller's timeout header or
+a default) and passed down to the source clients, which clip their HTTP
+timeouts, rate-limit waits and retry backoffs to the remaining budget.
+"""
+import time
+import structlog
+from typing import Optional
+from config.settings import settings
+
+logger = structlog.get_logger()
+
+
+class Deadline:
+    """Monotonic time budget shared by everything serving one request."""
+
+    # Header carrying the caller's remaining timeout in milliseconds
+    HEADER = "X-Request-Timeout-Ms"
+
+    # Reserved to serialize and return the response before the caller gives up
+    RESPONSE_MARGIN = 0.5  # seconds
+
+    def __init__(self, budget_seconds: float):
+        self.budget = max(0.0, budget_seconds)
+        self.expires_at = time.monotonic() + self.budget
+
+    @classmethod
+    def default(cls) -> "Deadline":
+        """Deadline using the configured research budget."""
+        return cls(settings.research_deadline_seconds)
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> "Deadline":
+        """
+        Build a deadline from the caller's timeout header.
+
+        Falls back to the configured default when the header is missing or
+        invalid, and never exceeds it.
+        """
+        if value:
+            try:
+                budget = float(value) / 1000 - cls.RESPONSE_MARGIN
+                return cls(min(budget, settings.research_deadline_seconds))
+            except ValueError:
+                logger.warning("invalid_deadline_header", value=value)
+        return cls.default()
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def clip(self, seconds: float) -> float:
+        """Clip a timeout or wait to the remaining budget."""
+        return min(seconds, self.remaining())
+
+    def allows(self, seconds: float) -> bool:
+        """Whether a wait of this length still leaves time to do work after it."""
+        return self.remaining() > seconds
@@ -0,0 +1,227 @@
+"""
+Near-duplicate listing detection for marketplace data.
+Collapses relists and cross-posts before statistics are computed.
+
+Features:
+- MinHash signatures over normalized title shingles (one numpy pass per batch)
+- LSH banding so only likely pairs are compared (near-linear time)
+- Price proximity check so different items with similar titles are kept
+- Cross-listing signal required (other source, same URL or same seller),
+  so repeat sales of a catalog-titled item by different sellers are kept
+- Complete linkage: a listing joins a group only if it matches every
+  member, so close prices can't chain into one group
+"""
+import re
+import zlib
+import structlog
+import numpy as np
+from typing import List, Dict, Tuple
+from .models import MarketplaceListing
+
+logger = structlog.get_logger()
+
+
+class ListingDeduplicator:
+    """Collapses near-duplicate listings using MinHash/LSH over titles."""
+
+    # MinHash configuration: NUM_BANDS * ROWS_PER_BAND signatures
+    NUM_PERM = 64
+    NUM_BANDS = 16
+    ROWS_PER_BAND = 4
+
+    # Candidate pairs must clear both checks to be collapsed
+    # Commodity items sell repeatedly under identical titles at similar
+    # prices, so only near-identical prices count as the same listing
+    SIMILARITY_THRESHOLD = 0.85  # Estimated Jaccard similarity of titles
+    PRICE_TOLERANCE = 0.01  # Max relative price difference
+
+    # Mersenne prime for universal hashing (keeps products inside uint64)
+    _PRIME = np.uint64((1 << 31) - 1)
+
+    _TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, seed: int = 42):
+        rng = np.random.default_rng(seed)
+        prime = int(self._PRIME)
+        self._a = rng.integers(1, prime, size=(self.NUM_PERM, 1), dtype=np.uint64)
+        self._b = rng.integers(0, prime, size=(self.NUM_PERM, 1), dtype=np.uint64)
+
+    def deduplicate(
+        self,
+        listings: List[MarketplaceListing]
+    ) -> Tuple[List[MarketplaceListing], List[Dict]]:
+        """
+        Collapse near-duplicate listings in a single batch.
+
+        The first listing of each duplicate group is kept (sources are
+        combined eBay-first, so sold data wins over active cross-posts) and
+        annotated with the number of listings collapsed into it.
+
+        Args:
+            listings: Combined listings from all sources
+
+        Returns:
+            (kept listings, duplicate groups) where each group summarizes
+            the kept listing and the listings collapsed into it
+        """
+        if len(listings) < 2:
+            return listings, []
+
+        shingle_sets = [self._shingles(l.title) for l in listings]
+        indexed = [i for i, s in enumerate(shingle_sets) if len(s)]
+        if len(indexed) < 2:
+            return listings, []
+
+        signatures = self._signatures([shingle_sets[i] for i in indexed])
+        prices = np.array([listings[i].price for i in indexed], dtype=float)
+        sources = np.array([listings[i].source for i in indexed], dtype=object)
+        urls = np.array([listings[i].url for i in indexed], dtype=object)
+        sellers = np.array([listings[i].seller for i in indexed], dtype=object)
+
+        # Positions in `indexed` -> lower positions they match
+        matched: Dict[int, set] = {}
+        for band in range(self.NUM_BANDS):
+            start = band * self.ROWS_PER_BAND
+            rows = signatures[:, start:start + self.ROWS_PER_BAND]
+            buckets: Dict[bytes, List[int]] = {}
+            for pos in range(len(indexed)):
+                buckets.setdefault(rows[pos].tobytes(), []).append(pos)
+
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                members = np.array(members)
+                matches = self._duplicate_matrix(
+                    signatures[members],
+                    prices[members],
+                    sources[members],
+                    urls[members],
+                    sellers[members]
+                )
+                for j, k in np.argwhere(np.triu(matches, 1)):
+                    matched.setdefault(int(members[k]), set()).add(int(members[j]))
+
+        # Complete linkage in listing order: the lowest index represents its
+        # group, and a listing joins the first group it fully matches
+        groups: Dict[int, List[int]] = {}
+        for pos in range(len(indexed)):
+            lower = matched.get(pos, set())
+            for root in sorted(r for r in lower if r in groups):
+                if lower.issuperset(groups[root]):
+                    groups[root].append(pos)
+                    break
+            else:
+                groups[pos] = [pos]
+
+        dropped = set()
+        collapsed_counts: Dict[int, int] = {}
+        duplicate_groups = []
+        for root, members in groups.items():
+            if len(members) < 2:
+                continue
+            kept = indexed[root]
+            collapsed = [indexed[m] for m in members if m != root]
+            dropped.update(collapsed)
+            collapsed_counts[kept] = len(collapsed)
+            duplicate_groups.append({
+                "kept": self._summary(listings[kept]),
+                "collapsed": [self._summary(listings[i]) for i in collapsed]
+            })
+
+        if not dropped:
+            return listings, []
+
+        kept_listings = []
+        for i, listing in enumerate(listings):
+            if i in dropped:
+                continue
+            if i in collapsed_counts:
+                listing = listing.model_copy(
+                    update={"collapsed_count": collapsed_counts[i]}
+                )
+            kept_listings.append(listing)
+
+        logger.info(
+            "duplicate_listings_collapsed",
+            total=len(listings),
+            removed=len(dropped),
+            groups=len(duplicate_groups)
+        )
+
+        return kept_listings, duplicate_groups
+
+    def _summary(self, listing: MarketplaceListing) -> Dict:
+        """Compact description of a listing for duplicate annotations."""
+        return {
+            "title": listing.title,
+            "price": listing.price,
+            "source": listing.source,
+            "url": listing.url
+        }
+
+    def _shingles(self, title: str) -> np.ndarray:
+        """Hash normalized title tokens and word bigrams into 31-bit shingles."""
+        tokens = self._TOKEN_RE.findall(title.lower())
+        if not tokens:
+            return np.empty(0, dtype=np.uint64)
+
+        shingles = set(tokens)
+        shingles.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+        return np.fromiter(
+            (zlib.crc32(s.encode()) & 0x7FFFFFFF for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+
+    def _signatures(self, shingle_sets: List[np.ndarray]) -> np.ndarray:
+        """
+        Compute MinHash signatures for a batch of shingle sets.
+
+        All shingles are hashed in one (NUM_PERM x total_shingles) matrix
+        and reduced per listing with np.minimum.reduceat.
+
+        Returns:
+            Array of shape (len(shingle_sets), NUM_PERM)
+        """
+        lengths = np.array([len(s) for s in shingle_sets])
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        all_shingles = np.concatenate(shingle_sets)
+
+        hashed = (self._a * all_shingles[None, :] + self._b) % self._PRIME
+        return np.minimum.reduceat(hashed, offsets, axis=1).T
+
+    def _duplicate_matrix(
+        self,
+        signatures: np.ndarray,
+        prices: np.ndarray,
+        sources: np.ndarray,
+        urls: np.ndarray,
+        sellers: np.ndarray
+    ) -> np.ndarray:
+        """
+        Check all pairs in an LSH bucket at once.
+
+        Returns:
+            Boolean matrix marking pairs with similar titles, close prices
+            and a cross-listing signal
+        """
+        similarity = (signatures[:, None, :] == signatures[None, :, :]).mean(axis=2)
+        top = np.maximum(prices[:, None], prices[None, :])
+        price_gap = np.abs(prices[:, None] - prices[None, :])
+        close_price = (top > 0) & (price_gap <= self.PRICE_TOLERANCE * top)
+
+        # Same-source pairs are only one item if the URL or seller matches
+        has_url = urls != None  # noqa: E711 (elementwise on object arrays)
+        has_seller = sellers != None  # noqa: E711
+        cross_listed = (
+            (sources[:, None] != sources[None, :])
+            | ((urls[:, None] == urls[None, :]) & has_url[:, None] & has_url[None, :])
+            | ((sellers[:, None] == sellers[None, :]) & has_seller[:, None] & has_seller[None, :])
+        )
+
+        return (similarity >= self.SIMILARITY_THRESHOLD) & close_price & cross_listed
+
+
+# Global instance
+listing_deduplicator = ListingDeduplicator()
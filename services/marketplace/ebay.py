@@ -5,7 +5,9 @@ Primary source for fair market value calculations.
 Features:
 - Real-time scraping with rate limiting
 - Exponential backoff on errors
-- Health metrics tracking
+- Health metrics tracking (plus Prometheus latency histograms)
+- Request deadlines (timeouts and backoffs clipped to the remaining budget)
+- Single all-used-conditions query with normalized condition codes
 """
 import httpx
 import asyncio
@@ -14,6 +16,8 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from config.settings import settings
 from .models import MarketplaceListing
+from .deadline import Deadline
+from services.monitoring.metrics import metrics
 
 logger = structlog.get_logger()
 
@@ -39,6 +43,37 @@ class EBayClient:
     MAX_RETRIES = 3
     BASE_BACKOFF = 2.0  # seconds
 
+    # Condition filters per quote condition
+    CONDITION_FILTERS = {
+        "New": "NEW",
+        "Like New": "USED_EXCELLENT",
+        "Good": "USED_GOOD|USED_VERY_GOOD",
+        "Fair": "USED_ACCEPTABLE",
+        "Poor": "FOR_PARTS_OR_NOT_WORKING"
+    }
+    DEFAULT_CONDITION_FILTER = "USED_EXCELLENT|USED_GOOD|USED_VERY_GOOD"
+
+    # Condition codes covered by DEFAULT_CONDITION_FILTER
+    DEFAULT_CONDITION_CODES = ("Like New", "Good")
+
+    # Pass as `condition` to fetch every used condition in one query
+    ALL_USED_CONDITIONS = "all_used"
+    ALL_USED_CONDITION_FILTER = (
+        "USED_EXCELLENT|USED_VERY_GOOD|USED_GOOD|USED_ACCEPTABLE|FOR_PARTS_OR_NOT_WORKING"
+    )
+
+    # eBay conditionId -> normalized condition code (same buckets as the filters)
+    CONDITION_CODES = {
+        "1000": "New",
+        "1500": "New",
+        "2750": "Like New",
+        "3000": "Like New",
+        "4000": "Good",
+        "5000": "Good",
+        "6000": "Fair",
+        "7000": "Poor"
+    }
+
     def __init__(self):
         self.app_id = settings.ebay_app_id
         self.cert_id = settings.ebay_cert_id
@@ -62,7 +97,11 @@ class EBayClient:
         condition: Optional[str] = None,
         sold_within_days: int = 90,
         limit: int = 50,
-        real_time: bool = False
+        offset: int = 0,
+        sort: str = "price",
+        real_time: bool = False,
+        deadline: Optional[Deadline] = None,
+        gtin: Optional[str] = None
     ) -> List[MarketplaceListing]:
         """
         Search eBay for sold listings with real-time capability.
@@ -70,10 +109,15 @@ class EBayClient:
         Args:
             query: Search query (brand, model, etc.)
             category: eBay category filter
-            condition: Condition filter (Used, New, etc.)
+            condition: Condition filter (New, Like New, Good, Fair, Poor), or
+                ALL_USED_CONDITIONS for every used condition in one query
             sold_within_days: Limit to items sold in last N days (default: 90)
             limit: Maximum number of results (default: 50)
+            offset: Number of results to skip, for fetching follow-up pages
+            sort: Browse API sort order (default: "price")
             real_time: If True, bypass cache and fetch live data
+            deadline: Request deadline; retries stop once it can't be met
+            gtin: UPC/EAN to match exactly (query may then be empty)
 
         Returns:
             List of MarketplaceListing objects
@@ -86,27 +130,37 @@ class EBayClient:
         logger.info(
             "searching_ebay_sold_listings",
             query=query,
+            gtin=gtin,
             condition=condition,
             days=sold_within_days,
             real_time=real_time
         )
 
         # Apply rate limiting
-        await self._rate_limit()
+        await self._rate_limit(deadline)
 
         # Ensure we have a valid access token
-        await self._ensure_access_token()
+        await self._ensure_access_token(deadline)
 
         # Build search parameters
         params = {
-            "q": query,
             "filter": self._build_filters(condition, sold_within_days),
             "limit": min(limit, 200),  # eBay max is 200
-            "sort": "price"  # Sort by price for consistent results
+            "sort": sort  # Price order by default for consistent results
         }
+        if query:
+            params["q"] = query
+        if gtin:
+            params["gtin"] = gtin
+        if offset:
+            params["offset"] = offset
 
         # Try with retries and exponential backoff
         for attempt in range(self.MAX_RETRIES):
+            if deadline and deadline.expired:
+                logger.warning("ebay_deadline_exceeded", attempt=attempt + 1)
+                return []
+
             try:
                 start_time = datetime.now()
                 self.metrics["total_requests"] += 1
@@ -119,13 +173,22 @@ class EBayClient:
                             "Authorization": f"Bearer {self.access_token}",
                             "X-EBAY-C-MARKETPLACE-ID": "EBAY_US"
                         },
-                        timeout=30.0
+                        timeout=deadline.clip(30.0) if deadline else 30.0
                     )
 
                     # Track response time
                     response_time = (datetime.now() - start_time).total_seconds()
                     self.metrics["total_response_time"] += response_time
 
+                    if response.status_code == 429:
+                        metrics.observe_source("ebay", "rate_limited", response_time)
+                    elif response.status_code == 403:
+                        metrics.observe_source("ebay", "blocked", response_time)
+                    elif response.is_error:
+                        metrics.observe_source("ebay", "http_error", response_time)
+                    else:
+                        metrics.observe_source("ebay", "ok", response_time)
+
                     response.raise_for_status()
                     data = response.json()
 
@@ -144,6 +207,11 @@ class EBayClient:
 
                     return listings
 
+            except asyncio.CancelledError:
+                # Abandoned at the research deadline
+                metrics.observe_source("ebay", "cancelled", (datetime.now() - start_time).total_seconds())
+                raise
+
             except httpx.HTTPStatusError as e:
                 # Check for rate limiting (429) or blocked IP
                 if e.response.status_code == 429:
@@ -158,8 +226,8 @@ class EBayClient:
                     logger.error("ebay_blocked_ip", attempt=attempt + 1)
 
                 # Exponential backoff
-                if attempt < self.MAX_RETRIES - 1:
-                    backoff_time = self.BASE_BACKOFF * (2 ** attempt)
+                backoff_time = self.BASE_BACKOFF * (2 ** attempt)
+                if attempt < self.MAX_RETRIES - 1 and self._can_retry(backoff_time, deadline):
                     logger.info("retrying_with_backoff", backoff_seconds=backoff_time)
                     await asyncio.sleep(backoff_time)
                 else:
@@ -168,12 +236,15 @@ class EBayClient:
                     return []
 
             except httpx.HTTPError as e:
+                outcome = "timeout" if isinstance(e, httpx.TimeoutException) else "error"
+                metrics.observe_source("ebay", outcome, (datetime.now() - start_time).total_seconds())
                 self.metrics["failed_requests"] += 1
                 logger.error("ebay_api_error", error=str(e), attempt=attempt + 1)
-                if attempt >= self.MAX_RETRIES - 1:
+                backoff_time = self.BASE_BACKOFF * (2 ** attempt)
+                if attempt >= self.MAX_RETRIES - 1 or not self._can_retry(backoff_time, deadline):
                     return []
                 # Retry with backoff
-                await asyncio.sleep(self.BASE_BACKOFF * (2 ** attempt))
+                await asyncio.sleep(backoff_time)
 
         return []
 
@@ -185,17 +256,12 @@ class EBayClient:
         filters.append("buyingOptions:{FIXED_PRICE}")
 
         # Condition filter — use specific condition if provided, otherwise broad default
-        condition_map = {
-            "New": "NEW",
-            "Like New": "USED_EXCELLENT",
-            "Good": "USED_GOOD|USED_VERY_GOOD",
-            "Fair": "USED_ACCEPTABLE",
-            "Poor": "FOR_PARTS_OR_NOT_WORKING"
-        }
-        if condition and condition in condition_map:
-            filters.append(f"conditions:{{{condition_map[condition]}}}")
+        if condition == self.ALL_USED_CONDITIONS:
+            filters.append(f"conditions:{{{self.ALL_USED_CONDITION_FILTER}}}")
+        elif condition and condition in self.CONDITION_FILTERS:
+            filters.append(f"conditions:{{{self.CONDITION_FILTERS[condition]}}}")
         else:
-            filters.append("conditions:{USED_EXCELLENT|USED_GOOD|USED_VERY_GOOD}")
+            filters.append(f"conditions:{{{self.DEFAULT_CONDITION_FILTER}}}")
 
         # Date filter (sold within last N days)
         cutoff_date = datetime.now() - timedelta(days=sold_within_days)
@@ -235,10 +301,12 @@ class EBayClient:
                     title=item.get("title", ""),
                     price=price,
                     condition=condition,
+                    condition_code=self.CONDITION_CODES.get(str(item.get("conditionId", ""))),
                     sold_date=sold_date,
                     shipping=shipping_cost,
                     source="ebay",
-                    url=item.get("itemWebUrl")
+                    url=item.get("itemWebUrl"),
+                    seller=(item.get("seller") or {}).get("username")
                 )
 
                 listings.append(listing)
@@ -249,22 +317,39 @@ class EBayClient:
 
         return listings
 
-    async def _rate_limit(self):
+    def _can_retry(self, backoff_time: float, deadline: Optional[Deadline]) -> bool:
+        """Check whether a retry after backoff still fits the request deadline."""
+        if deadline is None or deadline.allows(backoff_time):
+            return True
+        logger.warning(
+            "ebay_retry_skipped_deadline",
+            backoff_seconds=backoff_time,
+            remaining_seconds=round(deadline.remaining(), 2)
+        )
+        return False
+
+    async def _rate_limit(self, deadline: Optional[Deadline] = None):
         """
         Apply rate limiting: 1 request per second.
 
         Ensures we don't exceed eBay's rate limits and avoid IP bans.
+        Each caller reserves the next free slot before sleeping, so
+        concurrent searches (query fan-out) are spaced out as well.
         """
+        now = datetime.now()
+        slot = now
         if self.last_request_time:
-            elapsed = (datetime.now() - self.last_request_time).total_seconds()
-            if elapsed < self.MIN_REQUEST_INTERVAL:
-                sleep_time = self.MIN_REQUEST_INTERVAL - elapsed
-                logger.debug("rate_limiting", sleep_seconds=round(sleep_time, 2))
-                await asyncio.sleep(sleep_time)
+            slot = max(now, self.last_request_time + timedelta(seconds=self.MIN_REQUEST_INTERVAL))
+        self.last_request_time = slot
 
-        self.last_request_time = datetime.now()
+        sleep_time = (slot - now).total_seconds()
+        if sleep_time > 0:
+            if deadline:
+                sleep_time = deadline.clip(sleep_time)
+            logger.debug("rate_limiting", sleep_seconds=round(sleep_time, 2))
+            await asyncio.sleep(sleep_time)
 
-    async def _ensure_access_token(self):
+    async def _ensure_access_token(self, deadline: Optional[Deadline] = None):
         """Ensure we have a valid OAuth access token."""
         # Check if token is still valid
         if self.access_token and self.token_expires_at:
@@ -283,7 +368,7 @@ class EBayClient:
                         "scope": "https://api.ebay.com/oauth/api_scope"
                     },
                     auth=(self.app_id, self.cert_id),
-                    timeout=10.0
+                    timeout=deadline.clip(10.0) if deadline else 10.0
                 )
                 response.raise_for_status()
                 data = response.json()
@@ -7,6 +7,8 @@ Features:
 - Location-based search
 - Price/condition extraction
 - Error handling and retries
+- Request deadlines (page loads and backoffs clipped to the remaining budget)
+- Prometheus latency histograms per attempt and outcome
 
 Note:
     Facebook Marketplace requires browser automation due to dynamic content.
@@ -18,6 +20,8 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 from .models import MarketplaceListing
+from .deadline import Deadline
+from services.monitoring.metrics import metrics
 
 logger = structlog.get_logger()
 
@@ -64,7 +68,8 @@ class FacebookMarketplaceClient:
         query: str,
         category: Optional[str] = None,
         location: str = "United States",
-        limit: int = 20
+        limit: int = 20,
+        deadline: Optional[Deadline] = None
     ) -> List[MarketplaceListing]:
         """
         Search Facebook Marketplace for listings.
@@ -74,6 +79,7 @@ class FacebookMarketplaceClient:
             category: Category filter (optional)
             location: Location for search (default: "United States")
             limit: Maximum number of results (default: 20)
+            deadline: Request deadline; retries stop once it can't be met
 
         Returns:
             List of MarketplaceListing objects
@@ -92,10 +98,14 @@ class FacebookMarketplaceClient:
         )
 
         # Apply rate limiting
-        await self._rate_limit()
+        await self._rate_limit(deadline)
 
         # Try with retries and exponential backoff
         for attempt in range(self.MAX_RETRIES):
+            if deadline and deadline.expired:
+                logger.warning("facebook_deadline_exceeded", attempt=attempt + 1)
+                return []
+
             try:
                 start_time = datetime.now()
                 self.metrics["total_requests"] += 1
@@ -108,12 +118,13 @@ class FacebookMarketplaceClient:
                 search_url = self._build_search_url(query, category, location)
 
                 # Fetch and parse listings
-                listings = await self._scrape_listings(search_url, limit)
+                listings = await self._scrape_listings(search_url, limit, deadline)
 
                 # Track response time
                 response_time = (datetime.now() - start_time).total_seconds()
                 self.metrics["total_response_time"] += response_time
                 self.metrics["successful_requests"] += 1
+                metrics.observe_source("facebook", "ok", response_time)
 
                 logger.info(
                     "facebook_search_completed",
@@ -125,15 +136,21 @@ class FacebookMarketplaceClient:
 
                 return listings
 
+            except asyncio.CancelledError:
+                # Abandoned at the research deadline
+                metrics.observe_source("facebook", "cancelled", (datetime.now() - start_time).total_seconds())
+                raise
+
             except PlaywrightTimeout as e:
+                metrics.observe_source("facebook", "timeout", (datetime.now() - start_time).total_seconds())
                 logger.warning(
                     "facebook_timeout",
                     attempt=attempt + 1,
                     error=str(e)
                 )
                 # Retry with backoff
-                if attempt < self.MAX_RETRIES - 1:
-                    backoff_time = self.BASE_BACKOFF * (2 ** attempt)
+                backoff_time = self.BASE_BACKOFF * (2 ** attempt)
+                if attempt < self.MAX_RETRIES - 1 and self._can_retry(backoff_time, deadline):
                     await asyncio.sleep(backoff_time)
                 else:
                     self.metrics["failed_requests"] += 1
@@ -141,6 +158,7 @@ class FacebookMarketplaceClient:
                     return []
 
             except Exception as e:
+                metrics.observe_source("facebook", "error", (datetime.now() - start_time).total_seconds())
                 self.metrics["failed_requests"] += 1
                 logger.error(
                     "facebook_scrape_error",
@@ -148,8 +166,9 @@ class FacebookMarketplaceClient:
                     attempt=attempt + 1
                 )
                 # Retry with backoff
-                if attempt < self.MAX_RETRIES - 1:
-                    await asyncio.sleep(self.BASE_BACKOFF * (2 ** attempt))
+                backoff_time = self.BASE_BACKOFF * (2 ** attempt)
+                if attempt < self.MAX_RETRIES - 1 and self._can_retry(backoff_time, deadline):
+                    await asyncio.sleep(backoff_time)
                 else:
                     return []
 
@@ -199,7 +218,8 @@ class FacebookMarketplaceClient:
     async def _scrape_listings(
         self,
         url: str,
-        limit: int
+        limit: int,
+        deadline: Optional[Deadline] = None
     ) -> List[MarketplaceListing]:
         """
         Scrape listings from Facebook Marketplace page.
@@ -207,6 +227,7 @@ class FacebookMarketplaceClient:
         Args:
             url: Search URL
             limit: Maximum listings to return
+            deadline: Request deadline used to clip page timeouts
 
         Returns:
             List of MarketplaceListing objects
@@ -219,17 +240,19 @@ class FacebookMarketplaceClient:
 
         try:
             # Navigate to search page
-            await page.goto(url, timeout=self.PAGE_TIMEOUT)
+            await page.goto(url, timeout=self._page_timeout(self.PAGE_TIMEOUT, deadline))
 
             # Wait for listings to load
             # Note: Selectors may need adjustment based on Facebook's HTML structure
             await page.wait_for_selector(
                 '[data-testid="marketplace_search_results"]',
-                timeout=10000
+                timeout=self._page_timeout(10000, deadline)
             )
 
             # Scroll to load more listings
             for _ in range(3):  # Scroll 3 times to load ~20 items
+                if deadline and not deadline.allows(1.0):
+                    break
                 await page.evaluate("window.scrollBy(0, window.innerHeight)")
                 await asyncio.sleep(1)
 
@@ -299,6 +322,7 @@ class FacebookMarketplaceClient:
                 title=title.strip(),
                 price=price,
                 condition=condition,
+                condition_code=condition if condition != "Unknown" else None,
                 sold_date=None,  # Facebook doesn't show sold dates for active listings
                 shipping=0.0,  # Typically local pickup
                 source="facebook",
@@ -309,7 +333,25 @@ class FacebookMarketplaceClient:
             logger.debug("listing_parse_error", error=str(e))
             return None
 
-    async def _rate_limit(self):
+    def _page_timeout(self, timeout_ms: float, deadline: Optional[Deadline]) -> float:
+        """Clip a Playwright timeout (milliseconds) to the request deadline."""
+        if deadline is None:
+            return timeout_ms
+        # Playwright treats 0 as "no timeout", so keep at least 1ms
+        return max(1.0, min(timeout_ms, deadline.remaining() * 1000))
+
+    def _can_retry(self, backoff_time: float, deadline: Optional[Deadline]) -> bool:
+        """Check whether a retry after backoff still fits the request deadline."""
+        if deadline is None or deadline.allows(backoff_time):
+            return True
+        logger.warning(
+            "facebook_retry_skipped_deadline",
+            backoff_seconds=backoff_time,
+            remaining_seconds=round(deadline.remaining(), 2)
+        )
+        return False
+
+    async def _rate_limit(self, deadline: Optional[Deadline] = None):
         """
         Apply rate limiting: 1 request per second.
 
@@ -319,6 +361,8 @@ class FacebookMarketplaceClient:
             elapsed = (datetime.now() - self.last_request_time).total_seconds()
             if elapsed < self.MIN_REQUEST_INTERVAL:
                 sleep_time = self.MIN_REQUEST_INTERVAL - elapsed
+                if deadline:
+                    sleep_time = deadline.clip(sleep_time)
                 logger.debug("rate_limiting_facebook", sleep_seconds=round(sleep_time, 2))
                 await asyncio.sleep(sleep_time)
 
@@ -11,24 +11,39 @@ class MarketplaceListing(BaseModel):
     title: str
     price: float
     condition: str
+    condition_code: Optional[str] = None  # Normalized: New, Like New, Good, Fair, Poor
     sold_date: Optional[datetime] = None
     shipping: float = 0.0
     source: str  # 'ebay', 'amazon', 'google'
     url: Optional[str] = None
+    seller: Optional[str] = None
+    collapsed_count: int = 0  # Near-duplicates merged into this listing
 
 
 class MarketplaceStats(BaseModel):
     """Statistical analysis of marketplace data."""
     count: int = Field(..., description="Number of listings found")
-    median: float = Field(..., description="Median price")
-    mean: float = Field(..., description="Mean (average) price")
+    median: float = Field(..., description="Median price (recency-weighted)")
+    mean: float = Field(..., description="Mean (average) price (recency-weighted)")
     std_dev: float = Field(..., description="Standard deviation")
     percentiles: Dict[str, float] = Field(
         default_factory=dict,
-        description="Percentile data (p25, p50, p75)"
+        description="Recency-weighted percentile data (p25, p50, p75)"
     )
     min_price: Optional[float] = None
     max_price: Optional[float] = None
+    median_ci: Optional[List[float]] = Field(
+        None,
+        description="Bootstrap 95% confidence interval of the median [low, high]"
+    )
+    mean_ci: Optional[List[float]] = Field(
+        None,
+        description="Bootstrap 95% confidence interval of the (recency-weighted) mean [low, high]"
+    )
+    sources: Optional[Dict[str, Dict]] = Field(
+        None,
+        description="Per-source stats (count, median, mean, std_dev, p25, p75) for FMV fusion"
+    )
 
 
 class MarketplaceResearchRequest(BaseModel):
@@ -39,13 +54,29 @@ class MarketplaceResearchRequest(BaseModel):
     )
     category: str
     condition: Optional[str] = None
+    adaptive: Optional[bool] = Field(
+        None,
+        description="Adaptive sample sizing (defaults to server setting)"
+    )
+    stratify_conditions: Optional[bool] = Field(
+        None,
+        description="Fetch all used conditions once and cache per-condition stats "
+                    "(defaults to server setting)"
+    )
 
 
 class MarketplaceResearchResponse(BaseModel):
     """Response from marketplace research."""
+    product_id: Optional[str] = Field(None, description="Canonical catalog product id")
     listings: List[MarketplaceListing]
     stats: MarketplaceStats
     sources_checked: List[str]
+    data_freshness: Optional[str] = None  # 'live', 'partial', 'stale'
+    deadline_exceeded: bool = False
+    condition_stats: Optional[Dict[str, MarketplaceStats]] = Field(
+        None,
+        description="Per-condition stats from the same fetch (stratified research)"
+    )
     cache_hit: bool = False
 
     class Config:
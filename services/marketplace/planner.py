@@ -0,0 +1,234 @@
+"""
+Query fan-out planner for marketplace research.
+
+Searching by UPC, by model number or by "brand model variant storage" gives
+very different hit quality depending on the item. The planner builds ranked
+query variants from the identification and runs the best few concurrently.
+
+Features:
+- Ranked variants from ProductIdentifiers and ProductMetadata
+- Concurrent eBay searches, spaced by the client's rate limiter
+- Early stop once one variant returns a statistically sufficient sample
+- Merged results in variant rank order, exact relists dropped by URL
+"""
+import asyncio
+import structlog
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from .models import MarketplaceListing
+from .ebay import ebay_client
+from .relevance import title_relevance_scorer
+from .deadline import Deadline
+
+logger = structlog.get_logger()
+
+
+class QueryVariant(BaseModel):
+    """One way of searching for a product."""
+    kind: str  # 'gtin', 'model_number', 'full', 'broad'
+    query: str
+    gtin: Optional[str] = None
+    score: float  # Expected hit quality, higher is better
+
+
+class QueryPlanner:
+    """Plans and runs ranked query variants for one product."""
+
+    # Expected hit quality per strategy: exact identifiers first
+    VARIANT_SCORES = {
+        "gtin": 1.0,
+        "model_number": 0.9,
+        "full": 0.8,
+        "broad": 0.6
+    }
+
+    # Variants searched concurrently per batch
+    MAX_FANOUT = 3
+
+    # Time a variant needs after waiting for its rate-limit slot
+    MIN_VARIANT_SECONDS = 2.0
+
+    # A variant's sample is sufficient once it has this many relevant
+    # listings with a coefficient of variation under the limit
+    SUFFICIENT_COUNT = 20
+    SUFFICIENT_MAX_CV = 0.35
+
+    def plan(
+        self,
+        brand: str,
+        model: str,
+        identifiers: Optional[Any] = None,
+        metadata: Optional[Any] = None
+    ) -> List[QueryVariant]:
+        """
+        Build ranked query variants for a product.
+
+        Args:
+            brand: Brand name
+            model: Model name
+            identifiers: ProductIdentifiers (or dict) with upc/ean/model_number
+            metadata: ProductMetadata (or dict) with variant/storage/generation
+
+        Returns:
+            Variants ordered best first; the last is always "brand model"
+        """
+        variants = []
+
+        gtin = self._field(identifiers, "upc") or self._field(identifiers, "ean")
+        if gtin:
+            variants.append(QueryVariant(
+                kind="gtin", query="", gtin=gtin, score=self.VARIANT_SCORES["gtin"]
+            ))
+
+        model_number = self._field(identifiers, "model_number")
+        if model_number:
+            variants.append(QueryVariant(
+                kind="model_number",
+                query=f"{brand} {model_number}".strip(),
+                score=self.VARIANT_SCORES["model_number"]
+            ))
+
+        broad = f"{brand} {model}".strip()
+        words = broad.lower().split()
+        extras = []
+        for name in ("variant", "generation", "storage"):
+            value = self._field(metadata, name)
+            if value and not all(w in words for w in str(value).lower().split()):
+                extras.append(str(value))
+                words.extend(str(value).lower().split())
+        if extras:
+            variants.append(QueryVariant(
+                kind="full",
+                query=" ".join([broad] + extras),
+                score=self.VARIANT_SCORES["full"]
+            ))
+
+        variants.append(QueryVariant(
+            kind="broad", query=broad, score=self.VARIANT_SCORES["broad"]
+        ))
+
+        return sorted(variants, key=lambda v: -v.score)
+
+    async def search(
+        self,
+        variants: List[QueryVariant],
+        brand: str,
+        model: str,
+        deadline: Deadline,
+        **search_kwargs
+    ) -> Tuple[List[MarketplaceListing], Dict]:
+        """
+        Search the top variants concurrently and merge the results.
+
+        Stops as soon as one variant's sample is sufficient and cancels the
+        rest. A failure is only raised if every variant failed.
+
+        Args:
+            variants: Ranked variants from plan()
+            brand: Brand name (for relevance checks)
+            model: Model name (for relevance checks)
+            deadline: Request deadline
+            **search_kwargs: Passed through to ebay_client.search_sold_listings
+
+        Returns:
+            (merged listings, plan report)
+        """
+        selected = [
+            variant for rank, variant in enumerate(variants[:self.MAX_FANOUT])
+            if rank == 0 or deadline.allows(
+                rank * ebay_client.MIN_REQUEST_INTERVAL + self.MIN_VARIANT_SECONDS
+            )
+        ]
+
+        tasks = {
+            asyncio.create_task(ebay_client.search_sold_listings(
+                query=variant.query,
+                gtin=variant.gtin,
+                deadline=deadline,
+                **search_kwargs
+            )): variant
+            for variant in selected
+        }
+        results: Dict[str, List[MarketplaceListing]] = {}
+        errors: List[Exception] = []
+        sufficient = None
+
+        try:
+            pending = set(tasks)
+            while pending and sufficient is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    variant = tasks[task]
+                    try:
+                        results[variant.kind] = task.result()
+                    except Exception as e:
+                        logger.warning("query_variant_failed", kind=variant.kind, error=str(e))
+                        errors.append(e)
+                        continue
+                    if sufficient is None and self._is_sufficient(results[variant.kind], brand, model):
+                        sufficient = variant.kind
+        finally:
+            # Early stop, or the caller was cancelled at its deadline
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+        if not results and errors:
+            raise errors[0]
+
+        merged = []
+        seen_urls = set()
+        for variant in selected:
+            for listing in results.get(variant.kind, []):
+                if listing.url:
+                    if listing.url in seen_urls:
+                        continue
+                    seen_urls.add(listing.url)
+                merged.append(listing)
+
+        report = {
+            "variants": [
+                {
+                    "kind": variant.kind,
+                    "query": variant.query or variant.gtin,
+                    "count": len(results[variant.kind]) if variant.kind in results else None
+                }
+                for variant in selected
+            ],
+            "stopped_early_on": sufficient
+        }
+
+        logger.info(
+            "query_fanout_completed",
+            variants=[v.kind for v in selected],
+            stopped_early_on=sufficient,
+            merged=len(merged)
+        )
+
+        return merged, report
+
+    def _is_sufficient(
+        self,
+        listings: List[MarketplaceListing],
+        brand: str,
+        model: str
+    ) -> bool:
+        """Whether one variant's relevant listings are enough to price from."""
+        relevant = title_relevance_scorer.filter_listings(listings, brand, model)
+        prices = np.array([l.price for l in relevant if l.price > 0], dtype=float)
+        if len(prices) < self.SUFFICIENT_COUNT:
+            return False
+        return float(np.std(prices) / np.mean(prices)) <= self.SUFFICIENT_MAX_CV
+
+    def _field(self, source: Optional[Any], name: str) -> Optional[str]:
+        """Read a field from a pydantic model or dict."""
+        if source is None:
+            return None
+        if isinstance(source, dict):
+            return source.get(name)
+        return getattr(source, name, None)
+
+
+# Global instance
+query_planner = QueryPlanner()
@@ -0,0 +1,286 @@
+"""
+Pre-warming scheduler for high-demand product research.
+
+A few hundred products make up most of the traffic, and a cold cache miss
+costs a multi-second scrape. The warmer tracks demand per canonical product
+and refreshes the per-product condition-stats cache before it expires.
+
+Features:
+- Count-min sketch for request frequency (fixed memory, periodic decay)
+- Top-N hot products refreshed before their TTL, around the clock
+- Long-tail products refreshed only in the off-peak window
+- Refreshes capped at a configurable share of the eBay rate budget,
+  charged by the number of query variants each refresh will search
+- Background refreshes don't count as demand (catalog, autocomplete)
+- One warmer per tick across workers (Redis lock), so the budget is spent
+  once cluster-wide, and a shared per-product claim so no two workers
+  refresh the same product within one refresh window
+"""
+import time
+import zlib
+import asyncio
+import structlog
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from .aggregator import marketplace_aggregator
+from .catalog import product_catalog
+from .ebay import ebay_client
+from .planner import query_planner
+from services.cache.redis_client import redis_cache
+from config.settings import settings
+
+logger = structlog.get_logger()
+
+
+class CountMinSketch:
+    """Approximate per-key counts in fixed memory (never under-counts)."""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.table = np.zeros((depth, width), dtype=np.uint32)
+        self._rows = np.arange(depth)
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Add to a key's count and return its new estimate."""
+        cols = self._columns(key)
+        self.table[self._rows, cols] += count
+        return int(self.table[self._rows, cols].min())
+
+    def estimate(self, key: str) -> int:
+        """Estimated count for a key."""
+        return int(self.table[self._rows, self._columns(key)].min())
+
+    def decay(self):
+        """Halve every count so estimates follow recent demand."""
+        self.table >>= 1
+
+    def _columns(self, key: str) -> np.ndarray:
+        data = key.encode("utf-8")
+        return np.array(
+            [zlib.crc32(data, seed) % self.width for seed in range(len(self._rows))]
+        )
+
+
+class ResearchPrewarmer:
+    """Refreshes cached research for popular products before it expires."""
+
+    TICK_SECONDS = 60.0
+
+    # Refresh once an entry has used this share of its TTL
+    REFRESH_AT = 0.8
+
+    # Halve demand counts this often (seconds)
+    DECAY_INTERVAL = 3600.0
+
+    # Long-tail products need at least this much demand to be warmed
+    LONG_TAIL_MIN_COUNT = 2
+
+    # Products tracked for warming; the least requested are dropped
+    MAX_TRACKED = 2000
+
+    # Held by the worker warming this tick (expires just before the next)
+    LOCK_KEY = "prewarm:lock"
+
+    # Per-product claim: set by whichever worker refreshes the product
+    CLAIM_KEY_PREFIX = "prewarm:refreshed:"
+
+    def __init__(self):
+        self.sketch = CountMinSketch()
+        self.tracked: Dict[str, Dict] = {}
+        self._last_decay = time.monotonic()
+
+    def record(
+        self,
+        brand: str,
+        model: str,
+        category: str,
+        product_id: Optional[str] = None,
+        refreshed: bool = False
+    ):
+        """
+        Count one research request (O(1), safe on the request path).
+
+        Args:
+            brand: Brand name as requested
+            model: Model name as requested
+            category: Product category
+            product_id: Canonical product id, if resolved
+            refreshed: True if the request fetched live data (cache miss),
+                which resets the entry's age
+        """
+        product = product_id or product_catalog.canonical_id(brand, model)
+        if not product:
+            return
+
+        key = f"{product}|{category}"
+        self.sketch.add(key)
+
+        entry = self.tracked.setdefault(key, {
+            "product_id": product,
+            "brand": brand,
+            "model": model,
+            "category": category,
+            "refreshed_at": None
+        })
+        if refreshed:
+            entry["refreshed_at"] = time.monotonic()
+
+    def plan_refreshes(self, budget: int, now: float, hour: int) -> List[str]:
+        """
+        Pick the products to refresh this tick.
+
+        Hot products (top-N by demand) come first; the long tail is only
+        considered in the off-peak window.
+
+        Args:
+            budget: Maximum eBay requests this tick
+            now: Current monotonic time
+            hour: Current UTC hour
+
+        Returns:
+            Keys to refresh, most requested first
+        """
+        counts = {key: self.sketch.estimate(key) for key in self.tracked}
+        ranked = sorted(counts, key=counts.get, reverse=True)
+
+        for key in ranked[self.MAX_TRACKED:]:
+            del self.tracked[key]
+        ranked = ranked[:self.MAX_TRACKED]
+
+        candidates = ranked[:settings.prewarm_top_n]
+        if self._is_off_peak(hour):
+            candidates += [
+                key for key in ranked[settings.prewarm_top_n:]
+                if counts[key] >= self.LONG_TAIL_MIN_COUNT
+            ]
+
+        planned = []
+        for key in candidates:
+            entry = self.tracked[key]
+            if not self._is_due(entry, now):
+                continue
+            cost = self._request_cost(entry)
+            if cost > budget:
+                break
+            budget -= cost
+            planned.append(key)
+        return planned
+
+    async def warm_once(self, interval: float = TICK_SECONDS) -> int:
+        """
+        Run one tick: refresh due products within the rate budget.
+
+        Returns:
+            Number of products refreshed
+        """
+        if not settings.condition_stratified_stats:
+            # Refreshes fill the condition-stats cache; nothing reads it
+            return 0
+
+        now = time.monotonic()
+        if now - self._last_decay >= self.DECAY_INTERVAL:
+            self.sketch.decay()
+            self._last_decay = now
+
+        if not self._acquire_tick(interval):
+            # Another worker is warming this tick with the shared budget
+            return 0
+
+        # eBay requests this tick; each refresh is charged for its variants
+        budget = int(settings.prewarm_rate_share * interval / ebay_client.MIN_REQUEST_INTERVAL)
+        keys = self.plan_refreshes(budget, now, datetime.now(tz=timezone.utc).hour)
+
+        refreshed = 0
+        for key in keys:
+            entry = self.tracked.get(key)
+            if entry is None:
+                continue
+            if not self._claim(key):
+                # Refreshed by another worker within the refresh window
+                entry["refreshed_at"] = time.monotonic()
+                continue
+            try:
+                await marketplace_aggregator.research_product(
+                    brand=entry["brand"],
+                    model=entry["model"],
+                    category=entry["category"],
+                    use_live_data=False,  # eBay sold data only; no browser scrape
+                    adaptive=False,
+                    stratify_conditions=True,
+                    refresh_cache=True,
+                    record_demand=False  # Warming must not feed popularity
+                )
+                entry["refreshed_at"] = time.monotonic()
+                refreshed += 1
+            except Exception as e:
+                logger.error("prewarm_refresh_failed", key=key, error=str(e))
+                self._release_claim(key)  # Let the next tick retry it
+
+        if keys:
+            logger.info("prewarm_tick_completed", due=len(keys), refreshed=refreshed, budget=budget)
+
+        return refreshed
+
+    async def run(self, interval: float = TICK_SECONDS):
+        """Warm on a fixed interval until cancelled."""
+        if not settings.condition_stratified_stats:
+            logger.warning("prewarm_disabled", reason="condition_stratified_stats is off")
+            return
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.warm_once(interval)
+            except Exception as e:
+                logger.error("prewarm_tick_failed", error=str(e))
+
+    def _acquire_tick(self, interval: float) -> bool:
+        """Take the cluster-wide warming lock for this tick."""
+        try:
+            ttl = max(1, int(interval * 0.9))
+            return bool(redis_cache.client.set(self.LOCK_KEY, "1", nx=True, ex=ttl))
+        except Exception as e:
+            # Without coordination every worker would spend the full budget
+            logger.warning("prewarm_lock_unavailable", error=str(e))
+            return False
+
+    def _claim(self, key: str) -> bool:
+        """Claim a product's refresh until it is due again."""
+        ttl = max(1, int(marketplace_aggregator.CONDITION_STATS_TTL * self.REFRESH_AT))
+        try:
+            return bool(redis_cache.client.set(self.CLAIM_KEY_PREFIX + key, "1", nx=True, ex=ttl))
+        except Exception as e:
+            logger.warning("prewarm_claim_unavailable", key=key, error=str(e))
+            return False
+
+    def _release_claim(self, key: str):
+        try:
+            redis_cache.client.delete(self.CLAIM_KEY_PREFIX + key)
+        except Exception as e:
+            logger.warning("prewarm_claim_unavailable", key=key, error=str(e))
+
+    def _request_cost(self, entry: Dict) -> int:
+        """eBay requests one refresh makes (the research query variants)."""
+        product = product_catalog.get(entry["product_id"])
+        if product is None:
+            return 1
+        metadata = {"storage": product["storage"]} if product["storage"] else None
+        variants = query_planner.plan(product["brand"], product["model"], None, metadata)
+        return min(len(variants), query_planner.MAX_FANOUT)
+
+    def _is_due(self, entry: Dict, now: float) -> bool:
+        if entry["refreshed_at"] is None:
+            return True
+        max_age = marketplace_aggregator.CONDITION_STATS_TTL * self.REFRESH_AT
+        return now - entry["refreshed_at"] >= max_age
+
+    def _is_off_peak(self, hour: int) -> bool:
+        start = settings.prewarm_off_peak_start_hour
+        end = settings.prewarm_off_peak_end_hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end  # Window wraps past midnight
+
+
+# Global instance
+research_prewarmer = ResearchPrewarmer()
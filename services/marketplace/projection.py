@@ -0,0 +1,64 @@
+"""
+Response field projection for listing-heavy endpoints.
+
+`fields=stats,listings.price,listings.source` returns only those parts of a
+response. Callers describe each top-level field with a builder, so excluded
+parts (usually the listing arrays) are never built or serialized.
+"""
+from typing import Any, Callable, Dict, Optional, Set
+
+
+class FieldProjection:
+    """Parsed `fields=` parameter: top-level fields and optional sub-fields."""
+
+    def __init__(self, fields: str):
+        self.fields: Dict[str, Optional[Set[str]]] = {}
+        for path in fields.split(","):
+            path = path.strip()
+            if not path:
+                continue
+            top, _, sub = path.partition(".")
+            if not sub:
+                self.fields[top] = None  # Whole field
+            elif top not in self.fields or self.fields[top] is not None:
+                self.fields.setdefault(top, set()).add(sub)
+
+    @classmethod
+    def parse(cls, fields: Optional[str]) -> Optional["FieldProjection"]:
+        """Parse a `fields=` value; None or empty means the full response."""
+        if not fields or not fields.strip():
+            return None
+        return cls(fields)
+
+    def includes(self, field: str) -> bool:
+        return field in self.fields
+
+    def build(self, builders: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        Build only the requested fields.
+
+        Args:
+            builders: Top-level field name -> zero-argument builder
+
+        Returns:
+            Dict with the requested fields (unknown names are ignored)
+        """
+        return {
+            field: self._project(builders[field](), sub)
+            for field, sub in self.fields.items()
+            if field in builders
+        }
+
+    def apply(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Project an already-built response (e.g. a cached one)."""
+        return self.build({key: (lambda value=value: value) for key, value in data.items()})
+
+    def _project(self, value: Any, sub: Optional[Set[str]]) -> Any:
+        """Keep only sub-fields of a dict, or of each dict in a list."""
+        if sub is None:
+            return value
+        if isinstance(value, list):
+            return [self._project(item, sub) for item in value]
+        if isinstance(value, dict):
+            return {key: value[key] for key in sub if key in value}
+        return value
@@ -0,0 +1,325 @@
+"""
+Title relevance filter for marketplace listings.
+Drops accessories, parts and off-target listings before statistics are computed.
+
+Features:
+- One vectorized tokenize-and-hash pass over all titles in a batch
+- Precompiled vocabulary per product (cached) including accessory terms
+- Scoring with a title x vocabulary indicator matrix
+- Sibling models rejected in both directions: every model token is
+  required ("iPhone 13 Pro" needs "pro") and model qualifiers the product
+  lacks disqualify ("iPhone 13" rejects "Pro Max", "mini")
+- "only" flags a part only right after a part noun ("box only", "case
+  only"), not in "used 3 months only"
+"""
+import re
+import structlog
+import numpy as np
+from functools import lru_cache
+from typing import List, Tuple
+from .models import MarketplaceListing
+
+logger = structlog.get_logger()
+
+
+class TitleRelevanceScorer:
+    """Scores listing titles against the canonical product in one batch."""
+
+    # Terms that mark a listing as an accessory, part or non-working unit.
+    # A term is ignored when the product itself contains it.
+    ACCESSORY_TERMS = (
+        "cover", "protector", "skin", "sticker", "decal", "replacement",
+        "parts", "broken", "empty", "mount", "holder", "compatible",
+        "lot", "earbud", "pad", "otterbox", "spigen", "lifeproof", "zagg"
+    )
+
+    # Terms that are accessories on their own ("Charging Case A2190") but
+    # bundled extras after a bundle marker ("... with MagSafe Charging Case")
+    BUNDLE_TERMS = ("case", "charger", "charging", "cable", "adapter", "dock")
+    BUNDLE_MARKERS = ("with", "w", "includes", "including")
+
+    # "<part> only" ("box only", "charger only") is a part listing on its own
+    ONLY_TERM = "only"
+    ONLY_SUBJECTS = (
+        "box", "case", "charger", "cable", "manual", "screen", "battery",
+        "board", "motherboard", "housing", "lens", "stand", "remote", "dock"
+    )
+
+    # Tokens that name a sibling model; a title with one the product lacks
+    # is a different model ("iPhone 13" vs "iPhone 13 Pro Max")
+    MODEL_QUALIFIERS = ("pro", "max", "mini", "plus", "ultra", "lite")
+
+    # Terms that flag an accessory when they appear before the product name
+    # ("Case for Apple AirPods Pro", "Fits iPhone 13 Pro")
+    TARGET_MARKERS = ("for", "fits", "fit")
+
+    # Product tokens are weighted; brand tokens count less than model tokens
+    # since sellers often omit the brand ("AirPods Pro 2nd Gen")
+    BRAND_WEIGHT = 0.5
+    MODEL_WEIGHT = 1.0
+
+    # Minimum share of weighted product tokens a title must contain
+    MIN_RELEVANCE = 0.7
+
+    # Skip filtering if it would leave fewer listings than this
+    MIN_LISTINGS = 3
+
+    _TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+    # Odd 64-bit base for token hashing and its inverse mod 2**64
+    _HASH_BASE = 0x100000001B3
+    _HASH_BASE_INV = pow(0x100000001B3, -1, 1 << 64)
+
+    def __init__(self):
+        self._base_powers = np.ones(0, dtype=np.uint64)
+        self._inv_base_powers = np.ones(0, dtype=np.uint64)
+
+    def score(
+        self,
+        titles: List[str],
+        brand: str,
+        model: str
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a batch of titles against a product.
+
+        Args:
+            titles: Listing titles
+            brand: Brand name
+            model: Model name/number
+
+        Returns:
+            (relevance, is_accessory): relevance in [0, 1] per title (0 when
+            any model token is missing or a sibling-model qualifier is
+            present) and a boolean mask of titles that look like
+            accessories or parts
+        """
+        n = len(titles)
+        (
+            vocab_hashes, vocab_cols, weights, num_model,
+            accessory_cols, marker_cols, bundle_cols, bundle_marker_cols,
+            qualifier_cols, only_cols, only_subject_cols
+        ) = self._compile_product(brand.lower(), model.lower())
+        num_product = len(weights)
+
+        if n == 0 or num_product == 0:
+            return np.ones(n), np.zeros(n, dtype=bool)
+
+        # Tokenize every title in one pass over the joined bytes
+        codes = np.frombuffer("\0".join(titles).lower().encode("utf-8"), dtype=np.uint8)
+        hashes, starts = self._hash_tokens(codes)
+        rows = np.cumsum(codes == 0)[starts]
+
+        # Map token hashes onto vocabulary columns
+        idx = np.minimum(np.searchsorted(vocab_hashes, hashes), len(vocab_hashes) - 1)
+        known = vocab_hashes[idx] == hashes
+        token_cols = np.where(known, vocab_cols[idx], -1)
+        is_part_only = self._part_only(rows, token_cols, only_cols, only_subject_cols, n)
+        rows, starts, cols = rows[known], starts[known], token_cols[known]
+
+        present = np.zeros((n, len(vocab_hashes)), dtype=bool)
+        present[rows, cols] = True
+
+        relevance = present[:, :num_product].astype(float) @ weights / weights.sum()
+        relevance[~present[:, :num_model].all(axis=1)] = 0.0
+        relevance[present[:, qualifier_cols].any(axis=1)] = 0.0
+        is_accessory = present[:, accessory_cols].any(axis=1) | is_part_only
+
+        # "<accessory> for <product>": a target marker before any product token
+        product_hit = cols < num_product
+        marker_hit = np.isin(cols, marker_cols)
+        if marker_hit.any():
+            first_product = self._first_start(n, rows[product_hit], starts[product_hit])
+            first_marker = self._first_start(n, rows[marker_hit], starts[marker_hit])
+            is_accessory |= first_marker < first_product
+
+        # "Charging Case" alone is an accessory; "... with Charging Case" is a bundle
+        bundle_hit = np.isin(cols, bundle_cols)
+        if bundle_hit.any():
+            bundle_marker_hit = np.isin(cols, bundle_marker_cols)
+            first_bundle_marker = self._first_start(
+                n, rows[bundle_marker_hit], starts[bundle_marker_hit]
+            )
+            bundle_rows, bundle_starts = rows[bundle_hit], starts[bundle_hit]
+            is_accessory[bundle_rows[bundle_starts < first_bundle_marker[bundle_rows]]] = True
+
+        return relevance, is_accessory
+
+    def _part_only(
+        self,
+        rows: np.ndarray,
+        token_cols: np.ndarray,
+        only_cols: np.ndarray,
+        subject_cols: np.ndarray,
+        n: int
+    ) -> np.ndarray:
+        """Titles where "only" directly follows a part noun (all tokens, in order)."""
+        is_part_only = np.zeros(n, dtype=bool)
+        if len(only_cols) == 0:
+            return is_part_only
+        positions = np.flatnonzero(np.isin(token_cols, only_cols))
+        positions = positions[positions > 0]
+        after_part = np.isin(token_cols[positions - 1], subject_cols) & (
+            rows[positions - 1] == rows[positions]
+        )
+        is_part_only[rows[positions[after_part]]] = True
+        return is_part_only
+
+    def _first_start(self, n: int, rows: np.ndarray, starts: np.ndarray) -> np.ndarray:
+        """Offset of each title's first matching token (int64 max if none)."""
+        first = np.full(n, np.iinfo(np.int64).max)
+        np.minimum.at(first, rows, starts)
+        return first
+
+    def filter_listings(
+        self,
+        listings: List[MarketplaceListing],
+        brand: str,
+        model: str
+    ) -> List[MarketplaceListing]:
+        """
+        Drop accessory, parts and off-target listings.
+
+        Falls back to the unfiltered listings when too few would remain,
+        since that usually means the query itself was unusual.
+        """
+        if not listings:
+            return listings
+
+        relevance, is_accessory = self.score(
+            [l.title for l in listings], brand, model
+        )
+        keep = (relevance >= self.MIN_RELEVANCE) & ~is_accessory
+        kept_count = int(keep.sum())
+
+        if kept_count == len(listings):
+            return listings
+
+        if kept_count < self.MIN_LISTINGS:
+            logger.warning(
+                "relevance_filter_skipped",
+                total=len(listings),
+                relevant=kept_count
+            )
+            return listings
+
+        logger.info(
+            "irrelevant_listings_filtered",
+            total=len(listings),
+            removed=len(listings) - kept_count,
+            accessories=int(is_accessory.sum())
+        )
+
+        return [l for l, k in zip(listings, keep) if k]
+
+    @lru_cache(maxsize=1024)
+    def _compile_product(
+        self,
+        brand: str,
+        model: str
+    ) -> Tuple[np.ndarray, ...]:
+        """
+        Compile the scoring vocabulary for a product.
+
+        Columns are laid out as model tokens, brand tokens, then accessory,
+        target marker, bundle, bundle marker, model qualifier, "only" and
+        part noun terms not already in the product. Tokens are stored as sorted hashes so a batch is mapped to
+        columns with one searchsorted.
+
+        Returns:
+            (sorted token hashes, column per hash, product token weights,
+             model token count, accessory columns, target marker columns,
+             bundle columns, bundle marker columns, qualifier columns,
+             "only" columns, part noun columns)
+        """
+        vocab = {}
+        weights = []
+        for token in self._TOKEN_RE.findall(model):
+            if token not in vocab:
+                vocab[token] = len(weights)
+                weights.append(self.MODEL_WEIGHT)
+        num_model = len(weights)
+        for token in self._TOKEN_RE.findall(brand):
+            if token not in vocab:
+                vocab[token] = len(weights)
+                weights.append(self.BRAND_WEIGHT)
+
+        num_product = len(weights)
+
+        def add_terms(terms: Tuple[str, ...]) -> List[int]:
+            # Columns for terms that aren't product tokens (shared between lists)
+            added = []
+            for term in terms:
+                if term not in vocab:
+                    vocab[term] = len(vocab)
+                if vocab[term] >= num_product:
+                    added.append(vocab[term])
+            return added
+
+        accessory_cols = add_terms(self.ACCESSORY_TERMS)
+        marker_cols = add_terms(self.TARGET_MARKERS)
+        bundle_cols = add_terms(self.BUNDLE_TERMS)
+        bundle_marker_cols = add_terms(self.BUNDLE_MARKERS)
+        qualifier_cols = add_terms(self.MODEL_QUALIFIERS)
+        only_cols = add_terms((self.ONLY_TERM,))
+        only_subject_cols = add_terms(self.ONLY_SUBJECTS)
+
+        tokens = list(vocab)
+        codes = np.frombuffer(" ".join(tokens).encode("utf-8"), dtype=np.uint8)
+        hashes, _ = self._hash_tokens(codes)
+        order = np.argsort(hashes)
+        cols = np.array([vocab[t] for t in tokens], dtype=np.int64)
+
+        return (
+            hashes[order],
+            cols[order],
+            np.array(weights, dtype=float),
+            num_model,
+            np.array(accessory_cols, dtype=np.int64),
+            np.array(marker_cols, dtype=np.int64),
+            np.array(bundle_cols, dtype=np.int64),
+            np.array(bundle_marker_cols, dtype=np.int64),
+            np.array(qualifier_cols, dtype=np.int64),
+            np.array(only_cols, dtype=np.int64),
+            np.array(only_subject_cols, dtype=np.int64)
+        )
+
+    def _hash_tokens(self, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hash every [a-z0-9]+ token in a byte array without a Python loop.
+
+        Uses a polynomial hash over prefix sums (wrapping uint64 arithmetic);
+        the odd base is invertible mod 2**64, so each token's hash is
+        normalized to its own start position.
+
+        Returns:
+            (token hashes, token start offsets)
+        """
+        is_token = ((codes >= 97) & (codes <= 122)) | ((codes >= 48) & (codes <= 57))
+        padded = np.concatenate(([False], is_token, [False]))
+        edges = np.flatnonzero(padded[1:] != padded[:-1])
+        starts, ends = edges[::2], edges[1::2]
+
+        powers, inv_powers = self._powers(len(codes) + 1)
+        prefix = np.concatenate((
+            np.zeros(1, dtype=np.uint64),
+            np.cumsum(codes.astype(np.uint64) * powers[:len(codes)], dtype=np.uint64)
+        ))
+        hashes = (prefix[ends] - prefix[starts]) * inv_powers[starts]
+
+        return hashes, starts
+
+    def _powers(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Powers of the hash base and its inverse, grown on demand."""
+        if len(self._base_powers) < size:
+            size = max(size, 2 * len(self._base_powers))
+            base = np.full(size, self._HASH_BASE, dtype=np.uint64)
+            inverse = np.full(size, self._HASH_BASE_INV, dtype=np.uint64)
+            base[0] = inverse[0] = 1
+            self._base_powers = np.cumprod(base, dtype=np.uint64)
+            self._inv_base_powers = np.cumprod(inverse, dtype=np.uint64)
+        return self._base_powers, self._inv_base_powers
+
+
+# Global instance
+title_relevance_scorer = TitleRelevanceScorer()
@@ -1,12 +1,17 @@
 """
 FastAPI router for marketplace service endpoints.
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Header
+from fastapi.responses import JSONResponse
 from typing import Optional
-from .models import MarketplaceResearchRequest, MarketplaceResearchResponse
+from .models import MarketplaceResearchRequest, MarketplaceResearchResponse, MarketplaceStats
 from .aggregator import marketplace_aggregator
 from .ebay import ebay_client
 from .facebook import facebook_client
+from .deadline import Deadline
+from .suggest import suggestion_index
+from .prewarm import research_prewarmer
+from .projection import FieldProjection
 from services.cache.redis_client import redis_cache
 import structlog
 
@@ -15,7 +20,14 @@ router = APIRouter()
 
 
 @router.post("/research", response_model=MarketplaceResearchResponse)
-async def research_product(request: MarketplaceResearchRequest):
+async def research_product(
+    request: MarketplaceResearchRequest,
+    timeout_ms: Optional[str] = Header(None, alias=Deadline.HEADER),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return (e.g., 'stats,listings.price')"
+    )
+):
     """
     Research marketplace prices for a product.
 
@@ -36,6 +48,13 @@ async def research_product(request: MarketplaceResearchRequest):
     - eBay sold listings are the primary data source
     - Results are cached for 4-24 hours depending on frequency
     - Minimum 10 listings recommended for reliable FMV
+    - Send `X-Request-Timeout-Ms` to bound the research; sources still
+      running at the deadline are cancelled and `data_freshness` is "partial"
+    - With `stratify_conditions`, all used conditions are fetched once and
+      `condition_stats` holds per-condition stats; quotes for the same
+      product in any condition are then served from cache
+    - `fields=stats,sources_checked` skips building everything else
+      (typically the listing array); `listings.price` selects sub-fields
     """
     try:
         logger.info(
@@ -59,20 +78,48 @@ async def research_product(request: MarketplaceResearchRequest):
             brand=brand,
             model=model,
             category=request.category,
-            condition=request.condition
+            condition=request.condition,
+            deadline=Deadline.from_header(timeout_ms),
+            adaptive=request.adaptive,
+            upc=request.product.get("upc"),
+            model_number=request.product.get("model_number"),
+            stratify_conditions=request.stratify_conditions,
+            metadata=request.product
+        )
+
+        # Demand tracking for cache pre-warming
+        research_prewarmer.record(
+            brand,
+            model,
+            request.category,
+            product_id=result["product_id"],
+            refreshed=not result["cache_hit"]
         )
 
         # Check if we have enough data
-        if result["stats"].count < 5:
+        if result["stats"]["count"] < 5:
             logger.warning(
                 "insufficient_marketplace_data",
-                count=result["stats"].count,
+                count=result["stats"]["count"],
                 brand=brand,
                 model=model
             )
             # Still return result, but frontend should warn
 
-        return MarketplaceResearchResponse(**result)
+        projection = FieldProjection.parse(fields)
+        if projection is None:
+            return MarketplaceResearchResponse(**result)
+
+        return JSONResponse(projection.build({
+            "product_id": lambda: result["product_id"],
+            "listings": lambda: [l.model_dump(mode="json") for l in result["listings"]],
+            "stats": lambda: MarketplaceStats(**result["stats"]).model_dump(),
+            "sources_checked": lambda: result["sources_checked"],
+            "data_freshness": lambda: result["data_freshness"],
+            "deadline_exceeded": lambda: result["deadline_exceeded"],
+            "condition_stats": lambda: result["condition_stats"],
+            "cache_hit": lambda: result["cache_hit"]
+        }))
 
     except ValueError as e:
         logger.error("validation_error", error=str(e))
@@ -91,7 +138,12 @@ async def get_live_comparables(
     item: str = Query(..., description="Item name (e.g., 'iPhone 13 Pro')"),
     category: str = Query("Consumer Electronics", description="Product category"),
     condition: Optional[str] = Query(None, description="Item condition"),
-    force_live: bool = Query(False, description="Force live scraping (bypass cache)")
+    force_live: bool = Query(False, description="Force live scraping (bypass cache)"),
+    timeout_ms: Optional[str] = Header(None, alias=Deadline.HEADER),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated fields to return (e.g., 'total_count,listings.price')"
+    )
 ):
     """
     Get live comparable sales data from eBay and Facebook Marketplace.
@@ -116,6 +168,9 @@ async def get_live_comparables(
     **Cache:**
     - Results cached for 1 hour
     - Use force_live=true to bypass cache
+
+    **Projection:** `fields=` returns only the listed fields; the full
+    response is still cached for other callers.
     """
     try:
         logger.info(
@@ -125,6 +180,11 @@ async def get_live_comparables(
             force_live=force_live
         )
 
+        projection = FieldProjection.parse(fields)
+
+        def project(data):
+            return projection.apply(data) if projection else data
+
         # Generate cache key
         cache_key = redis_cache.generate_cache_key(
             "comparables",
@@ -141,9 +201,10 @@ async def get_live_comparables(
                 logger.info("comparables_cache_hit", cache_key=cache_key)
                 cached_data["data_freshness"] = "cached"
                 cached_data["cache_hit"] = True
-                return cached_data
+                return project(cached_data)
 
-        # Fetch live data from both sources
+        # Fetch live data from both sources within the request deadline
+        deadline = Deadline.from_header(timeout_ms)
         ebay_listings = []
         facebook_listings = []
 
@@ -155,7 +216,8 @@ async def get_live_comparables(
                 condition=condition,
                 sold_within_days=30,  # Last 30 days for live comparables
                 limit=50,
-                real_time=True
+                real_time=True,
+                deadline=deadline
             )
             logger.info("ebay_comparables_fetched", count=len(ebay_listings))
         except Exception as e:
@@ -166,7 +228,8 @@ async def get_live_comparables(
             facebook_listings = await facebook_client.search_listings(
                 query=item,
                 category=category,
-                limit=20
+                limit=20,
+                deadline=deadline
             )
             logger.info("facebook_comparables_fetched", count=len(facebook_listings))
         except Exception as e:
@@ -223,7 +286,7 @@ async def get_live_comparables(
             facebook_count=len(facebook_listings)
         )
 
-        return response_data
+        return project(response_data)
 
     except Exception as e:
         logger.error("comparables_error", error=str(e))
@@ -233,6 +296,31 @@ async def get_live_comparables(
         )
 
 
+@router.get("/suggest")
+async def suggest_products(
+    q: str = Query(..., description="Typed brand/model prefix (e.g., 'iphone 13')"),
+    limit: int = Query(10, ge=1, le=10, description="Maximum suggestions")
+):
+    """
+    Autocomplete brand/model names for the submit page.
+
+    **Sources:**
+    - Canonical products from the product catalog
+    - Past research queries
+
+    **Ranking:** most popular first. Matches any word in the name, so
+    "13 pro" suggests "Apple iPhone 13 Pro".
+
+    **Notes:**
+    - Served from an in-memory prefix index (no I/O on the request path)
+    - New products and queries appear after the next background rebuild
+    """
+    return {
+        "query": q,
+        "suggestions": suggestion_index.suggest(q, limit=limit)
+    }
+
+
 @router.get("/health")
 async def health_check():
     """
@@ -0,0 +1,218 @@
+"""
+Brand/model autocomplete backed by an in-memory prefix index.
+
+Suggestions come from the product catalog and past research queries,
+ranked by popularity. Requests only read an immutable snapshot; updates
+are buffered and folded into a new snapshot by a background rebuild, which
+is swapped in atomically so lookups never wait on it. Raw (unresolved)
+queries are capped: only the most popular MAX_QUERY_ENTRIES are kept, and
+at most MAX_PENDING distinct new queries are buffered between rebuilds.
+"""
+import re
+import asyncio
+import heapq
+import threading
+import structlog
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from .catalog import product_catalog
+
+logger = structlog.get_logger()
+
+
+class PrefixSnapshot:
+    """
+    Immutable prefix index over suggestion entries.
+
+    Keys are the normalized entry text plus every word-boundary suffix (so
+    "iphone 13" matches "Apple iPhone 13 Pro"), kept in one sorted list and
+    searched with bisect. Short prefixes match huge ranges, so their top
+    results are precomputed.
+    """
+
+    def __init__(self, entries: List[Dict], max_results: int, precomputed_prefix_len: int):
+        self.entries = entries
+        self.max_results = max_results
+        self.precomputed_prefix_len = precomputed_prefix_len
+
+        pairs = []
+        for idx, entry in enumerate(entries):
+            words = entry["key"].split()
+            for start in range(len(words)):
+                pairs.append((" ".join(words[start:]), idx))
+        pairs.sort()
+
+        self.keys = [key for key, _ in pairs]
+        self.key_entries = [idx for _, idx in pairs]
+
+        # Top results for every prefix up to precomputed_prefix_len chars
+        buckets: Dict[str, set] = {}
+        for key, idx in pairs:
+            for length in range(1, min(len(key), precomputed_prefix_len) + 1):
+                buckets.setdefault(key[:length], set()).add(idx)
+        self.top_by_prefix = {
+            prefix: self._rank(idxs) for prefix, idxs in buckets.items()
+        }
+
+    @classmethod
+    def empty(cls) -> "PrefixSnapshot":
+        return cls([], max_results=0, precomputed_prefix_len=0)
+
+    def query(self, prefix: str, limit: int) -> List[Dict]:
+        """Return the most popular entries whose text has a word starting with prefix."""
+        if not prefix:
+            return []
+
+        if len(prefix) <= self.precomputed_prefix_len:
+            ranked = self.top_by_prefix.get(prefix, [])
+        else:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, prefix + "\uffff", lo)
+            ranked = self._rank(set(self.key_entries[lo:hi]))
+
+        return [self.entries[idx] for idx in ranked[:limit]]
+
+    def _rank(self, idxs) -> List[int]:
+        return heapq.nlargest(
+            self.max_results,
+            idxs,
+            key=lambda idx: (self.entries[idx]["popularity"], -len(self.entries[idx]["key"]))
+        )
+
+
+class SuggestionIndex:
+    """Autocomplete index with buffered updates and background rebuilds."""
+
+    MAX_RESULTS = 10
+    PRECOMPUTED_PREFIX_LEN = 3
+    REBUILD_INTERVAL = 30.0  # seconds
+
+    # Raw query entries kept across rebuilds (catalog products always kept)
+    MAX_QUERY_ENTRIES = 5000
+
+    # Distinct new entries buffered between rebuilds
+    MAX_PENDING = 1000
+
+    _TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+    def __init__(self):
+        self._snapshot = PrefixSnapshot.empty()
+        self._entries: Dict[str, Dict] = {}
+        self._pending: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._dirty = True  # Catalog may have products before the first rebuild
+
+    def record(self, text: str, product_id: Optional[str] = None, weight: int = 1):
+        """
+        Buffer a query for the next rebuild (O(1), safe on the request path).
+
+        Queries that resolved to a catalog product are folded into that
+        product's entry so they share its popularity.
+        """
+        key = self._normalize(text)
+        if not key:
+            return
+
+        entry_id = product_id or key
+        with self._lock:
+            if entry_id not in self._pending and len(self._pending) >= self.MAX_PENDING:
+                return
+            pending = self._pending.setdefault(entry_id, {
+                "text": text.strip(),
+                "product_id": product_id,
+                "popularity": 0
+            })
+            pending["popularity"] += weight
+            self._dirty = True
+
+    def suggest(self, prefix: str, limit: int = MAX_RESULTS) -> List[Dict]:
+        """Suggest brand/model names for a typed prefix."""
+        snapshot = self._snapshot
+        normalized = self._normalize(prefix)
+        return [
+            {
+                "text": entry["text"],
+                "product_id": entry["product_id"],
+                "popularity": entry["popularity"]
+            }
+            for entry in snapshot.query(normalized, min(limit, self.MAX_RESULTS))
+        ]
+
+    def rebuild(self):
+        """
+        Fold buffered updates and catalog products into a new snapshot.
+
+        Runs off the request path; the finished snapshot replaces the old
+        one with a single reference assignment.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._dirty = False
+
+        for entry_id, update in pending.items():
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                self._entries[entry_id] = dict(update)
+            else:
+                entry["popularity"] += update["popularity"]
+
+        # Catalog products use their canonical name; popularity is at least
+        # the number of times the product was identified or researched
+        for product_id, product in list(product_catalog.products.items()):
+            name = " ".join(
+                part for part in (product["brand"], product["model"], product["storage"]) if part
+            )
+            entry = self._entries.setdefault(product_id, {
+                "text": name,
+                "product_id": product_id,
+                "popularity": 0
+            })
+            entry["text"] = name
+            entry["popularity"] = max(entry["popularity"], product["observations"])
+
+        self._evict_queries()
+
+        entries = [
+            dict(entry, key=self._normalize(entry["text"]))
+            for entry in self._entries.values()
+        ]
+        self._snapshot = PrefixSnapshot(
+            entries,
+            max_results=self.MAX_RESULTS,
+            precomputed_prefix_len=self.PRECOMPUTED_PREFIX_LEN
+        )
+
+        logger.info("suggestion_index_rebuilt", entries=len(entries), updates=len(pending))
+
+    async def run_background_rebuilds(self, interval: float = REBUILD_INTERVAL):
+        """Periodically rebuild in a worker thread while there are updates."""
+        while True:
+            try:
+                if self._dirty:
+                    await asyncio.to_thread(self.rebuild)
+            except Exception as e:
+                logger.error("suggestion_index_rebuild_failed", error=str(e))
+            await asyncio.sleep(interval)
+
+    def _evict_queries(self):
+        """Drop the least popular raw queries beyond MAX_QUERY_ENTRIES."""
+        queries = [
+            entry_id for entry_id, entry in self._entries.items()
+            if entry["product_id"] is None
+        ]
+        excess = len(queries) - self.MAX_QUERY_ENTRIES
+        if excess <= 0:
+            return
+        for entry_id in heapq.nsmallest(excess, queries, key=lambda q: self._entries[q]["popularity"]):
+            del self._entries[entry_id]
+
+    def _normalize(self, text: Optional[str]) -> str:
+        normalized = " ".join(self._TOKEN_RE.findall((text or "").lower()))
+        # Keep a trailing space so "iphone " only matches the whole word
+        if text and text[-1].isspace() and normalized:
+            normalized += " "
+        return normalized
+
+
+# Global instance
+suggestion_index = SuggestionIndex()
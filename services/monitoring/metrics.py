@@ -0,0 +1,134 @@
+"""
+Prometheus instrumentation for the pricing engine.
+
+Latency histograms for marketplace sources, cache tiers, LLM calls and
+pricing stages, exposed on /metrics.
+
+Features:
+- Histograms labelled by source/tier/call/stage and outcome
+- Buckets from 5 ms to 60 s so tail latency is visible per percentile
+- Multi-worker aggregation via prometheus_client multiprocess mode: set
+  PROMETHEUS_MULTIPROC_DIR (an empty directory) before the workers start
+"""
+import os
+import time
+import asyncio
+import functools
+import structlog
+from contextlib import contextmanager
+from typing import Dict, Iterator, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+logger = structlog.get_logger()
+
+
+class Metrics:
+    """Latency histograms shared by every service module."""
+
+    # Seconds; cache hits land in the first buckets, scrapes and LLM calls in the last
+    LATENCY_BUCKETS = (
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+        1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0
+    )
+
+    def __init__(self):
+        self.source_latency = Histogram(
+            "marketplace_source_request_seconds",
+            "Marketplace source request latency per attempt",
+            ["source", "outcome"],
+            buckets=self.LATENCY_BUCKETS
+        )
+        self.cache_latency = Histogram(
+            "cache_operation_seconds",
+            "Cache operation latency",
+            ["tier", "operation", "outcome"],
+            buckets=self.LATENCY_BUCKETS
+        )
+        self.llm_latency = Histogram(
+            "llm_call_seconds",
+            "LLM API call latency",
+            ["call", "outcome"],
+            buckets=self.LATENCY_BUCKETS
+        )
+        self.pricing_stage_latency = Histogram(
+            "pricing_stage_seconds",
+            "Pricing pipeline stage latency",
+            ["stage", "outcome"],
+            buckets=self.LATENCY_BUCKETS
+        )
+
+    def observe_source(self, source: str, outcome: str, seconds: float):
+        """Record one marketplace source attempt (ok, rate_limited, timeout, ...)."""
+        self.source_latency.labels(source=source, outcome=outcome).observe(seconds)
+
+    def observe_cache(self, tier: str, operation: str, outcome: str, seconds: float):
+        """Record one cache operation (hit, miss, ok, error)."""
+        self.cache_latency.labels(tier=tier, operation=operation, outcome=outcome).observe(seconds)
+
+    @contextmanager
+    def time(self, histogram: Histogram, **labels) -> Iterator[Dict[str, str]]:
+        """
+        Time a block into a histogram.
+
+        The outcome label defaults to "ok", or "error" if the block raises;
+        the block can override it through the yielded dict.
+
+        Example:
+            with metrics.time(metrics.llm_latency, call="identify"):
+                response = client.messages.create(...)
+        """
+        result = {"outcome": "ok"}
+        start = time.perf_counter()
+        try:
+            yield result
+        except BaseException:
+            result["outcome"] = "error"
+            raise
+        finally:
+            histogram.labels(outcome=result["outcome"], **labels).observe(
+                time.perf_counter() - start
+            )
+
+    def track_stage(self, stage: str):
+        """Decorator timing a sync or async function as a pricing stage."""
+        def decorator(func):
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with self.time(self.pricing_stage_latency, stage=stage):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(self.pricing_stage_latency, stage=stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render(self) -> Tuple[bytes, str]:
+        """
+        Render all metrics in the Prometheus text format.
+
+        In multiprocess mode every worker writes its samples to
+        PROMETHEUS_MULTIPROC_DIR and any worker can serve the merged view.
+
+        Returns:
+            (body, content type)
+        """
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+            return generate_latest(registry), CONTENT_TYPE_LATEST
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+# Global instance
+metrics = Metrics()
@@ -0,0 +1,345 @@
+"""
+Offline pricing backtest over historical offer outcomes.
+
+Replays offer_outcomes (see services/cache/warehouse.py) through OfferEngine
+variants with different category margins and condition multipliers, so
+margin changes can be evaluated before they ship.
+
+Acceptance for a replayed offer is estimated from the historical acceptance
+curve: the accepted share of past offers at the same offer/FMV ratio, per
+category (falling back to all categories where a category is thin), made
+non-decreasing in the ratio.
+
+Features:
+- Outcomes loaded once into columnar numpy arrays (categorical codes)
+- Vectorized replay (OfferEngine.calculate_base_offers), no per-row Python
+- Variants evaluated in parallel across CPU cores with a process pool
+- Acceptance-adjusted spend, revenue and margin per variant
+- CLI with a margin grid for quick searches
+
+Usage:
+    python -m services.pricing.backtest outcomes.csv --variants variants.json
+    python -m services.pricing.backtest outcomes.csv --margin-grid Gaming 0.50 0.70 0.05
+
+outcomes.csv is an export of offer_outcomes with a header row, e.g.
+    \\copy offer_outcomes TO 'outcomes.csv' CSV HEADER
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import numpy as np
+import structlog
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from .offer import offer_engine
+from .rules import CompiledRules, pricing_rules
+
+try:
+    import pandas as pd
+except ImportError:  # Optional: much faster CSV parsing for large exports
+    pd = None
+
+logger = structlog.get_logger()
+
+
+class OutcomeColumns:
+    """offer_outcomes rows as parallel arrays."""
+
+    def __init__(
+        self,
+        fmv: np.ndarray,
+        offer_amount: np.ndarray,
+        condition_codes: np.ndarray,
+        category_codes: np.ndarray,
+        accepted: np.ndarray,
+        conditions: List[str],
+        categories: List[str]
+    ):
+        self.fmv = fmv
+        self.offer_amount = offer_amount
+        self.condition_codes = condition_codes
+        self.category_codes = category_codes
+        self.accepted = accepted
+        self.conditions = conditions
+        self.categories = categories
+
+    def __len__(self) -> int:
+        return len(self.fmv)
+
+    @classmethod
+    def from_records(cls, records: Dict[str, list]) -> "OutcomeColumns":
+        """
+        Build columns from raw values (one list per offer_outcomes column).
+
+        Rows with a missing or non-positive FMV or offer are dropped.
+        """
+        fmv = np.asarray(records["fmv"], dtype=float)
+        offer_amount = np.asarray(records["offer_amount"], dtype=float)
+        valid = (fmv > 0) & (offer_amount > 0)
+
+        conditions, condition_codes = np.unique(
+            np.asarray(records["condition"], dtype=str)[valid], return_inverse=True
+        )
+        categories, category_codes = np.unique(
+            np.asarray(records["category"], dtype=str)[valid], return_inverse=True
+        )
+        # Booleans arrive as t/f, true/false or 1/0 depending on the export
+        flags, flag_codes = np.unique(
+            np.asarray(records["accepted"], dtype=str)[valid], return_inverse=True
+        )
+        accepted = np.isin(np.char.lower(flags), ("t", "true", "1"))[flag_codes]
+
+        return cls(
+            fmv=fmv[valid],
+            offer_amount=offer_amount[valid],
+            condition_codes=condition_codes,
+            category_codes=category_codes,
+            accepted=accepted,
+            conditions=conditions.tolist(),
+            categories=categories.tolist()
+        )
+
+
+class BacktestEngine:
+    """Replays outcomes through OfferEngine variants."""
+
+    # Offer/FMV ratio buckets for the acceptance curve
+    RATIO_BUCKET = 0.025
+    MAX_RATIO = 1.5
+
+    # Pseudo-observations pulling thin category buckets toward the global curve
+    CURVE_PRIOR_WEIGHT = 20.0
+
+    def __init__(self, outcomes: OutcomeColumns):
+        self.outcomes = outcomes
+        self.curve = self._fit_acceptance_curve()
+
+    def run(self, variant: Dict) -> Dict:
+        """
+        Evaluate one variant.
+
+        Args:
+            variant: {"name", "category_margins", "condition_multipliers"};
+                the dicts override the active pricing rules by key
+
+        Returns:
+            Expected acceptance, spend, revenue and margin for the variant
+        """
+        out = self.outcomes
+
+        offers = offer_engine.calculate_base_offers(
+            out.fmv, out.condition_codes, out.category_codes, out.conditions, out.categories,
+            rules=variant_rules(variant)
+        )
+        p_accept = self.acceptance(offers / out.fmv)
+
+        spend = float(np.dot(p_accept, offers))
+        revenue = float(np.dot(p_accept, out.fmv))
+        margin = revenue - spend
+
+        return {
+            "name": variant.get("name", "variant"),
+            "rows": len(out),
+            "expected_acceptance_rate": round(float(p_accept.mean()), 4) if len(out) else 0.0,
+            "expected_accepted": round(float(p_accept.sum()), 1),
+            "expected_spend": round(spend, 2),
+            "expected_revenue": round(revenue, 2),
+            "expected_margin": round(margin, 2),
+            "margin_percent": round(margin / revenue * 100, 2) if revenue else 0.0
+        }
+
+    def acceptance(self, ratios: np.ndarray, category_codes: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Estimated acceptance probability for offer/FMV ratios.
+
+        Args:
+            ratios: Offer/FMV ratio per row
+            category_codes: Category per ratio (defaults to the outcome rows')
+        """
+        if category_codes is None:
+            category_codes = self.outcomes.category_codes
+        return self.curve[category_codes, self._bucket(ratios)]
+
+    def historical(self) -> Dict:
+        """What actually happened with the offers that were made."""
+        out = self.outcomes
+        accepted = out.accepted
+        spend = float(out.offer_amount[accepted].sum())
+        revenue = float(out.fmv[accepted].sum())
+        return {
+            "name": "historical",
+            "rows": len(out),
+            "acceptance_rate": round(float(accepted.mean()), 4) if len(out) else 0.0,
+            "accepted": int(accepted.sum()),
+            "spend": round(spend, 2),
+            "revenue": round(revenue, 2),
+            "margin": round(revenue - spend, 2)
+        }
+
+    def _fit_acceptance_curve(self) -> np.ndarray:
+        """
+        Acceptance rate per (category, ratio bucket).
+
+        Returns:
+            Array of shape (categories, buckets), non-decreasing along buckets
+        """
+        out = self.outcomes
+        n_buckets = int(round(self.MAX_RATIO / self.RATIO_BUCKET)) + 1
+        n_categories = len(out.categories)
+
+        cell = out.category_codes * n_buckets + self._bucket(out.offer_amount / out.fmv)
+        counts = np.bincount(cell, minlength=n_categories * n_buckets).reshape(n_categories, n_buckets)
+        hits = np.bincount(
+            cell, weights=out.accepted, minlength=n_categories * n_buckets
+        ).reshape(n_categories, n_buckets)
+
+        global_counts = counts.sum(axis=0)
+        global_rate = np.divide(
+            hits.sum(axis=0), global_counts,
+            out=np.zeros(n_buckets), where=global_counts > 0
+        )
+        global_rate = self._fill_empty(global_rate, global_counts > 0)
+
+        rate = (hits + self.CURVE_PRIOR_WEIGHT * global_rate) / (counts + self.CURVE_PRIOR_WEIGHT)
+
+        # Sellers never prefer a lower offer for the same item
+        return np.maximum.accumulate(rate, axis=1)
+
+    def _fill_empty(self, rate: np.ndarray, observed: np.ndarray) -> np.ndarray:
+        """Fill unobserved buckets from the nearest observed bucket below (0 before the first)."""
+        if not observed.any():
+            return rate
+        last_observed = np.maximum.accumulate(np.where(observed, np.arange(len(rate)), 0))
+        filled = rate[last_observed]
+        filled[:np.argmax(observed)] = 0.0
+        return filled
+
+    def _bucket(self, ratios: np.ndarray) -> np.ndarray:
+        buckets = np.floor(np.clip(ratios, 0.0, self.MAX_RATIO) / self.RATIO_BUCKET + 1e-9)
+        return buckets.astype(np.int64)
+
+
+def variant_rules(variant: Dict) -> CompiledRules:
+    """Active pricing rules with a variant's margin and multiplier overrides."""
+    return pricing_rules.current.with_overrides(
+        category_margins=variant.get("category_margins"),
+        condition_multipliers=variant.get("condition_multipliers")
+    )
+
+
+def load_outcomes(path: str) -> OutcomeColumns:
+    """Load an offer_outcomes CSV export (header row required)."""
+    columns = ("fmv", "offer_amount", "condition", "category", "accepted")
+
+    if pd is not None:
+        frame = pd.read_csv(path, usecols=list(columns), keep_default_na=False)
+        records = {column: frame[column].to_numpy() for column in columns}
+        records["fmv"] = pd.to_numeric(frame["fmv"], errors="coerce").to_numpy()
+        records["offer_amount"] = pd.to_numeric(frame["offer_amount"], errors="coerce").to_numpy()
+    else:
+        records = {column: [] for column in columns}
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                for column in columns:
+                    records[column].append(row[column])
+        for column in ("fmv", "offer_amount"):
+            records[column] = [_to_float(value) for value in records[column]]
+
+    return OutcomeColumns.from_records(records)
+
+
+# Per-process engine for pool workers (outcomes are shipped once per worker)
+_worker_engine: Optional[BacktestEngine] = None
+
+
+def _init_worker(outcomes: OutcomeColumns):
+    global _worker_engine
+    _worker_engine = BacktestEngine(outcomes)
+
+
+def _run_variant(variant: Dict) -> Dict:
+    return _worker_engine.run(variant)
+
+
+def run_backtest(
+    outcomes: OutcomeColumns,
+    variants: List[Dict],
+    workers: Optional[int] = None
+) -> Dict:
+    """
+    Evaluate variants against historical outcomes.
+
+    Args:
+        outcomes: Loaded offer outcomes
+        variants: Variants to compare (the current engine is always included
+            as "current")
+        workers: Worker processes (defaults to CPU count; 1 runs inline)
+
+    Returns:
+        {"historical": {...}, "variants": [...]} with variants sorted by
+        expected margin, best first
+    """
+    variants = [{"name": "current"}] + list(variants)
+    workers = min(workers or os.cpu_count() or 1, len(variants))
+
+    if workers <= 1:
+        engine = BacktestEngine(outcomes)
+        results = [engine.run(variant) for variant in variants]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(outcomes,)
+        ) as pool:
+            results = list(pool.map(_run_variant, variants))
+        engine = BacktestEngine(outcomes)
+
+    results.sort(key=lambda r: r["expected_margin"], reverse=True)
+    logger.info("backtest_complete", rows=len(outcomes), variants=len(variants), workers=workers)
+
+    return {"historical": engine.historical(), "variants": results}
+
+
+def margin_grid(category: str, start: float, stop: float, step: float) -> List[Dict]:
+    """Variants sweeping one category's margin from start to stop (inclusive)."""
+    margins = np.arange(start, stop + step / 2, step)
+    return [
+        {"name": f"{category} margin {m:.3f}", "category_margins": {category: round(float(m), 4)}}
+        for m in margins
+    ]
+
+
+def _to_float(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return float("nan")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest offer pricing variants over offer outcomes")
+    parser.add_argument("outcomes", help="CSV export of offer_outcomes (with header)")
+    parser.add_argument("--variants", help="JSON file with a list of variants")
+    parser.add_argument(
+        "--margin-grid", nargs=4, metavar=("CATEGORY", "START", "STOP", "STEP"),
+        help="Add variants sweeping one category margin"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    variants = []
+    if args.variants:
+        with open(args.variants) as f:
+            variants.extend(json.load(f))
+    if args.margin_grid:
+        category, start, stop, step = args.margin_grid
+        variants.extend(margin_grid(category, float(start), float(stop), float(step)))
+
+    report = run_backtest(load_outcomes(args.outcomes), variants, workers=args.workers)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""
+Pricing engine micro-benchmarks with regression gates.
+
+Times the hot pricing paths on synthetic, seeded data at several scales and
+stores the results as a JSON baseline; `compare` fails (exit code 1) when a
+benchmark got slower than the baseline by more than a threshold, so a change
+that makes nightly repricing 10x slower is caught before it ships.
+
+Benchmarks (scale = items per run):
+- calculate_fmv: one FMV over `scale` sold listings (fusion, comparables,
+  recency and confidence factors)
+- calculate_offer: `scale` offers quoted one at a time
+- score_confidence: `scale` confidence scores
+- batch_analyze: `scale` offers through PriceOptimizer.batch_analyze
+- sweep: `scale` offers through the columnar PriceOptimizer.sweep
+
+Features:
+- Seeded synthetic listing and offer generators (same data every run)
+- Best-of-N wall time per benchmark (least noisy estimate on shared machines)
+- Logging silenced while timing, so log I/O is not what gets measured
+- Noise floor: differences below it never count as regressions
+
+Usage:
+    python -m services.pricing.benchmark run --output baseline.json
+    python -m services.pricing.benchmark run --scales 10,1000 --output current.json
+    python -m services.pricing.benchmark compare baseline.json current.json --threshold 0.25
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import numpy as np
+import structlog
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence
+from .confidence import confidence_scorer
+from .fmv import fmv_engine
+from .offer import offer_engine
+from .optimizer import price_optimizer
+
+BASELINE_VERSION = 1
+
+DEFAULT_SCALES = (10, 1000, 100000)
+
+# Fixed reference time so generated dates (and recency scores) never drift
+REFERENCE_TIME = datetime(2026, 1, 15, tzinfo=timezone.utc)
+
+SOURCES = ("ebay", "ebay", "ebay", "facebook", "amazon", "google")
+CONDITIONS = ("New", "Like New", "Good", "Fair", "Poor")
+CATEGORIES = ("Electronics", "Gaming", "Books", "Clothing", "Tools", "Unknown")
+
+
+def synthetic_listings(n: int, seed: int = 0, base_price: float = 120.0) -> List[Dict]:
+    """
+    Sold listings shaped like the aggregator's output.
+
+    Prices are log-normal around base_price, sold within the last 90 days,
+    spread over sources and conditions.
+    """
+    rng = np.random.default_rng(seed)
+    prices = np.round(base_price * rng.lognormal(0.0, 0.25, n), 2)
+    ages = rng.uniform(0, 90 * 86400, n)
+    sources = rng.integers(0, len(SOURCES), n)
+    conditions = rng.integers(0, len(CONDITIONS), n)
+
+    return [
+        {
+            "title": f"Synthetic product listing {i}",
+            "price": float(prices[i]),
+            "condition": CONDITIONS[conditions[i]],
+            "sold_date": (REFERENCE_TIME - timedelta(seconds=float(ages[i]))).isoformat(),
+            "source": SOURCES[sources[i]],
+            "url": f"https://example.com/itm/{i}"
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_stats(listings: List[Dict]) -> Dict:
+    """Marketplace stats for listings, including per-source stats for fusion."""
+    prices = np.array([l["price"] for l in listings], dtype=float)
+    by_source: Dict[str, List[float]] = {}
+    for listing in listings:
+        by_source.setdefault(listing["source"], []).append(listing["price"])
+
+    def summary(values: np.ndarray) -> Dict:
+        return {
+            "count": int(len(values)),
+            "median": float(np.median(values)),
+            "mean": float(values.mean()),
+            "std_dev": float(values.std())
+        }
+
+    stats = summary(prices)
+    p25, p50, p75 = np.percentile(prices, [25, 50, 75])
+    spread = 1.96 * stats["std_dev"] / np.sqrt(max(len(prices), 1))
+    stats.update({
+        "percentiles": {"p25": float(p25), "p50": float(p50), "p75": float(p75)},
+        "min_price": float(prices.min()),
+        "max_price": float(prices.max()),
+        # Aggregator stats carry their CIs; FMV only bootstraps without them
+        "median_ci": [stats["median"] - spread, stats["median"] + spread],
+        "mean_ci": [stats["mean"] - spread, stats["mean"] + spread],
+        "sources": {
+            source: summary(np.array(values)) for source, values in by_source.items()
+        },
+        "listings": listings
+    })
+    return stats
+
+
+def synthetic_offers(n: int, seed: int = 0) -> List[Dict]:
+    """Listed offers in PriceOptimizer.batch_analyze input format (naive local times)."""
+    rng = np.random.default_rng(seed)
+    original = np.round(rng.uniform(20, 500, n), 2)
+    markup = rng.uniform(1.2, 1.8, n)
+    ages = rng.uniform(0, 60, n)
+    views = rng.integers(0, 400, n)
+    now = datetime.now()
+
+    return [
+        {
+            "offer_id": f"offer-{i}",
+            "current_price": float(round(original[i] * markup[i], 2)),
+            "original_offer": float(original[i]),
+            "created_at": (now - timedelta(days=float(ages[i]))).isoformat(),
+            "view_count": int(views[i]),
+            "last_optimized": None
+        }
+        for i in range(n)
+    ]
+
+
+def _fmv_case(scale: int) -> Callable[[], None]:
+    stats = synthetic_stats(synthetic_listings(scale))
+
+    def run():
+        fmv_engine.calculate_fmv(stats, category="Electronics", condition="Good", data_freshness="live")
+    return run
+
+
+def _offer_case(scale: int) -> Callable[[], None]:
+    rng = np.random.default_rng(1)
+    fmvs = np.round(rng.uniform(10, 1000, scale), 2).tolist()
+    conditions = [CONDITIONS[c] for c in rng.integers(0, len(CONDITIONS), scale)]
+    categories = [CATEGORIES[c] for c in rng.integers(0, len(CATEGORIES), scale)]
+    inventory = rng.integers(0, 30, scale).tolist()
+
+    def run():
+        for fmv, condition, category, count in zip(fmvs, conditions, categories, inventory):
+            offer_engine.calculate_offer(fmv, condition, category, inventory_count=count)
+    return run
+
+
+def _confidence_case(scale: int) -> Callable[[], None]:
+    rng = np.random.default_rng(2)
+    vision = rng.integers(40, 100, scale).tolist()
+    counts = rng.integers(0, 80, scale).tolist()
+    clear = (rng.random(scale) < 0.8).tolist()
+    values = np.round(rng.uniform(10, 1000, scale), 2).tolist()
+
+    def run():
+        for v, count, is_clear, value in zip(vision, counts, clear, values):
+            confidence_scorer.score_confidence(v, count, is_clear, offer_value=value)
+    return run
+
+
+def _batch_analyze_case(scale: int) -> Callable[[], None]:
+    offers = synthetic_offers(scale, seed=3)
+
+    def run():
+        price_optimizer.batch_analyze(offers)
+    return run
+
+
+def _sweep_case(scale: int) -> Callable[[], None]:
+    offers = synthetic_offers(scale, seed=3)
+    columns = {
+        key: [offer[key] for offer in offers]
+        for key in ("offer_id", "current_price", "original_offer", "created_at", "view_count")
+    }
+
+    def run():
+        price_optimizer.sweep(**columns)
+    return run
+
+
+# Benchmark name -> setup(scale) returning the timed callable
+BENCHMARKS: Dict[str, Callable[[int], Callable[[], None]]] = {
+    "calculate_fmv": _fmv_case,
+    "calculate_offer": _offer_case,
+    "score_confidence": _confidence_case,
+    "batch_analyze": _batch_analyze_case,
+    "sweep": _sweep_case
+}
+
+
+def _time_best(run: Callable[[], None], repeats: int) -> float:
+    """Best wall time of `repeats` runs."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _default_repeats(scale: int) -> int:
+    return 5 if scale <= 1000 else 2
+
+
+def _silence_logging():
+    """Drop log events below CRITICAL for the rest of the process."""
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.CRITICAL))
+
+
+def run_benchmarks(
+    scales: Sequence[int] = DEFAULT_SCALES,
+    names: Optional[Sequence[str]] = None,
+    repeats: Optional[int] = None
+) -> Dict:
+    """
+    Run benchmarks at each scale.
+
+    Args:
+        scales: Items per run
+        names: Benchmarks to run (default: all)
+        repeats: Timed runs per benchmark, best kept (default: 5, or 2 above 1k)
+
+    Returns:
+        Baseline document: {"version", "created_at", "environment",
+        "results": {"name/scale": {"benchmark", "scale", "seconds",
+        "per_item_us", "repeats"}}}
+    """
+    names = list(names or BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {unknown}")
+
+    results = {}
+    for name in names:
+        for scale in scales:
+            run = BENCHMARKS[name](scale)
+            run()  # Warm-up: imports, caches, first-call allocations
+            n = repeats or _default_repeats(scale)
+            seconds = _time_best(run, n)
+            results[f"{name}/{scale}"] = {
+                "benchmark": name,
+                "scale": scale,
+                "seconds": round(seconds, 6),
+                "per_item_us": round(seconds / scale * 1e6, 3),
+                "repeats": n
+            }
+
+    return {
+        "version": BASELINE_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor()
+        },
+        "results": results
+    }
+
+
+def compare(
+    baseline: Dict,
+    current: Dict,
+    threshold: float = 0.25,
+    noise_floor: float = 0.001
+) -> Dict:
+    """
+    Compare a benchmark run against a baseline.
+
+    A benchmark regresses when it is more than `threshold` slower than the
+    baseline (0.25 -> 25%) and the absolute slowdown exceeds `noise_floor`
+    seconds. Benchmarks missing from either side are reported, not failed.
+
+    Returns:
+        {"passed", "regressions", "rows": [{"key", "baseline", "current",
+        "change", "status"}], "missing", "new"}
+    """
+    base_results = baseline.get("results", {})
+    current_results = current.get("results", {})
+
+    rows = []
+    regressions = []
+    for key in sorted(set(base_results) & set(current_results)):
+        before = base_results[key]["seconds"]
+        after = current_results[key]["seconds"]
+        change = (after - before) / before if before > 0 else 0.0
+
+        if change > threshold and after - before > noise_floor:
+            status = "regression"
+            regressions.append(key)
+        elif change < -threshold and before - after > noise_floor:
+            status = "improvement"
+        else:
+            status = "ok"
+
+        rows.append({
+            "key": key,
+            "baseline": before,
+            "current": after,
+            "change": round(change, 4),
+            "status": status
+        })
+
+    return {
+        "passed": not regressions,
+        "regressions": regressions,
+        "rows": rows,
+        "missing": sorted(set(base_results) - set(current_results)),
+        "new": sorted(set(current_results) - set(base_results))
+    }
+
+
+def _format_report(report: Dict) -> str:
+    lines = [f"{'benchmark':<28}{'baseline':>12}{'current':>12}{'change':>10}  status"]
+    for row in report["rows"]:
+        lines.append(
+            f"{row['key']:<28}{row['baseline']:>11.4f}s{row['current']:>11.4f}s"
+            f"{row['change'] * 100:>+9.1f}%  {row['status']}"
+        )
+    if report["missing"]:
+        lines.append(f"missing from current run: {', '.join(report['missing'])}")
+    if report["new"]:
+        lines.append(f"not in baseline: {', '.join(report['new'])}")
+    lines.append("PASSED" if report["passed"] else f"FAILED: {len(report['regressions'])} regression(s)")
+    return "\n".join(lines)
+
+
+def _load(path: str) -> Dict:
+    with open(path) as f:
+        document = json.load(f)
+    if document.get("version") != BASELINE_VERSION:
+        raise ValueError(f"{path}: unsupported baseline version {document.get('version')!r}")
+    return document
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pricing engine micro-benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run benchmarks and write results as JSON")
+    run_parser.add_argument(
+        "--scales", default=",".join(str(s) for s in DEFAULT_SCALES),
+        help="Comma-separated item counts (default: 10,1000,100000)"
+    )
+    run_parser.add_argument("--benchmarks", help=f"Comma-separated subset of: {', '.join(BENCHMARKS)}")
+    run_parser.add_argument("--repeats", type=int, default=None, help="Timed runs per benchmark")
+    run_parser.add_argument("--output", help="Write results here (default: stdout)")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="Also compare against a baseline")
+    run_parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+
+    compare_parser = commands.add_parser("compare", help="Compare results against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%)")
+    compare_parser.add_argument("--noise-floor", type=float, default=0.001, help="Ignore slowdowns below this many seconds")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        report = compare(_load(args.baseline), _load(args.current), args.threshold, args.noise_floor)
+        print(_format_report(report))
+        return 0 if report["passed"] else 1
+
+    _silence_logging()
+    results = run_benchmarks(
+        scales=[int(s) for s in args.scales.split(",") if s],
+        names=args.benchmarks.split(",") if args.benchmarks else None,
+        repeats=args.repeats
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+
+    if args.compare:
+        report = compare(_load(args.compare), results, args.threshold)
+        print(_format_report(report), file=sys.stderr)
+        return 0 if report["passed"] else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
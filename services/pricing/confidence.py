@@ -4,6 +4,8 @@ Determines if offer should be auto-priced or escalated for review.
 """
 import structlog
 from typing import Dict
+from services.monitoring.metrics import metrics
+from .rules import pricing_rules
 
 logger = structlog.get_logger()
 
@@ -19,11 +21,10 @@ class ConfidenceScorer:
         "condition_reliability": 0.20
     }
 
-    # Action thresholds
-    THRESHOLD_AUTO_PRICE = 80  # ≥80: Auto-price
-    THRESHOLD_FLAG = 60        # 60-79: Flag if high value
-    # <60: Escalate to human
+    # Action thresholds (auto-price / flag if high value / escalate) come
+    # from config/pricing_rules.json
 
+    @metrics.track_stage("confidence")
     def score_confidence(
         self,
         vision_confidence: int,
@@ -76,7 +77,7 @@ class ConfidenceScorer:
             "details": {
                 "component_scores": scores,
                 "weights": self.WEIGHTS,
-                "threshold_met": overall_confidence >= self.THRESHOLD_AUTO_PRICE
+                "threshold_met": overall_confidence >= pricing_rules.current.auto_price_threshold
             }
         }
 
@@ -111,12 +112,13 @@ class ConfidenceScorer:
             - "flag_for_review": Flag for review (medium confidence, high value)
             - "escalate": Escalate to human review (low confidence)
         """
-        if confidence >= self.THRESHOLD_AUTO_PRICE:
+        rules = pricing_rules.current
+        if confidence >= rules.auto_price_threshold:
             return "auto_price"
 
-        elif confidence >= self.THRESHOLD_FLAG:
-            # Flag if high value (>$100)
-            if offer_value > 100:
+        elif confidence >= rules.flag_threshold:
+            # Flag if high value (>$100 by default)
+            if offer_value > rules.flag_min_offer_value:
                 return "flag_for_review"
             else:
                 return "auto_price"
@@ -6,11 +6,18 @@ Features:
 - Uses live marketplace data when available
 - Falls back to cached data on scraper failures
 - Tracks data freshness (live/cached/stale)
+- Vectorized batch calculation for repricing many products at once
+- Price ranges from bootstrap confidence intervals (cached with the stats)
+- Multi-source fusion with per-source contributions (see fusion.py)
 """
 import structlog
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone, timedelta
 from .models import FMVResponse, ComparableSale
+from .stats import bootstrap_intervals
+from .fusion import source_fusion
+from services.monitoring.metrics import metrics
 
 logger = structlog.get_logger()
 
@@ -18,15 +25,29 @@ logger = structlog.get_logger()
 class FMVEngine:
     """Calculates Fair Market Value using weighted marketplace data."""
 
-    # Source weights (must sum to 1.0)
-    WEIGHTS = {
-        "ebay_sold_median": 0.45,
-        "ebay_sold_mean": 0.10,
-        "amazon_used": 0.20,
-        "google_shopping": 0.15,
-        "other_sold": 0.10
+    # Categories with deep marketplace coverage
+    COMMON_CATEGORIES = (
+        "Consumer Electronics",
+        "Gaming",
+        "Phones & Tablets",
+        "Tools & Equipment"
+    )
+
+    # Confidence penalty by data freshness
+    FRESHNESS_PENALTIES = {
+        "cached": 5,  # Slight penalty for cached data
+        "partial": 10,  # Some sources were cut off by the request deadline
+        "stale": 15  # Significant penalty for stale data
     }
 
+    MAX_COMPARABLES = 5
+
+    # FMV range: bootstrap 95% interval, or a fixed band without enough listings
+    RANGE_RESAMPLES = 1000
+    RANGE_MIN_LISTINGS = 5
+    FALLBACK_RANGE = 0.20
+
+    @metrics.track_stage("fmv")
     def calculate_fmv(
         self,
         marketplace_stats: Dict,
@@ -41,7 +62,7 @@ class FMVEngine:
             marketplace_stats: Statistics from marketplace aggregator
             category: Product category
             condition: Item condition
-            data_freshness: Data freshness indicator ("live", "cached", "stale")
+            data_freshness: Data freshness indicator ("live", "cached", "partial", "stale")
 
         Returns:
             FMVResponse with calculated FMV, confidence, and data freshness
@@ -49,6 +70,7 @@ class FMVEngine:
         Note:
             - Live data: Real-time scraping from marketplaces
             - Cached data: Recent data from cache (< 1 hour old)
+            - Partial data: Some sources cut off by the request deadline
             - Stale data: Older cached data or scraper failures
         """
         logger.info(
@@ -59,39 +81,23 @@ class FMVEngine:
             data_freshness=data_freshness or "unknown"
         )
 
-        # Extract eBay data (primary source)
-        ebay_median = marketplace_stats.get("median", 0)
-        ebay_mean = marketplace_stats.get("mean", 0)
         listing_count = marketplace_stats.get("count", 0)
 
         # Extract listings for comparable sales
         raw_listings = marketplace_stats.get("listings", [])
 
-        # Calculate weighted FMV using only available sources
-        # Weights are normalized to the available sources so they sum to 1.0
-        available_weights = {
-            "ebay_sold_median": self.WEIGHTS["ebay_sold_median"],
-            "ebay_sold_mean": self.WEIGHTS["ebay_sold_mean"],
-        }
-        available_values = {
-            "ebay_sold_median": ebay_median,
-            "ebay_sold_mean": ebay_mean,
-        }
-        # TODO: Add when APIs are ready:
-        # available_weights["amazon_used"] = self.WEIGHTS["amazon_used"]
-        # available_values["amazon_used"] = amazon_price
-
-        weight_sum = sum(available_weights.values())
-        fmv = sum(
-            available_values[k] * (available_weights[k] / weight_sum)
-            for k in available_weights
+        # Fuse whichever sources the lookup returned (weights renormalized)
+        fusion = source_fusion.fuse(
+            self._source_stats(marketplace_stats),
+            data_freshness=data_freshness
         )
+        fmv = fusion["fmv"]
 
         # Extract comparable sales
         comparable_sales = self._extract_comparable_sales(
             raw_listings,
             target_price=fmv,
-            max_comps=5
+            max_comps=self.MAX_COMPARABLES
         )
 
         # Calculate detailed confidence factors
@@ -109,35 +115,18 @@ class FMVEngine:
         # Extract overall confidence score
         confidence = confidence_factors["score"]
 
-        # Calculate price range (±20% typical)
-        price_range = {
-            "low": fmv * 0.80,
-            "high": fmv * 1.20
-        }
-
-        # Build sources breakdown
-        sources = {
-            "ebay_sold": {
-                "count": listing_count,
-                "median": ebay_median,
-                "mean": ebay_mean
-            }
-            # TODO: Add amazon_used, google_shopping when implemented
-        }
+        # Price range from the sampling uncertainty of the median and mean
+        price_range = self._price_range(
+            fmv,
+            marketplace_stats,
+            median_share=source_fusion.MEDIAN_SHARE
+        )
 
         # Determine final data freshness
         final_freshness = data_freshness or "unknown"
 
-        # Adjust confidence based on data freshness
-        if final_freshness == "live":
-            # No adjustment for live data
-            pass
-        elif final_freshness == "cached":
-            # Slight penalty for cached data
-            confidence = max(0, confidence - 5)
-        elif final_freshness == "stale":
-            # Significant penalty for stale data
-            confidence = max(0, confidence - 15)
+        # Adjust confidence based on data freshness (live data is not penalized)
+        confidence = max(0, confidence - self.FRESHNESS_PENALTIES.get(final_freshness, 0))
 
         logger.info(
             "fmv_calculated",
@@ -153,13 +142,348 @@ class FMVEngine:
             fmv=round(fmv, 2),
             confidence=confidence,
             data_quality=data_quality,
-            sources=sources,
+            sources=fusion["contributions"],
             range=price_range,
             comparable_sales=comparable_sales,
             confidence_factors=confidence_factors,
             data_freshness=final_freshness
         )
 
+    @metrics.track_stage("fmv_batch")
+    def calculate_fmv_batch(self, items: List[Dict]) -> List[FMVResponse]:
+        """
+        Calculate FMV for many products at once.
+
+        Produces the same result as calling calculate_fmv() per item, but
+        the recency ratios, coefficients of variation, confidence factors
+        and top-k comparables are computed over flat numpy arrays for the
+        whole batch instead of per-item Python loops.
+
+        Args:
+            items: Dicts with marketplace_stats, category, condition and
+                optional data_freshness (the calculate_fmv() arguments)
+
+        Returns:
+            One FMVResponse per item, in input order
+        """
+        n = len(items)
+        if n == 0:
+            return []
+
+        stats = [item["marketplace_stats"] for item in items]
+        counts = np.array([s.get("count", 0) or 0 for s in stats], dtype=int)
+        std_devs = np.array([s.get("std_dev", 0) or 0 for s in stats], dtype=float)
+        categories = np.array([item["category"] for item in items], dtype=object)
+
+        # Fused FMV over each item's available sources
+        fusions = [
+            source_fusion.fuse(self._source_stats(s), data_freshness=item.get("data_freshness"))
+            for s, item in zip(stats, items)
+        ]
+        fmvs = np.array([f["fmv"] for f in fusions], dtype=float)
+        median_share = source_fusion.MEDIAN_SHARE
+
+        # Flatten every item's listings; owner maps each listing to its item
+        listings = [s.get("listings", []) or [] for s in stats]
+        lengths = np.array([len(l) for l in listings], dtype=int)
+        owner = np.repeat(np.arange(n), lengths)
+        flat = [listing for item_listings in listings for listing in item_listings]
+        prices = np.array([self._field(l, "price", 0) or 0 for l in flat], dtype=float)
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+
+        # Factor 1: Data availability (0-40 points)
+        data_points_scores = np.select(
+            [counts >= 50, counts >= 20, counts >= 10, counts >= 3],
+            [40, 32, 24, 16],
+            default=8
+        )
+        data_availability = np.select(
+            [counts >= 50, counts >= 20, counts >= 10, counts >= 3],
+            ["excellent", "good", "moderate", "limited"],
+            default="insufficient"
+        )
+
+        # Factor 2: Recency (0-25 points)
+        recency_scores, recency_quality = self._batch_recency(flat, owner, lengths)
+
+        # Factor 3: Price variance (0-20 points)
+        priced = fmvs > 0
+        cvs = np.divide(std_devs, fmvs, out=np.zeros(n), where=priced)
+        variance_scores = np.where(priced, np.select(
+            [cvs < 0.15, cvs < 0.30, cvs < 0.50], [20, 12, 5], default=0
+        ), 0)
+        variance_levels = np.where(priced, np.select(
+            [cvs < 0.15, cvs < 0.30, cvs < 0.50],
+            ["low", "moderate", "high"],
+            default="very_high"
+        ), "unknown")
+
+        # Factor 4: Category coverage (0-15 points)
+        common = np.isin(categories, self.COMMON_CATEGORIES)
+        category_scores = np.where(common, 15, 8)
+
+        scores = np.clip(
+            data_points_scores + recency_scores + variance_scores + category_scores, 0, 100
+        )
+        penalties = np.array(
+            [self.FRESHNESS_PENALTIES.get(item.get("data_freshness") or "unknown", 0) for item in items]
+        )
+        confidences = np.maximum(0, scores - penalties)
+        data_quality = np.select([counts >= 50, counts >= 20], ["High", "Medium"], default="Low")
+
+        comparables = self._batch_comparables(flat, prices, owner, lengths, fmvs)
+
+        results = []
+        for i, item in enumerate(items):
+            factors = {
+                "data_points": int(counts[i]),
+                "data_availability": str(data_availability[i]),
+                "recency_score": int(recency_scores[i]),
+                "recency_quality": str(recency_quality[i]),
+                "price_variance": str(variance_levels[i]),
+                "coefficient_of_variation": round(float(cvs[i]) * 100, 1) if priced[i] else 0,
+                "category_coverage": "high" if common[i] else "medium",
+                "score": int(scores[i])
+            }
+            factors["explanation"] = self._explain_confidence(factors)
+
+            fmv = float(fmvs[i])
+            results.append(FMVResponse(
+                fmv=round(fmv, 2),
+                confidence=int(confidences[i]),
+                data_quality=str(data_quality[i]),
+                sources=fusions[i]["contributions"],
+                range=self._price_range(
+                    fmv, stats[i], median_share, prices[offsets[i]:offsets[i + 1]]
+                ),
+                comparable_sales=comparables[i],
+                confidence_factors=factors,
+                data_freshness=item.get("data_freshness") or "unknown"
+            ))
+
+        logger.info(
+            "fmv_batch_calculated",
+            items=n,
+            listings=len(flat),
+            mean_confidence=round(float(confidences.mean()), 1)
+        )
+
+        return results
+
+    def _batch_recency(
+        self,
+        flat: List,
+        owner: np.ndarray,
+        lengths: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recency score and label per item from flattened listings.
+
+        Mirrors _calculate_recency_score(): listings with a sold_date count
+        as dated even if the date can't be parsed, but only parsed dates
+        within 30 days count as recent.
+        """
+        n = len(lengths)
+        now = datetime.now(tz=timezone.utc).timestamp()
+
+        sold_dates = [self._field(l, "sold_date") for l in flat]
+        dated = np.array([bool(d) for d in sold_dates], dtype=bool)
+        timestamps = self._timestamps(sold_dates)
+
+        # (now - sold).days <= 30, i.e. less than 31 whole days ago
+        with np.errstate(invalid="ignore"):
+            recent = np.floor((now - timestamps) / 86400.0) <= 30
+
+        dated_counts = np.bincount(owner, weights=dated, minlength=n)
+        recent_counts = np.bincount(owner, weights=recent & dated, minlength=n)
+        ratios = np.divide(recent_counts, dated_counts, out=np.zeros(n), where=dated_counts > 0)
+
+        conditions = [
+            lengths == 0,
+            dated_counts == 0,
+            ratios >= 0.70,
+            ratios >= 0.50,
+            ratios >= 0.30
+        ]
+        scores = np.select(conditions, [0, 10, 25, 20, 15], default=10)
+        quality = np.select(
+            conditions,
+            ["unknown", "unknown", "excellent", "good", "moderate"],
+            default="dated"
+        )
+        return scores, quality
+
+    def _batch_comparables(
+        self,
+        flat: List,
+        prices: np.ndarray,
+        owner: np.ndarray,
+        lengths: np.ndarray,
+        fmvs: np.ndarray
+    ) -> List[List[ComparableSale]]:
+        """
+        Top-k comparable sales per item, closest to each item's FMV.
+
+        Builds a padded (items x max listings) score matrix and selects the
+        k best per row with argpartition, then orders just those k. Ties keep
+        listing order, as the stable sort in _extract_comparable_sales() does.
+        """
+        n = len(lengths)
+        if len(flat) == 0:
+            return [[] for _ in range(n)]
+
+        # Position of each listing within its item
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        positions = np.arange(len(flat)) - starts[owner]
+
+        targets = fmvs[owner]
+        listing_scores = np.where(
+            targets > 0,
+            np.abs(prices - targets) / np.where(targets > 0, targets, 1),
+            999
+        )
+        listing_scores[prices <= 0] = np.inf  # Not a usable comparable
+
+        width = int(lengths.max())
+        matrix = np.full((n, width), np.inf)
+        matrix[owner, positions] = listing_scores
+
+        k = min(self.MAX_COMPARABLES, width)
+        top = np.argpartition(matrix, k - 1, axis=1)[:, :k]
+
+        comparables = []
+        for i in range(n):
+            row = top[i]
+            row_scores = matrix[i, row]
+            row = row[np.lexsort((row, row_scores))]
+            comps = []
+            for pos in row:
+                if not np.isfinite(matrix[i, pos]):
+                    break
+                listing = flat[starts[i] + pos]
+                comps.append(ComparableSale(
+                    source=self._field(listing, "source", "ebay"),
+                    title=self._field(listing, "title", ""),
+                    price=float(prices[starts[i] + pos]),
+                    sold_date=self._field(listing, "sold_date"),
+                    condition=self._field(listing, "condition", "Unknown"),
+                    url=self._field(listing, "url")
+                ))
+            comparables.append(comps)
+        return comparables
+
+    def _source_stats(self, marketplace_stats: Dict) -> Dict[str, Dict]:
+        """Per-source stats, or the overall stats as eBay for stats without them."""
+        sources = marketplace_stats.get("sources")
+        if sources:
+            return sources
+        return {
+            "ebay": {
+                "count": marketplace_stats.get("count", 0) or 0,
+                "median": marketplace_stats.get("median", 0) or 0,
+                "mean": marketplace_stats.get("mean", 0) or 0,
+                "std_dev": marketplace_stats.get("std_dev", 0) or 0
+            }
+        }
+
+    def _price_range(
+        self,
+        fmv: float,
+        marketplace_stats: Dict,
+        median_share: float,
+        prices: Optional[np.ndarray] = None
+    ) -> Dict[str, float]:
+        """
+        FMV range from bootstrap confidence intervals.
+
+        Uses the median/mean intervals cached with the marketplace stats;
+        older stats without them are bootstrapped from their listings. The
+        bounds are blended with the same weights as the FMV.
+
+        Args:
+            fmv: Calculated FMV
+            marketplace_stats: Stats (median_ci, mean_ci, listings)
+            median_share: Weight of the median in the FMV (mean gets the rest)
+            prices: Listing prices, if already extracted
+
+        Returns:
+            {"low", "high"}
+        """
+        median_ci = marketplace_stats.get("median_ci")
+        mean_ci = marketplace_stats.get("mean_ci")
+
+        if median_ci is None or mean_ci is None:
+            if prices is None:
+                prices = np.array(
+                    [self._field(l, "price", 0) or 0 for l in marketplace_stats.get("listings", []) or []],
+                    dtype=float
+                )
+            prices = prices[prices > 0]
+            if len(prices) < self.RANGE_MIN_LISTINGS:
+                return {
+                    "low": round(fmv * (1 - self.FALLBACK_RANGE), 2),
+                    "high": round(fmv * (1 + self.FALLBACK_RANGE), 2)
+                }
+            intervals = bootstrap_intervals(prices, resamples=self.RANGE_RESAMPLES)
+            median_ci, mean_ci = intervals["median"], intervals["mean"]
+
+        low = median_share * median_ci[0] + (1 - median_share) * mean_ci[0]
+        high = median_share * median_ci[1] + (1 - median_share) * mean_ci[1]
+        return {"low": round(min(low, fmv), 2), "high": round(max(high, fmv), 2)}
+
+    def _field(self, listing: Any, name: str, default: Any = None) -> Any:
+        """Read a listing field from a dict or object."""
+        if isinstance(listing, dict):
+            return listing.get(name, default)
+        return getattr(listing, name, default)
+
+    def _timestamps(self, sold_dates: List[Any]) -> np.ndarray:
+        """
+        Sold dates as epoch seconds (NaN if missing or unparseable).
+
+        UTC ISO strings ("Z" / "+00:00", as the aggregator emits them) are
+        parsed in one numpy call; other values fall back to _timestamp().
+        """
+        seconds = np.full(len(sold_dates), np.nan)
+        utc_positions = []
+        utc_values = []
+        for i, value in enumerate(sold_dates):
+            if isinstance(value, str) and value.endswith("Z"):
+                utc_positions.append(i)
+                utc_values.append(value[:-1])
+            elif isinstance(value, str) and value.endswith("+00:00"):
+                utc_positions.append(i)
+                utc_values.append(value[:-6])
+            elif value:
+                seconds[i] = self._timestamp(value)
+
+        if utc_values:
+            try:
+                parsed = np.array(utc_values, dtype="datetime64[s]")
+                valid = ~np.isnat(parsed)
+                seconds[np.array(utc_positions)[valid]] = parsed[valid].astype(np.int64)
+            except ValueError:
+                # A malformed string in the batch: parse these one by one
+                for i in utc_positions:
+                    seconds[i] = self._timestamp(sold_dates[i])
+
+        return seconds
+
+    def _timestamp(self, sold_date: Any) -> float:
+        """Sold date as epoch seconds, or NaN if missing or unparseable."""
+        if not sold_date:
+            return np.nan
+        if isinstance(sold_date, str):
+            try:
+                sold_date = datetime.fromisoformat(sold_date.replace("Z", "+00:00"))
+            except ValueError:
+                return np.nan
+        if isinstance(sold_date, datetime):
+            if sold_date.tzinfo is None:
+                sold_date = sold_date.replace(tzinfo=timezone.utc)
+            return sold_date.timestamp()
+        return np.nan
+
     def _assess_data_quality(self, listing_count: int) -> str:
         """Assess data quality based on listing count."""
         if listing_count >= 50:
@@ -242,13 +566,7 @@ class FMVEngine:
             factors["coefficient_of_variation"] = 0
 
         # Factor 4: Category coverage (0-15 points)
-        common_categories = [
-            "Consumer Electronics",
-            "Gaming",
-            "Phones & Tablets",
-            "Tools & Equipment"
-        ]
-        if category in common_categories:
+        if category in self.COMMON_CATEGORIES:
             category_score = 15
             category_coverage = "high"
         else:
@@ -265,6 +583,13 @@ class FMVEngine:
         factors["score"] = final_score
 
         # Generate human-readable explanation
+        factors["explanation"] = self._explain_confidence(factors)
+
+        return factors
+
+    def _explain_confidence(self, factors: Dict) -> str:
+        """Human-readable summary of confidence factors."""
+        final_score = factors["score"]
         if final_score >= 80:
             confidence_level = "High"
         elif final_score >= 50:
@@ -274,20 +599,18 @@ class FMVEngine:
 
         explanation_parts = [
             f"{confidence_level} confidence ({final_score}%):",
-            f"{listing_count} sales found ({data_availability} data)",
+            f"{factors['data_points']} sales found ({factors['data_availability']} data)",
         ]
 
-        if recency_quality != "unknown":
-            explanation_parts.append(f"{recency_quality} recency")
+        if factors["recency_quality"] != "unknown":
+            explanation_parts.append(f"{factors['recency_quality']} recency")
 
         if "coefficient_of_variation" in factors:
             explanation_parts.append(f"{factors['price_variance']} price variance ({factors['coefficient_of_variation']}%)")
 
-        explanation_parts.append(f"{category_coverage} category coverage")
+        explanation_parts.append(f"{factors['category_coverage']} category coverage")
 
-        factors["explanation"] = ", ".join(explanation_parts)
-
-        return factors
+        return ", ".join(explanation_parts)
 
     def _calculate_recency_score(self, listings: List) -> tuple:
         """
@@ -0,0 +1,166 @@
+"""
+Multi-source FMV fusion.
+
+Combines per-source price stats (eBay sold, Facebook, Amazon used, Google
+Shopping, ...) into one FMV. Sources without enough data are dropped and
+the remaining weights renormalized, so the FMV degrades gracefully to
+whatever sources a lookup actually returned.
+
+Features:
+- Configured weights per source, or inverse-variance weights from each
+  source's count and dispersion
+- Freshness discounts per source (cached/partial/stale data weighs less)
+- Per-source contributions returned with every FMV
+- Works from the per-source stats the aggregator computes in its single
+  stats pass (no extra per-request work per source)
+"""
+import math
+import structlog
+from typing import Dict, Optional
+from config.settings import settings
+
+logger = structlog.get_logger()
+
+
+class SourceFusion:
+    """Fuses per-source marketplace stats into a single FMV."""
+
+    # Configured weight per source (renormalized over the sources present)
+    SOURCE_WEIGHTS = {
+        "ebay_sold": 0.55,
+        "amazon_used": 0.20,
+        "google_shopping": 0.15,
+        "other_sold": 0.10
+    }
+
+    # Listing sources (MarketplaceListing.source) -> fusion source
+    SOURCE_ALIASES = {
+        "ebay": "ebay_sold",
+        "amazon": "amazon_used",
+        "google": "google_shopping",
+        "facebook": "other_sold"
+    }
+
+    # Within a source: median vs recency-weighted mean (0.45 / 0.10 of the eBay weight)
+    MEDIAN_SHARE = 0.45 / 0.55
+
+    # Weight multiplier by data freshness
+    FRESHNESS_FACTORS = {
+        "live": 1.0,
+        "cached": 0.9,
+        "partial": 0.8,
+        "stale": 0.5
+    }
+
+    # Sources with fewer listings are ignored (unless nothing else is left)
+    MIN_SOURCE_COUNT = 3
+
+    # Inverse-variance: floor on the relative standard error, so a source
+    # with identical prices can't take all the weight
+    MIN_RELATIVE_SE = 0.01
+
+    def fuse(
+        self,
+        sources: Dict[str, Dict],
+        method: Optional[str] = None,
+        data_freshness: Optional[str] = None
+    ) -> Dict:
+        """
+        Fuse per-source stats into an FMV.
+
+        Args:
+            sources: Source name -> {"count", "median", "mean", "std_dev",
+                optional "freshness"}; listing sources ("ebay", "facebook")
+                are mapped to fusion sources
+            method: "configured" or "inverse_variance" (defaults to
+                settings.fmv_fusion_method)
+            data_freshness: Freshness for sources without their own
+
+        Returns:
+            {"fmv", "method", "contributions": {source: {"count", "median",
+            "mean", "estimate", "weight", "contribution"}}}
+        """
+        method = method or settings.fmv_fusion_method
+        if method not in ("configured", "inverse_variance"):
+            raise ValueError(f"Unknown FMV fusion method: {method}")
+
+        candidates = {}
+        for name, stats in sources.items():
+            median = stats.get("median") or 0
+            mean = stats.get("mean") or median
+            if median <= 0:
+                continue
+            candidates[self.SOURCE_ALIASES.get(name, name)] = {
+                **stats,
+                "count": stats.get("count") or 0,
+                "median": median,
+                "mean": mean,
+                "estimate": self.MEDIAN_SHARE * median + (1 - self.MEDIAN_SHARE) * mean
+            }
+
+        usable = {
+            name: stats for name, stats in candidates.items()
+            if stats["count"] >= self.MIN_SOURCE_COUNT
+        }
+        if not usable and candidates:
+            # Thin data everywhere: price from the deepest source alone
+            deepest = max(candidates, key=lambda name: candidates[name]["count"])
+            usable = {deepest: candidates[deepest]}
+
+        if not usable:
+            return {"fmv": 0.0, "method": method, "contributions": {}}
+
+        raw_weights = {
+            name: self._raw_weight(name, stats, method, data_freshness)
+            for name, stats in usable.items()
+        }
+        total = sum(raw_weights.values())
+
+        fmv = 0.0
+        contributions = {}
+        for name, stats in usable.items():
+            weight = raw_weights[name] / total
+            fmv += weight * stats["estimate"]
+            contributions[name] = {
+                "count": stats["count"],
+                "median": stats["median"],
+                "mean": stats["mean"],
+                "estimate": round(stats["estimate"], 2),
+                "weight": round(weight, 4),
+                "contribution": round(weight * stats["estimate"], 2)
+            }
+
+        if len(usable) < len(sources):
+            logger.debug(
+                "fmv_fusion_sources_dropped",
+                used=list(usable),
+                dropped=[name for name in sources if self.SOURCE_ALIASES.get(name, name) not in usable]
+            )
+
+        return {"fmv": fmv, "method": method, "contributions": contributions}
+
+    def _raw_weight(
+        self,
+        name: str,
+        stats: Dict,
+        method: str,
+        data_freshness: Optional[str]
+    ) -> float:
+        """Unnormalized weight for one source."""
+        freshness = stats.get("freshness") or data_freshness
+        factor = self.FRESHNESS_FACTORS.get(freshness, 1.0)
+
+        if method == "configured":
+            return self.SOURCE_WEIGHTS.get(name, self.SOURCE_WEIGHTS["other_sold"]) * factor
+
+        # Sampling variance of a median-led estimate: ~ (pi / 2) * sigma^2 / n
+        se_floor = self.MIN_RELATIVE_SE * stats["estimate"]
+        variance = max(
+            (math.pi / 2) * (stats.get("std_dev") or 0) ** 2 / max(stats["count"], 1),
+            se_floor ** 2
+        )
+        return factor / variance
+
+
+# Global instance
+source_fusion = SourceFusion()
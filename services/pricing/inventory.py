@@ -0,0 +1,136 @@
+"""
+Inventory saturation index.
+
+OfferEngine lowers offers when we already hold several units of an item,
+but the quote paths had no cheap way to know the count. This index keeps
+unit counts per canonical product and category in memory, updated by
+acquired/sold events and shared across workers through a Redis hash.
+
+Features:
+- O(1) lookups on the quote path (no database query)
+- Events applied by one Lua script (increment and clamp at zero together),
+  so concurrent workers never lose updates or race the clamp
+- Periodic resync from Redis picks up other workers' events
+- Per-category totals maintained alongside product counts
+"""
+import asyncio
+import structlog
+from typing import Dict, Optional
+from services.cache.redis_client import redis_cache
+
+logger = structlog.get_logger()
+
+
+# KEYS[1] counts hash; ARGV[1] field, ARGV[2] delta
+# Counts never go below zero (sales predating the index are dropped)
+RECORD_SCRIPT = """
+local count = redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2])
+if count < 0 then
+    redis.call('HSET', KEYS[1], ARGV[1], 0)
+    count = 0
+end
+return count
+"""
+
+
+class InventoryIndex:
+    """Unit counts per (canonical product, category), mirrored from Redis."""
+
+    REDIS_KEY = "inventory:counts"
+
+    # Resync interval for events applied by other workers (seconds)
+    SYNC_SECONDS = 30.0
+
+    # Event -> change in units held
+    EVENT_DELTAS = {
+        "acquired": 1,
+        "sold": -1,
+        "removed": -1
+    }
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.category_counts: Dict[str, int] = {}
+        self._record = redis_cache.client.register_script(RECORD_SCRIPT)
+
+    def count(self, product_id: Optional[str], category: str) -> int:
+        """Units held of a product in a category (0 if unknown)."""
+        if not product_id:
+            return 0
+        return self.counts.get(self._key(product_id, category), 0)
+
+    def record_event(
+        self,
+        product_id: str,
+        category: str,
+        event: str,
+        quantity: int = 1
+    ) -> int:
+        """
+        Apply an inventory event.
+
+        Args:
+            product_id: Canonical product id
+            category: Product category
+            event: "acquired", "sold" or "removed"
+            quantity: Units affected
+
+        Returns:
+            Units held after the event
+        """
+        if event not in self.EVENT_DELTAS:
+            raise ValueError(f"Unknown inventory event: {event}")
+
+        key = self._key(product_id, category)
+        delta = self.EVENT_DELTAS[event] * quantity
+        try:
+            count = int(self._record(keys=[self.REDIS_KEY], args=[key, delta]))
+        except Exception as e:
+            # Keep this worker's view current; the next sync reconciles
+            logger.error("inventory_index_redis_error", key=key, error=str(e))
+            count = max(0, self.counts.get(key, 0) + delta)
+
+        self._set(key, count)
+        logger.info("inventory_event_recorded", product_id=product_id, category=category, inventory_event=event, count=count)
+        return count
+
+    def sync(self) -> int:
+        """
+        Reload all counts from Redis.
+
+        Returns:
+            Number of tracked products
+        """
+        raw = redis_cache.client.hgetall(self.REDIS_KEY)
+        counts = {key: max(0, int(value)) for key, value in raw.items()}
+
+        category_counts: Dict[str, int] = {}
+        for key, value in counts.items():
+            category = key.split("|", 1)[1]
+            category_counts[category] = category_counts.get(category, 0) + value
+
+        # Swap whole dicts so lookups never see a partial sync
+        self.counts, self.category_counts = counts, category_counts
+        return len(counts)
+
+    async def run_background_sync(self, interval: float = SYNC_SECONDS):
+        """Resync from Redis on a fixed interval until cancelled."""
+        while True:
+            try:
+                await asyncio.to_thread(self.sync)
+            except Exception as e:
+                logger.error("inventory_index_sync_failed", error=str(e))
+            await asyncio.sleep(interval)
+
+    def _set(self, key: str, count: int):
+        category = key.split("|", 1)[1]
+        previous = self.counts.get(key, 0)
+        self.counts[key] = count
+        self.category_counts[category] = self.category_counts.get(category, 0) + count - previous
+
+    def _key(self, product_id: str, category: str) -> str:
+        return f"{product_id}|{category or 'Unknown'}"
+
+
+# Global instance
+inventory_index = InventoryIndex()
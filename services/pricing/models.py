@@ -28,7 +28,7 @@ class FMVResponse(BaseModel):
     fmv: float = Field(..., description="Fair Market Value in USD")
     confidence: int = Field(..., ge=0, le=100, description="Confidence in FMV (0-100)")
     data_quality: str = Field(..., description="High/Medium/Low")
-    sources: Dict = Field(default_factory=dict, description="Breakdown by source")
+    sources: Dict = Field(default_factory=dict, description="Per-source estimates, weights and contributions")
     range: Dict[str, float] = Field(..., description="Price range (low, high)")
     comparable_sales: List[ComparableSale] = Field(
         default_factory=list,
@@ -40,7 +40,7 @@ class FMVResponse(BaseModel):
     )
     data_freshness: Optional[str] = Field(
         None,
-        description="Data freshness: 'live', 'cached', 'stale', or 'unknown'"
+        description="Data freshness: 'live', 'cached', 'partial', 'stale', or 'unknown'"
     )
 
     class Config:
@@ -50,9 +50,14 @@ class FMVResponse(BaseModel):
                 "confidence": 85,
                 "data_quality": "High",
                 "sources": {
-                    "ebay_sold": {"count": 312, "median": 118},
-                    "amazon_used": {"avg": 125},
-                    "google_shopping": {"avg": 122}
+                    "ebay_sold": {
+                        "count": 312, "median": 118, "mean": 121, "estimate": 118.55,
+                        "weight": 0.8462, "contribution": 100.31
+                    },
+                    "other_sold": {
+                        "count": 24, "median": 115, "mean": 117, "estimate": 115.36,
+                        "weight": 0.1538, "contribution": 17.75
+                    }
                 },
                 "range": {"low": 95, "high": 140},
                 "comparable_sales": [
@@ -76,6 +81,29 @@ class FMVResponse(BaseModel):
         }
 
 
+class FMVBatchItem(FMVRequest):
+    """One product in a batch FMV request."""
+    item_id: Optional[str] = Field(None, description="Caller reference echoed in the result")
+    data_freshness: Optional[str] = None
+
+
+class FMVBatchRequest(BaseModel):
+    """Request for FMV of many products at once."""
+    items: List[FMVBatchItem]
+
+
+class FMVBatchResult(BaseModel):
+    """FMV for one batch item, or why it couldn't be calculated."""
+    item_id: Optional[str] = None
+    fmv: Optional[FMVResponse] = None
+    error: Optional[str] = None
+
+
+class FMVBatchResponse(BaseModel):
+    """Batch FMV results, in request order."""
+    results: List[FMVBatchResult]
+
+
 class OfferRequest(BaseModel):
     """Request for offer calculation."""
     fmv: float = Field(..., description="Fair Market Value")
@@ -83,6 +111,14 @@ class OfferRequest(BaseModel):
     category: str
     user_id: Optional[str] = None
     inventory_count: int = Field(default=0, description="Current inventory of this item")
+    product_id: Optional[str] = Field(
+        None,
+        description="Canonical product id; looks up inventory_count from the inventory index when not given"
+    )
+    offer_id: Optional[str] = Field(
+        None,
+        description="Set when issuing the offer; reserves it against the daily spending limit"
+    )
 
 
 class OfferResponse(BaseModel):
@@ -97,6 +133,10 @@ class OfferResponse(BaseModel):
         default_factory=list,
         description="Comparable sales from FMV calculation"
     )
+    spending: Optional[Dict] = Field(
+        None,
+        description="Daily spending reservation (reserved, spent_today, remaining) for issued offers"
+    )
 
     class Config:
         json_schema_extra = {
@@ -3,9 +3,13 @@ Offer calculation engine.
 Applies category margins, condition multipliers, and dynamic adjustments.
 """
 import structlog
-from typing import Dict
+import numpy as np
+from typing import Dict, Optional, Sequence
 from datetime import datetime, timedelta
 from config.settings import settings
+from services.monitoring.metrics import metrics
+from .spending import spending_ledger
+from .rules import CompiledRules, pricing_rules
 
 logger = structlog.get_logger()
 
@@ -13,29 +17,18 @@ logger = structlog.get_logger()
 class OfferEngine:
     """Calculates purchase offers based on FMV and business rules."""
 
-    # Category-based margin targets (buy at X% of FMV)
-    CATEGORY_MARGINS = {
-        "Consumer Electronics": 0.60,
-        "Gaming": 0.60,
-        "Phones & Tablets": 0.65,
-        "Clothing & Fashion": 0.45,
-        "Collectibles & Vintage": 0.50,
-        "Books & Media": 0.35,
-        "Small Appliances": 0.50,
-        "Tools & Equipment": 0.55,
-        "Unknown": 0.50  # Default
-    }
-
-    # Condition multipliers (imported from vision/condition.py logic)
-    CONDITION_MULTIPLIERS = {
-        "New": 1.0,
-        "Like New": 0.925,
-        "Good": 0.80,
-        "Fair": 0.625,
-        "Poor": 0.40,
-        "Unknown": 0.50
-    }
+    # Category margins and condition multipliers live in the pricing rules
+    # file (config/pricing_rules.json), compiled and hot-reloaded by rules.py
 
+    # Seasonal demand bonus: applied when the month's index is 5%+ above normal
+    SEASONAL_MIN_LIFT = 0.05
+    MAX_SEASONAL_BONUS = 0.10
+
+    # Market velocity bonus when FMV is rising by 5%+ per month
+    VELOCITY_MIN_MONTHLY_TREND = 0.05
+    VELOCITY_BONUS = 0.05
+
+    @metrics.track_stage("offer")
     def calculate_offer(
         self,
         fmv: float,
@@ -44,7 +37,9 @@ class OfferEngine:
         inventory_count: int = 0,
         user_trust_score: float = 1.0,
         pricing_confidence: int = None,
-        comparable_sales: list = None
+        comparable_sales: list = None,
+        offer_id: Optional[str] = None,
+        trend: Optional[Dict] = None
     ) -> Dict:
         """
         Calculate purchase offer.
@@ -60,6 +55,10 @@ class OfferEngine:
             user_trust_score: User trust score (0.0-1.5)
             pricing_confidence: Confidence score from FMV calculation (0-100)
             comparable_sales: List of comparable sales from FMV
+            offer_id: Set when the offer is being issued; reserves the amount
+                against the daily spending limit
+            trend: Product trend snapshot (see PriceTrendTracker.snapshot)
+                for seasonal demand and market velocity adjustments
 
         Returns:
             Dict with offer breakdown
@@ -71,12 +70,11 @@ class OfferEngine:
             category=category
         )
 
-        # Normalize condition to title case (e.g. "good" → "Good", "like new" → "Like New")
-        condition = condition.strip().title() if condition else "Unknown"
-
-        # Get multipliers
-        condition_mult = self.CONDITION_MULTIPLIERS.get(condition, 0.50)
-        category_margin = self.CATEGORY_MARGINS.get(category, 0.50)
+        # Get multipliers (one snapshot of the rules for the whole quote;
+        # conditions are normalized, e.g. "like new" → "Like New")
+        rules = pricing_rules.current
+        condition_mult = rules.condition_multiplier(condition)
+        category_margin = rules.margin(category)
 
         # Calculate base offer
         base_offer = fmv * condition_mult * category_margin
@@ -85,7 +83,8 @@ class OfferEngine:
         adjustments = self._calculate_adjustments(
             category=category,
             inventory_count=inventory_count,
-            user_trust_score=user_trust_score
+            user_trust_score=user_trust_score,
+            trend=trend
         )
 
         # Apply adjustment multiplier
@@ -98,6 +97,9 @@ class OfferEngine:
         # Round to nearest dollar
         final_offer = round(final_offer, 0)
 
+        # Reserve against the daily spending limit (issued offers only)
+        spending = spending_ledger.reserve(offer_id, final_offer) if offer_id else None
+
         # Calculate expiry (24 hours)
         expires_at = (datetime.now() + timedelta(hours=24)).isoformat()
 
@@ -107,12 +109,14 @@ class OfferEngine:
                 "fmv": fmv,
                 "condition_multiplier": condition_mult,
                 "category_margin": category_margin,
-                "base_offer": round(base_offer, 2)
+                "base_offer": round(base_offer, 2),
+                "rules_version": rules.version
             },
             "adjustments": adjustments,
             "expires_at": expires_at,
             "pricing_confidence": pricing_confidence,
-            "comparable_sales": comparable_sales or []
+            "comparable_sales": comparable_sales or [],
+            "spending": spending
         }
 
         logger.info(
@@ -125,16 +129,58 @@ class OfferEngine:
 
         return result
 
+    def calculate_base_offers(
+        self,
+        fmv: np.ndarray,
+        condition_codes: np.ndarray,
+        category_codes: np.ndarray,
+        conditions: Sequence[str],
+        categories: Sequence[str],
+        rules: Optional[CompiledRules] = None
+    ) -> np.ndarray:
+        """
+        Vectorized offers without dynamic adjustments (for replays and backtests).
+
+        Same formula, safety limits and rounding as calculate_offer.
+
+        Args:
+            fmv: FMV per row
+            condition_codes: Index into conditions per row
+            category_codes: Index into categories per row
+            conditions: Condition names
+            categories: Category names
+            rules: Rules to price with (defaults to the active rules)
+
+        Returns:
+            Offer amount per row
+        """
+        rules = rules or pricing_rules.current
+
+        # Translate the caller's name tables to rule codes once; rows are then pure indexing
+        condition_mult = rules.condition_multipliers[rules.condition_codes_for(conditions)]
+        category_margin = rules.margins[rules.category_codes_for(categories)]
+        max_offer = np.array([
+            settings.max_electronics_offer if c == "Consumer Electronics" else np.inf
+            for c in categories
+        ])
+
+        offers = fmv * condition_mult[condition_codes] * category_margin[category_codes]
+        offers = np.minimum(np.maximum(offers, settings.min_offer_amount), max_offer[category_codes])
+        return np.round(offers, 0)
+
     def _calculate_adjustments(
         self,
         category: str,
         inventory_count: int,
-        user_trust_score: float
+        user_trust_score: float,
+        trend: Optional[Dict] = None
     ) -> Dict:
         """Calculate dynamic adjustments to base offer."""
         adjustments = {
             "inventory_saturation": 0.0,
             "user_trust_bonus": 0.0,
+            "seasonal_demand": 0.0,
+            "market_velocity": 0.0,
             "multiplier": 1.0
         }
 
@@ -151,8 +197,18 @@ class OfferEngine:
             adjustments["user_trust_bonus"] = trust_bonus
             adjustments["multiplier"] *= (1.0 + trust_bonus)
 
-        # TODO: Add seasonal demand adjustments
-        # TODO: Add market velocity bonus
+        if trend:
+            # Seasonal demand (e.g. holidays): this month trades above the product's norm
+            seasonal_lift = trend["seasonal_index"] - 1.0
+            if seasonal_lift >= self.SEASONAL_MIN_LIFT:
+                seasonal_bonus = min(self.MAX_SEASONAL_BONUS, seasonal_lift)
+                adjustments["seasonal_demand"] = round(seasonal_bonus, 4)
+                adjustments["multiplier"] *= (1.0 + seasonal_bonus)
+
+            # Market velocity: rising FMV means demand is outrunning supply
+            if trend["trend_per_day"] * 30 >= self.VELOCITY_MIN_MONTHLY_TREND:
+                adjustments["market_velocity"] = self.VELOCITY_BONUS
+                adjustments["multiplier"] *= (1.0 + self.VELOCITY_BONUS)
 
         return adjustments
 
@@ -167,7 +223,8 @@ class OfferEngine:
             max_offer = settings.max_electronics_offer
             offer = min(max_offer, offer)
 
-        # TODO: Add daily spending limit check
+        # The daily spending limit is enforced when an offer is issued
+        # (SpendingLedger), not per quote
 
         return offer
 
@@ -1,11 +1,20 @@
 """
 Dynamic Price Optimizer
 Time-based price decay for stale listings with market velocity detection.
+
+Features:
+- Per-offer analysis with a full explanation of each decision
+- Columnar sweep for full-inventory runs: numpy masks over offer arrays,
+  returning only the offers that should adjust
+- Next-evaluation times, so offers are only re-analyzed when their
+  decay tier or velocity band can change
 """
 import structlog
-from typing import Dict, Optional, List
-from datetime import datetime, timedelta
+import numpy as np
+from typing import Any, Dict, Optional, List, Sequence
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from services.monitoring.metrics import metrics
 
 logger = structlog.get_logger()
 
@@ -42,6 +51,10 @@ class PriceOptimizer:
     # Margin protection (original offer * 1.20 minimum)
     MARGIN_FLOOR_MULTIPLIER = 1.20
 
+    # Re-evaluate at least this often (the open-ended 30+ day tier keeps
+    # decaying toward the floor)
+    MAX_EVALUATION_INTERVAL_DAYS = 7
+
     def __init__(self):
         logger.info("price_optimizer_initialized")
 
@@ -195,6 +208,46 @@ class PriceOptimizer:
 
         return 0.0
 
+    def next_evaluation(
+        self,
+        created_at: datetime,
+        view_count: int,
+        now: datetime
+    ) -> datetime:
+        """
+        When an offer's recommendation can next change without new views.
+
+        With a fixed view count, the decision only moves when days_active
+        crosses a DECAY_SCHEDULE boundary or the falling views-per-day
+        crosses a velocity threshold. New views must be reported separately
+        (they can only raise velocity or leave a low-view tier).
+
+        Args:
+            created_at: When the offer was created
+            view_count: Total views so far
+            now: Evaluation time (same timezone awareness as created_at)
+
+        Returns:
+            Time of the next boundary, capped at MAX_EVALUATION_INTERVAL_DAYS
+        """
+        days_active = (now - created_at).days
+
+        boundaries = set()
+        for schedule in self.DECAY_SCHEDULE:
+            boundaries.add(schedule["min_days"])
+            if schedule["max_days"] is not None:
+                boundaries.add(schedule["max_days"] + 1)
+
+        # views / days drops below a threshold on the first day past views / threshold
+        for threshold in (self.HIGH_VELOCITY, self.MEDIUM_VELOCITY):
+            boundaries.add(int(view_count // threshold) + 1)
+
+        upcoming = [day for day in boundaries if day > days_active]
+        next_day = min(upcoming + [days_active + self.MAX_EVALUATION_INTERVAL_DAYS])
+
+        return created_at + timedelta(days=next_day)
+
+    @metrics.track_stage("optimizer_batch")
     def batch_analyze(
         self,
         offers: List[Dict],
@@ -255,6 +308,135 @@ class PriceOptimizer:
 
         return results
 
+    @metrics.track_stage("optimizer_sweep")
+    def sweep(
+        self,
+        offer_id: Sequence[str],
+        current_price: Sequence[float],
+        original_offer: Sequence[float],
+        created_at: Sequence[Any],
+        view_count: Sequence[int],
+        now: Optional[datetime] = None
+    ) -> Dict[str, List]:
+        """
+        Analyze a whole inventory in columnar form.
+
+        Applies the same rules as analyze_offer() (velocity, decay schedule,
+        price floor, minimum delta) as numpy masks over the offer arrays,
+        without per-offer logging.
+
+        Args:
+            offer_id: Offer UUIDs
+            current_price: Current offer amounts
+            original_offer: Initial offer amounts
+            created_at: Creation times (ISO strings, datetimes or datetime64)
+            view_count: Total views
+            now: Reference time (defaults to now)
+
+        Returns:
+            Columns for the offers that should adjust only:
+            {
+                "offer_id": [...],
+                "recommended_price": [...],
+                "reduction_percent": [...],
+                "reason": [...],
+                "velocity": [...],
+                "days_active": [...],
+                "price_floor": [...]
+            }
+        """
+        ids = np.asarray(offer_id, dtype=object)
+        current = np.asarray(current_price, dtype=float)
+        original = np.asarray(original_offer, dtype=float)
+        views = np.asarray(view_count, dtype=np.int64)
+        created = self._parse_timestamps(created_at)
+
+        if not (len(ids) == len(current) == len(original) == len(views) == len(created)):
+            raise ValueError("All offer columns must have the same length")
+
+        now = now or datetime.now(tz=timezone.utc)
+        if now.tzinfo is not None:
+            now = now.astimezone(timezone.utc).replace(tzinfo=None)
+        reference = np.datetime64(now, "s")
+        days_active = (reference - created) // np.timedelta64(1, "D")
+        velocity = views / np.maximum(days_active, 1)
+        price_floor = original * self.MARGIN_FLOOR_MULTIPLIER
+
+        # Decay tier: first matching schedule entry, as in _calculate_time_decay()
+        tiers = []
+        for schedule in self.DECAY_SCHEDULE:
+            matches = days_active >= schedule["min_days"]
+            if schedule["max_days"] is not None:
+                matches &= days_active <= schedule["max_days"]
+            if schedule["min_views"] > 0:
+                matches &= views < schedule["min_views"]
+            tiers.append(matches)
+        reduction = np.select(tiers, [s["reduction"] for s in self.DECAY_SCHEDULE], default=0.0)
+
+        decaying = (velocity < self.MEDIUM_VELOCITY) & (reduction > 0) & (current > 0)
+
+        recommended = current * (1 - reduction)
+        floored = recommended < price_floor
+        recommended = np.where(floored, price_floor, recommended)
+
+        # Only meaningful changes (at least $1 and 1%)
+        delta = current - recommended
+        with np.errstate(divide="ignore", invalid="ignore"):
+            actual_reduction = np.where(floored, delta / current, reduction)
+            adjust = decaying & (delta >= 1.0) & (delta / current >= 0.01)
+
+        index = np.flatnonzero(adjust)
+        reasons = [
+            f"price_floor_enforced_at_{price_floor[i]:.0f}" if floored[i]
+            else f"time_decay_{int(reduction[i] * 100)}pct_{days_active[i]}days_{views[i]}views"
+            for i in index
+        ]
+
+        logger.info(
+            "optimizer_sweep_complete",
+            total_offers=len(ids),
+            adjustments_recommended=len(index),
+            floor_enforced=int((adjust & floored).sum()),
+            high_velocity=int((velocity >= self.HIGH_VELOCITY).sum()),
+            medium_velocity=int(((velocity >= self.MEDIUM_VELOCITY) & (velocity < self.HIGH_VELOCITY)).sum())
+        )
+
+        return {
+            "offer_id": ids[index].tolist(),
+            "recommended_price": np.round(recommended[index], 2).tolist(),
+            "reduction_percent": (actual_reduction[index] * 100).tolist(),
+            "reason": reasons,
+            "velocity": velocity[index].tolist(),
+            "days_active": days_active[index].tolist(),
+            "price_floor": price_floor[index].tolist(),
+        }
+
+    def _parse_timestamps(self, values: Sequence[Any]) -> np.ndarray:
+        """
+        Parse creation times to naive datetime64[s].
+
+        UTC strings ("Z" / "+00:00") are parsed in bulk by numpy; anything
+        else falls back to datetime.fromisoformat per value.
+        """
+        if isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.datetime64):
+            return values.astype("datetime64[s]")
+
+        stripped = []
+        for value in values:
+            if isinstance(value, str):
+                if value.endswith("Z"):
+                    value = value[:-1]
+                elif value.endswith("+00:00"):
+                    value = value[:-6]
+                elif len(value) > 19 and value[-6] in "+-":
+                    parsed = datetime.fromisoformat(value)
+                    value = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            elif isinstance(value, datetime) and value.tzinfo is not None:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+            stripped.append(value)
+
+        return np.array(stripped, dtype="datetime64[s]")
+
 
 # Global instance
 price_optimizer = PriceOptimizer()
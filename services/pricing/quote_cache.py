@@ -0,0 +1,89 @@
+"""
+End-to-end quote cache.
+
+Repeat quotes (same canonical product, condition and category) reuse the
+FMV result - price, confidence, range and comparables - instead of running
+marketplace research and FMV again. Only the cheap OfferEngine step is
+re-run, so current adjustments and limits still apply.
+
+Features:
+- Keyed by canonical product id, condition grade and category
+- Stores the full FMVResponse plus when it was computed
+- Refreshed whenever a quote is priced from fresh marketplace stats
+- Checked before research: the backend's marketplace job first asks
+  /price with only product_id, and researches only on a 404
+"""
+import structlog
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from .models import FMVResponse
+from services.cache.redis_client import redis_cache
+from config.settings import settings
+
+logger = structlog.get_logger()
+
+
+class QuoteCache:
+    """Caches FMV results per product fingerprint."""
+
+    def key(self, product_id: str, condition: str, category: str) -> str:
+        """Cache key for a product fingerprint."""
+        return redis_cache.generate_cache_key(
+            "quote",
+            product=product_id,
+            condition=(condition or "Unknown").strip().lower(),
+            category=(category or "Unknown").strip().lower()
+        )
+
+    async def get(
+        self,
+        product_id: Optional[str],
+        condition: str,
+        category: str
+    ) -> Optional[Tuple[FMVResponse, Dict]]:
+        """
+        Look up a cached FMV result.
+
+        Returns:
+            (FMV result, freshness metadata with cached_at and age_seconds),
+            or None on a miss
+        """
+        if not product_id:
+            return None
+
+        cached = await redis_cache.get(self.key(product_id, condition, category))
+        if not cached:
+            return None
+
+        cached_at = datetime.fromisoformat(cached["cached_at"])
+        freshness = {
+            "cached_at": cached["cached_at"],
+            "age_seconds": round((datetime.now(tz=timezone.utc) - cached_at).total_seconds(), 1)
+        }
+
+        logger.info("quote_cache_hit", product_id=product_id, condition=condition, **freshness)
+        return FMVResponse(**cached["fmv"]), freshness
+
+    async def set(
+        self,
+        product_id: Optional[str],
+        condition: str,
+        category: str,
+        fmv: FMVResponse
+    ) -> bool:
+        """Store an FMV result computed from fresh marketplace stats."""
+        if not product_id or settings.quote_cache_ttl <= 0:
+            return False
+
+        return await redis_cache.set(
+            self.key(product_id, condition, category),
+            {
+                "fmv": fmv.model_dump(mode="json"),
+                "cached_at": datetime.now(tz=timezone.utc).isoformat()
+            },
+            ttl=settings.quote_cache_ttl
+        )
+
+
+# Global instance
+quote_cache = QuoteCache()
@@ -1,9 +1,13 @@
 """
 FastAPI router for pricing service endpoints.
 """
-from fastapi import APIRouter, HTTPException
+import json
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import Response
+from starlette.types import Receive, Scope, Send
 from .models import (
     FMVRequest, FMVResponse,
+    FMVBatchRequest, FMVBatchResponse, FMVBatchResult,
     OfferRequest, OfferResponse,
     ConfidenceRequest, ConfidenceResponse
 )
@@ -11,13 +15,20 @@ from .fmv import fmv_engine
 from .offer import offer_engine
 from .confidence import confidence_scorer
 from .optimizer import price_optimizer
-from typing import List, Dict, Any
-from pydantic import BaseModel
+from .scheduler import repricing_scheduler
+from .spending import spending_ledger
+from .inventory import inventory_index
+from .trends import price_trends
+from typing import AsyncIterator, Callable, List, Dict, Any, Literal
+from pydantic import BaseModel, Field
 import structlog
 
 logger = structlog.get_logger()
 router = APIRouter()
 
+# Offers analyzed per chunk in the streaming optimizer
+STREAM_CHUNK_SIZE = 5000
+
 
 # Optimizer models
 class OptimizerOfferInput(BaseModel):
@@ -37,6 +48,27 @@ class OptimizePricesResponse(BaseModel):
     results: Dict[str, Any]
 
 
+class OptimizeSweepRequest(BaseModel):
+    """Offers as parallel columns (one entry per offer in each list)."""
+    offer_id: List[str]
+    current_price: List[float]
+    original_offer: List[float]
+    created_at: List[str]
+    view_count: List[int]
+
+
+class InventoryEventRequest(BaseModel):
+    product_id: str
+    category: str
+    event: Literal["acquired", "sold", "removed"]
+    quantity: int = Field(default=1, ge=1)
+
+
+class OptimizeSweepResponse(BaseModel):
+    total_offers: int
+    adjustments: Dict[str, List[Any]]
+
+
 @router.post("/fmv", response_model=FMVResponse)
 async def calculate_fmv(request: FMVRequest):
     """
@@ -87,6 +119,46 @@ async def calculate_fmv(request: FMVRequest):
         )
 
 
+@router.post("/fmv/batch", response_model=FMVBatchResponse)
+async def calculate_fmv_batch(request: FMVBatchRequest):
+    """
+    Calculate Fair Market Value for many products in one call.
+
+    Same algorithm as /fmv, computed over the whole batch at once for
+    repricing jobs. Items without marketplace data get an error entry
+    instead of failing the batch.
+    """
+    try:
+        logger.info("fmv_batch_request", item_count=len(request.items))
+
+        results = [FMVBatchResult(item_id=item.item_id) for item in request.items]
+        priceable = []
+        for result, item in zip(results, request.items):
+            marketplace_stats = item.marketplace_data.get("stats", {})
+            if not marketplace_stats or marketplace_stats.get("count", 0) == 0:
+                result.error = "No marketplace data available. Cannot calculate FMV."
+                continue
+            priceable.append((result, {
+                "marketplace_stats": marketplace_stats,
+                "category": item.category,
+                "condition": item.condition,
+                "data_freshness": item.data_freshness
+            }))
+
+        fmvs = fmv_engine.calculate_fmv_batch([batch_item for _, batch_item in priceable])
+        for (result, _), fmv in zip(priceable, fmvs):
+            result.fmv = fmv
+
+        return FMVBatchResponse(results=results)
+
+    except Exception as e:
+        logger.error("fmv_batch_error", error=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to calculate FMV batch. Please try again."
+        )
+
+
 @router.post("/offer", response_model=OfferResponse)
 async def calculate_offer(request: OfferRequest):
     """
@@ -134,14 +206,23 @@ async def calculate_offer(request: OfferRequest):
                 detail="FMV must be greater than 0"
             )
 
+        inventory_count = request.inventory_count
+        if not inventory_count and request.product_id:
+            inventory_count = inventory_index.count(request.product_id, request.category)
+
         # Calculate offer (will receive pricing_confidence and comparable_sales if available)
         result = offer_engine.calculate_offer(
             fmv=request.fmv,
             condition=request.condition,
             category=request.category,
-            inventory_count=request.inventory_count
+            inventory_count=inventory_count,
+            offer_id=request.offer_id,
+            trend=price_trends.snapshot(request.product_id, request.condition)
         )
 
+        if result["spending"] is not None and not result["spending"]["reserved"]:
+            raise HTTPException(status_code=409, detail="Daily spending limit reached")
+
         # Calculate confidence for this offer
         # Use pricing_confidence if available, otherwise default
         pricing_confidence = result.get("pricing_confidence")
@@ -154,6 +235,9 @@ async def calculate_offer(request: OfferRequest):
 
         return response
 
+    except HTTPException:
+        raise
+
     except ValueError as e:
         logger.error("validation_error", error=str(e))
         raise HTTPException(status_code=400, detail=str(e))
@@ -242,6 +326,304 @@ async def optimize_prices(request: OptimizePricesRequest):
         )
 
 
+@router.post("/optimize-prices/sweep", response_model=OptimizeSweepResponse)
+async def optimize_prices_sweep(request: OptimizeSweepRequest):
+    """
+    Full-inventory price optimization in columnar form.
+
+    Same rules as /optimize-prices, evaluated over whole columns at once.
+    Only offers that should adjust are returned, also as columns.
+    """
+    try:
+        adjustments = price_optimizer.sweep(
+            offer_id=request.offer_id,
+            current_price=request.current_price,
+            original_offer=request.original_offer,
+            created_at=request.created_at,
+            view_count=request.view_count
+        )
+
+        return OptimizeSweepResponse(
+            total_offers=len(request.offer_id),
+            adjustments=adjustments
+        )
+
+    except ValueError as e:
+        logger.error("validation_error", error=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+    except Exception as e:
+        logger.error("optimize_prices_sweep_error", error=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to optimize prices: {str(e)}"
+        )
+
+
+class NDJSONStreamResponse(Response):
+    """
+    Streams a request body through a handler and its output back out.
+
+    Drives receive/send directly so the body is read by exactly one
+    consumer. StreamingResponse also listens for client disconnects on
+    receive(), which competes with reading a request body mid-response.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(self, handler: Callable[[AsyncIterator[bytes]], AsyncIterator[bytes]]):
+        super().__init__(media_type=self.media_type)
+        self.handler = handler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        async def body() -> AsyncIterator[bytes]:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                yield message.get("body", b"")
+                if not message.get("more_body", False):
+                    return
+
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": [(b"content-type", self.media_type.encode())]
+        })
+        async for chunk in self.handler(body()):
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+@router.post("/optimize-prices/stream")
+async def optimize_prices_stream():
+    """
+    Streaming price optimization over NDJSON.
+
+    The request body is one offer object per line (same fields as
+    /optimize-prices). Offers are analyzed in fixed-size chunks as they
+    arrive and each recommended adjustment is streamed back as one NDJSON
+    line, so memory stays flat and the caller can start applying changes
+    before the sweep finishes.
+
+    **Response lines:**
+    - Adjustment: {"offer_id", "recommended_price", "reduction_percent", "reason", ...}
+    - Bad input line: {"error", "line"}
+    - Last line: {"done": true, "total_offers", "adjustments_recommended"}
+    """
+    logger.info("optimize_prices_stream_request")
+    return NDJSONStreamResponse(_stream_recommendations)
+
+
+async def _stream_recommendations(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Analyze NDJSON offers chunk by chunk and yield NDJSON recommendations."""
+    columns = _empty_offer_columns()
+    total = 0
+    adjusted = 0
+
+    def flush():
+        nonlocal adjusted
+        try:
+            results = price_optimizer.sweep(**columns)
+        except ValueError as e:
+            # Unparseable created_at somewhere in this chunk
+            return (json.dumps({
+                "error": f"invalid offers: {e}",
+                "offer_ids": columns["offer_id"]
+            }) + "\n").encode()
+        fields = list(results)
+        lines = [
+            json.dumps(dict(zip(fields, values))) + "\n"
+            for values in zip(*results.values())
+        ]
+        adjusted += len(lines)
+        return "".join(lines).encode()
+
+    try:
+        line_number = 0
+        async for line in _ndjson_lines(body):
+            line_number += 1
+            try:
+                offer = json.loads(line)
+                if not isinstance(offer["created_at"], str):
+                    raise TypeError("created_at must be an ISO string")
+                row = (
+                    str(offer["offer_id"]),
+                    float(offer["current_price"]),
+                    float(offer["original_offer"]),
+                    offer["created_at"],
+                    int(offer.get("view_count", 0))
+                )
+            except (ValueError, KeyError, TypeError) as e:
+                yield (json.dumps({"error": f"invalid offer: {e}", "line": line_number}) + "\n").encode()
+                continue
+
+            for name, value in zip(columns, row):
+                columns[name].append(value)
+            total += 1
+
+            if len(columns["offer_id"]) >= STREAM_CHUNK_SIZE:
+                yield flush()
+                columns = _empty_offer_columns()
+
+        if columns["offer_id"]:
+            yield flush()
+
+    except Exception as e:
+        logger.error("optimize_prices_stream_error", error=str(e))
+        yield (json.dumps({"error": f"Failed to optimize prices: {str(e)}"}) + "\n").encode()
+
+    logger.info("optimize_prices_stream_complete", total_offers=total, adjustments_recommended=adjusted)
+    yield (json.dumps({
+        "done": True,
+        "total_offers": total,
+        "adjustments_recommended": adjusted
+    }) + "\n").encode()
+
+
+async def _ndjson_lines(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Split a streamed body into non-empty lines."""
+    buffer = b""
+    async for chunk in body:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+def _empty_offer_columns() -> Dict[str, List]:
+    return {
+        "offer_id": [],
+        "current_price": [],
+        "original_offer": [],
+        "created_at": [],
+        "view_count": []
+    }
+
+
+@router.post("/repricing/offers")
+async def track_repricing_offers(request: OptimizePricesRequest):
+    """
+    Register offers with the incremental repricing scheduler.
+
+    Send offers when they are created, repriced or get new views. Offers
+    without `last_optimized` are due immediately; the rest become due at
+    their next decay or velocity boundary.
+    """
+    try:
+        for offer in request.offers:
+            repricing_scheduler.upsert(offer.dict())
+
+        return {"tracked": len(request.offers)}
+
+    except ValueError as e:
+        logger.error("validation_error", error=str(e))
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.delete("/repricing/offers/{offer_id}")
+async def untrack_repricing_offer(offer_id: str):
+    """Stop repricing an offer (accepted, declined or expired)."""
+    if not repricing_scheduler.remove(offer_id):
+        raise HTTPException(status_code=404, detail="Offer not tracked")
+    return {"removed": offer_id}
+
+
+@router.get("/repricing/due-now")
+async def repricing_due_now(limit: int = Query(None, ge=1)):
+    """
+    Analyze only the offers whose pricing state can have changed.
+
+    Returns the number evaluated and, as columns, the offers that should
+    adjust (same shape as /optimize-prices/sweep). Evaluated offers are
+    rescheduled for their next boundary.
+    """
+    try:
+        return repricing_scheduler.due_now(limit=limit)
+
+    except Exception as e:
+        logger.error("repricing_due_now_error", error=str(e))
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to evaluate due offers: {str(e)}"
+        )
+
+
+@router.post("/spending/{offer_id}/release")
+async def release_spending(offer_id: str):
+    """Release an issued offer's spending reservation (declined or expired)."""
+    return {"offer_id": offer_id, "released": spending_ledger.release(offer_id)}
+
+
+@router.post("/spending/{offer_id}/confirm")
+async def confirm_spending(offer_id: str):
+    """Keep an accepted offer's reservation for the rest of its day."""
+    return {"offer_id": offer_id, "confirmed": spending_ledger.confirm(offer_id)}
+
+
+@router.get("/spending")
+async def spending_status():
+    """Today's spending against the daily limit (UTC day)."""
+    try:
+        return spending_ledger.status()
+    except Exception as e:
+        logger.error("spending_status_error", error=str(e))
+        raise HTTPException(status_code=503, detail="Spending ledger unavailable")
+
+
+@router.post("/inventory/events")
+async def record_inventory_event(request: InventoryEventRequest):
+    """
+    Record units acquired, sold or removed.
+
+    Keeps the inventory index behind the offer saturation adjustment
+    current; /offer looks counts up by `product_id`.
+    """
+    count = inventory_index.record_event(
+        request.product_id,
+        request.category,
+        request.event,
+        request.quantity
+    )
+    return {"product_id": request.product_id, "category": request.category, "count": count}
+
+
+@router.get("/inventory/{product_id}")
+async def inventory_count(product_id: str, category: str):
+    """Units held of a product, plus the category total."""
+    return {
+        "product_id": product_id,
+        "category": category,
+        "count": inventory_index.count(product_id, category),
+        "category_count": inventory_index.category_counts.get(category, 0)
+    }
+
+
+@router.get("/trends/{product_id}")
+async def product_trend(product_id: str, condition: str, history: bool = False):
+    """
+    FMV trend for a product: EWMAs, daily trend and this month's seasonal index.
+
+    `trend` is null until enough FMV observations have been recorded.
+    """
+    try:
+        result = {
+            "product_id": product_id,
+            "condition": condition,
+            "trend": price_trends.snapshot(product_id, condition)
+        }
+        if history:
+            result["history"] = price_trends.history(product_id, condition)
+        return result
+
+    except Exception as e:
+        logger.error("product_trend_error", product_id=product_id, error=str(e))
+        raise HTTPException(status_code=503, detail="Trend store unavailable")
+
+
 @router.get("/health")
 async def health_check():
     """Health check for pricing service."""
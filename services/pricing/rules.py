@@ -0,0 +1,233 @@
+"""
+Versioned pricing rules, compiled to dense lookup tables.
+
+Category margins, condition multipliers, per-category condition overrides
+(vision condition assessment) and confidence thresholds live in one JSON
+document (config/pricing_rules.json by default). It is compiled at load
+into numpy arrays indexed by category and condition codes, so a quote is a
+couple of array lookups and a batch quote is pure array indexing.
+
+Features:
+- One source of truth for OfferEngine, ConditionAssessor and ConfidenceScorer
+- Validation before swap: a broken document never replaces working rules
+- Atomic hot swap (one reference assignment) without restarting workers
+- Reload from the rules file (mtime watch) or from Redis (PRICING_RULES_KEY),
+  whichever carries the higher version (roll back by publishing the old
+  values under a new version)
+"""
+import asyncio
+import json
+import os
+import numpy as np
+import structlog
+from typing import Dict, List, Optional, Sequence
+from services.cache.redis_client import redis_cache
+from config.settings import settings
+
+logger = structlog.get_logger()
+
+DEFAULT_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "config",
+    "pricing_rules.json"
+)
+
+
+class CompiledRules:
+    """An immutable, compiled pricing rules document."""
+
+    # Code of the "Unknown" default slot is always the last index
+    DEFAULT = "Unknown"
+
+    def __init__(self, document: Dict):
+        """
+        Compile and validate a rules document.
+
+        Raises:
+            ValueError: If the document is missing sections or has values
+                out of range
+        """
+        try:
+            self.version = int(document["version"])
+            margins = self._section(document, "category_margins")
+            multipliers = self._section(document, "condition_multipliers")
+            overrides = self._section(document, "category_condition_multipliers", required=False)
+            for category, table in overrides.items():
+                if not isinstance(table, dict):
+                    raise TypeError(f"category_condition_multipliers[{category}] is not an object")
+            thresholds = self._section(document, "confidence_thresholds")
+            self.auto_price_threshold = int(thresholds["auto_price"])
+            self.flag_threshold = int(thresholds["flag"])
+            self.flag_min_offer_value = float(thresholds.get("flag_min_offer_value", 100.0))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid pricing rules document: {e!r}")
+
+        for name, table in (("category_margins", margins), ("condition_multipliers", multipliers)):
+            if self.DEFAULT not in table:
+                raise ValueError(f"{name} needs an '{self.DEFAULT}' default")
+        self._check_range("category_margins", margins.values(), 0.0, 1.0)
+        self._check_range("condition_multipliers", multipliers.values(), 0.0, 1.5)
+        for category, table in overrides.items():
+            self._check_range(f"category_condition_multipliers[{category}]", table.values(), 0.0, 1.5)
+        if not 0 <= self.flag_threshold <= self.auto_price_threshold <= 100:
+            raise ValueError("confidence_thresholds must satisfy 0 <= flag <= auto_price <= 100")
+
+        self.document = document
+
+        # Codes: named entries first, the Unknown default last
+        self.categories: List[str] = [c for c in margins if c != self.DEFAULT] + [self.DEFAULT]
+        self.conditions: List[str] = [c for c in multipliers if c != self.DEFAULT] + [self.DEFAULT]
+        self.category_codes = {c: i for i, c in enumerate(self.categories)}
+        self.condition_codes = {c: i for i, c in enumerate(self.conditions)}
+
+        self.margins = np.array([margins[c] for c in self.categories], dtype=float)
+        self.condition_multipliers = np.array([multipliers[c] for c in self.conditions], dtype=float)
+
+        # Vision multipliers: base row per category, then per-category overrides
+        self.assessed_multipliers = np.tile(self.condition_multipliers, (len(self.categories), 1))
+        for category, table in overrides.items():
+            row = self.category_codes.get(category)
+            if row is None:
+                raise ValueError(f"Override for unknown category: {category}")
+            for condition, value in table.items():
+                if condition not in self.condition_codes:
+                    raise ValueError(f"Override for unknown condition: {condition}")
+                self.assessed_multipliers[row, self.condition_codes[condition]] = value
+
+        for array in (self.margins, self.condition_multipliers, self.assessed_multipliers):
+            array.setflags(write=False)
+
+    def category_code(self, category: Optional[str]) -> int:
+        """Code for a category (unknown categories get the default slot)."""
+        return self.category_codes.get(category, len(self.categories) - 1)
+
+    def condition_code(self, condition: Optional[str]) -> int:
+        """Code for a condition, normalized to title case ("like new" -> "Like New")."""
+        normalized = condition.strip().title() if condition else self.DEFAULT
+        return self.condition_codes.get(normalized, len(self.conditions) - 1)
+
+    def category_codes_for(self, categories: Sequence[str]) -> np.ndarray:
+        """Codes for many category names."""
+        return np.array([self.category_code(c) for c in categories], dtype=np.int64)
+
+    def condition_codes_for(self, conditions: Sequence[str]) -> np.ndarray:
+        """Codes for many condition names."""
+        return np.array([self.condition_code(c) for c in conditions], dtype=np.int64)
+
+    def margin(self, category: Optional[str]) -> float:
+        return float(self.margins[self.category_code(category)])
+
+    def condition_multiplier(self, condition: Optional[str]) -> float:
+        return float(self.condition_multipliers[self.condition_code(condition)])
+
+    def assessed_multiplier(self, category: Optional[str], condition: Optional[str]) -> float:
+        """Condition multiplier including category-specific overrides."""
+        return float(self.assessed_multipliers[self.category_code(category), self.condition_code(condition)])
+
+    def with_overrides(
+        self,
+        category_margins: Optional[Dict[str, float]] = None,
+        condition_multipliers: Optional[Dict[str, float]] = None
+    ) -> "CompiledRules":
+        """A compiled copy with some margins or multipliers replaced (for backtests)."""
+        document = json.loads(json.dumps(self.document))
+        document["category_margins"].update(category_margins or {})
+        document["condition_multipliers"].update(condition_multipliers or {})
+        return CompiledRules(document)
+
+    def _section(self, document: Dict, name: str, required: bool = True) -> Dict:
+        """A document section that must be a JSON object."""
+        if not isinstance(document, dict):
+            raise TypeError("document is not an object")
+        if name not in document and not required:
+            return {}
+        section = document[name]
+        if not isinstance(section, dict):
+            raise TypeError(f"{name} is not an object")
+        return dict(section)
+
+    def _check_range(self, name: str, values, low: float, high: float):
+        for value in values:
+            if not isinstance(value, (int, float)) or not low < value <= high:
+                raise ValueError(f"{name} value {value!r} outside ({low}, {high}]")
+
+
+class PricingRules:
+    """Holds the active rules and hot-swaps them on change."""
+
+    PRICING_RULES_KEY = "pricing:rules"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.pricing_rules_path or DEFAULT_RULES_PATH
+        with open(self.path) as f:
+            self.current = CompiledRules(json.load(f))
+        self._mtime = os.path.getmtime(self.path)
+        logger.info("pricing_rules_loaded", version=self.current.version, path=self.path)
+
+    def load(self, document: Dict, source: str) -> bool:
+        """
+        Compile a document and swap it in if its version is newer.
+
+        Returns:
+            True if the active rules changed
+        """
+        compiled = CompiledRules(document)
+        if compiled.version <= self.current.version:
+            if source == "file" and compiled.document != self.current.document:
+                logger.warning(
+                    "pricing_rules_version_not_bumped",
+                    version=compiled.version,
+                    active_version=self.current.version,
+                    path=self.path
+                )
+            return False
+
+        previous = self.current.version
+        self.current = compiled  # Atomic: readers see old or new, never a mix
+        logger.info("pricing_rules_swapped", version=compiled.version, previous=previous, source=source)
+        return True
+
+    def check_for_updates(self) -> bool:
+        """
+        Reload from the rules file (if modified) and Redis (if published).
+
+        Invalid documents are logged and ignored; the active rules stay.
+
+        Returns:
+            True if the active rules changed
+        """
+        changed = False
+
+        try:
+            mtime = os.path.getmtime(self.path)
+            if mtime != self._mtime:
+                self._mtime = mtime
+                with open(self.path) as f:
+                    changed |= self.load(json.load(f), source="file")
+        except (OSError, ValueError) as e:
+            logger.error("pricing_rules_file_invalid", path=self.path, error=str(e))
+
+        try:
+            raw = redis_cache.client.get(self.PRICING_RULES_KEY)
+            if raw:
+                changed |= self.load(json.loads(raw), source="redis")
+        except ValueError as e:
+            logger.error("pricing_rules_redis_invalid", error=str(e))
+        except Exception as e:
+            logger.warning("pricing_rules_redis_unavailable", error=str(e))
+
+        return changed
+
+    async def run_background_reload(self, interval: Optional[float] = None):
+        """Check for new rules on a fixed interval until cancelled."""
+        interval = interval or settings.pricing_rules_poll_seconds
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.check_for_updates)
+            except Exception as e:
+                logger.error("pricing_rules_reload_failed", error=str(e))
+
+
+# Global instance
+pricing_rules = PricingRules()
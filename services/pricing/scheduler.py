@@ -0,0 +1,168 @@
+"""
+Incremental repricing scheduler.
+
+An offer's recommendation only changes when it crosses a decay boundary
+(day 7/14/30), its views-per-day falls through a velocity threshold, or it
+gets new views. The scheduler keeps every tracked offer in a Redis sorted
+set scored by its next-evaluation time, so a repricing run only analyzes
+the offers that are due instead of sweeping the whole table.
+
+Features:
+- Shared by every worker and survives restarts (Redis ZSET + offer hash)
+- O(log n) upserts; due offers claimed atomically with a Lua script, so
+  two workers never evaluate the same offer
+- Claimed offers are leased: if a run dies mid-way they become due again
+- Next-evaluation times from PriceOptimizer.next_evaluation()
+- Due offers analyzed together with the columnar PriceOptimizer.sweep()
+"""
+import json
+import structlog
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from .optimizer import price_optimizer
+from services.cache.redis_client import redis_cache
+
+logger = structlog.get_logger()
+
+
+# KEYS[1] due zset, KEYS[2] offer hash
+# ARGV[1] cutoff, ARGV[2] limit (-1 for all), ARGV[3] lease expiry
+CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+local offers = {}
+for _, offer_id in ipairs(ids) do
+    local offer = redis.call('HGET', KEYS[2], offer_id)
+    if offer then
+        redis.call('ZADD', KEYS[1], ARGV[3], offer_id)
+        offers[#offers + 1] = offer
+    else
+        redis.call('ZREM', KEYS[1], offer_id)
+    end
+end
+return offers
+"""
+
+
+class RepricingScheduler:
+    """Tracks offers and hands out the ones whose pricing state can change."""
+
+    DUE_KEY = "repricing:due"
+    OFFERS_KEY = "repricing:offers"
+
+    # A claimed offer is due again after this long unless it is rescheduled
+    LEASE_SECONDS = 300
+
+    def __init__(self):
+        self._claim = redis_cache.client.register_script(CLAIM_SCRIPT)
+
+    def upsert(self, offer: Dict) -> datetime:
+        """
+        Track an offer (new, repriced or with new views) and schedule it.
+
+        An offer never evaluated (no last_optimized) is due immediately;
+        otherwise it is due at the first boundary after its last evaluation.
+
+        Args:
+            offer: Offer dict with offer_id, current_price, original_offer,
+                created_at (ISO string or datetime), view_count and
+                optional last_optimized
+
+        Returns:
+            When the offer is next due
+        """
+        created_at = self._parse_time(offer["created_at"])
+        if offer.get("last_optimized"):
+            due = price_optimizer.next_evaluation(
+                created_at,
+                int(offer.get("view_count", 0)),
+                self._parse_time(offer["last_optimized"])
+            )
+        else:
+            due = created_at
+
+        pipe = redis_cache.client.pipeline(transaction=True)
+        pipe.hset(self.OFFERS_KEY, offer["offer_id"], json.dumps(offer, default=self._encode))
+        pipe.zadd(self.DUE_KEY, {offer["offer_id"]: due.timestamp()})
+        pipe.execute()
+
+        return due
+
+    def remove(self, offer_id: str) -> bool:
+        """Stop tracking an offer (accepted, declined or expired)."""
+        pipe = redis_cache.client.pipeline(transaction=True)
+        pipe.hdel(self.OFFERS_KEY, offer_id)
+        pipe.zrem(self.DUE_KEY, offer_id)
+        removed, _ = pipe.execute()
+        return bool(removed)
+
+    def due_now(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> Dict:
+        """
+        Claim the offers that are due, analyze them and reschedule them.
+
+        Args:
+            now: Reference time (defaults to now)
+            limit: Maximum offers to evaluate in this call
+
+        Returns:
+            {
+                "evaluated": number of due offers analyzed,
+                "pending": offers still tracked,
+                "adjustments": PriceOptimizer.sweep() columns (offers to adjust)
+            }
+        """
+        now = now or datetime.now(tz=timezone.utc)
+        cutoff = now.timestamp()
+
+        claimed = self._claim(
+            keys=[self.DUE_KEY, self.OFFERS_KEY],
+            args=[cutoff, -1 if limit is None else limit, cutoff + self.LEASE_SECONDS]
+        )
+        due = [json.loads(offer) for offer in claimed]
+
+        if due:
+            adjustments = price_optimizer.sweep(
+                offer_id=[o["offer_id"] for o in due],
+                current_price=[float(o["current_price"]) for o in due],
+                original_offer=[float(o["original_offer"]) for o in due],
+                created_at=[o["created_at"] for o in due],
+                view_count=[int(o.get("view_count", 0)) for o in due],
+                now=now
+            )
+        else:
+            adjustments = {}
+
+        # Evaluated offers wait for their next boundary (or an upsert)
+        for offer in due:
+            self.upsert({**offer, "last_optimized": now})
+
+        pending = redis_cache.client.zcard(self.DUE_KEY)
+        logger.info(
+            "repricing_due_evaluated",
+            evaluated=len(due),
+            adjustments=len(adjustments.get("offer_id", [])),
+            tracked=pending
+        )
+
+        return {
+            "evaluated": len(due),
+            "pending": pending,
+            "adjustments": adjustments
+        }
+
+    def _encode(self, value: Any) -> str:
+        """JSON fallback for datetimes in offer dicts."""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+    def _parse_time(self, value) -> datetime:
+        """ISO string or datetime to an aware UTC datetime."""
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
+# Global instance
+repricing_scheduler = RepricingScheduler()
@@ -0,0 +1,233 @@
+"""
+Daily spending ledger shared by every worker.
+
+Offers reserve their amount against settings.daily_spending_limit when they
+are issued. A reservation lasts as long as the offer
+(settings.spending_reservation_ttl): if the offer is neither accepted nor
+released by then, it expires and its amount goes back to the day's total.
+Declined offers release immediately; accepted offers are confirmed and
+count for the rest of the day. The limit holds across workers and pods
+without summing offers in the database.
+
+Features:
+- One Redis round trip per call (Lua reserve / release / confirm scripts)
+- Per-day reservation hash and expiry ZSET, reconciled into the day total
+  on every call, so ignored offers stop blocking purchases on their own
+- Day-bucketed totals (UTC) with a TTL, so old days clean themselves up
+- Idempotent: reserving the same offer twice only counts it once
+- Fails open (logged) when Redis is unavailable, so quoting keeps working
+"""
+import time
+import structlog
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from services.cache.redis_client import redis_cache
+from config.settings import settings
+
+logger = structlog.get_logger()
+
+
+# Reconcile a day: expired reservations give their amount back.
+# KEYS[1] day total, KEYS[2] reservation amounts (hash), KEYS[3] reservation
+# expiries (zset); ARGV[1] now
+_RECONCILE = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', ARGV[1])
+for _, offer_id in ipairs(expired) do
+    local amount = redis.call('HGET', KEYS[2], offer_id)
+    if amount then
+        redis.call('INCRBYFLOAT', KEYS[1], '-' .. amount)
+        redis.call('HDEL', KEYS[2], offer_id)
+    end
+    redis.call('ZREM', KEYS[3], offer_id)
+end
+"""
+
+# KEYS[1..3] day keys, KEYS[4] offer reservation
+# ARGV[1] now, ARGV[2] amount, ARGV[3] limit, ARGV[4] day key ttl,
+# ARGV[5] day, ARGV[6] reservation expiry (epoch), ARGV[7] offer id
+RESERVE_SCRIPT = _RECONCILE + """
+if redis.call('HEXISTS', KEYS[2], ARGV[7]) == 1 then
+    return {1, redis.call('GET', KEYS[1]) or '0'}
+end
+local spent = tonumber(redis.call('GET', KEYS[1]) or '0')
+if spent + tonumber(ARGV[2]) > tonumber(ARGV[3]) then
+    return {0, tostring(spent)}
+end
+local total = redis.call('INCRBYFLOAT', KEYS[1], ARGV[2])
+redis.call('HSET', KEYS[2], ARGV[7], ARGV[2])
+redis.call('ZADD', KEYS[3], ARGV[6], ARGV[7])
+for i = 1, 3 do
+    redis.call('EXPIRE', KEYS[i], ARGV[4])
+end
+redis.call('SET', KEYS[4], ARGV[5], 'EX', ARGV[4])
+return {1, total}
+"""
+
+# KEYS[1..3] day keys; ARGV[1] now
+STATUS_SCRIPT = _RECONCILE + """
+return redis.call('GET', KEYS[1]) or '0'
+"""
+
+# KEYS[1] offer reservation; ARGV[1] now, ARGV[2..4] day key prefixes,
+# ARGV[5] offer id
+RELEASE_SCRIPT = """
+local day = redis.call('GET', KEYS[1])
+if not day then
+    return 0
+end
+redis.call('DEL', KEYS[1])
+local amounts = ARGV[3] .. day
+local amount = redis.call('HGET', amounts, ARGV[5])
+if not amount then
+    return 0
+end
+redis.call('HDEL', amounts, ARGV[5])
+redis.call('ZREM', ARGV[4] .. day, ARGV[5])
+redis.call('INCRBYFLOAT', ARGV[2] .. day, '-' .. amount)
+return 1
+"""
+
+# KEYS[1] offer reservation; ARGV[1] expiries key prefix, ARGV[2] offer id
+CONFIRM_SCRIPT = """
+local day = redis.call('GET', KEYS[1])
+if not day or not redis.call('ZSCORE', ARGV[1] .. day, ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', ARGV[1] .. day, '+inf', ARGV[2])
+return 1
+"""
+
+
+class SpendingLedger:
+    """Atomic per-day spending reservations in Redis."""
+
+    DAY_KEY_PREFIX = "spending:day:"
+    AMOUNTS_KEY_PREFIX = "spending:amounts:"
+    EXPIRIES_KEY_PREFIX = "spending:expiries:"
+    OFFER_KEY_PREFIX = "spending:offer:"
+
+    # Keep day totals and reservations past the longest offer lifetime
+    TTL_SECONDS = 2 * 86400
+
+    def __init__(self):
+        self._reserve = redis_cache.client.register_script(RESERVE_SCRIPT)
+        self._status = redis_cache.client.register_script(STATUS_SCRIPT)
+        self._release = redis_cache.client.register_script(RELEASE_SCRIPT)
+        self._confirm = redis_cache.client.register_script(CONFIRM_SCRIPT)
+
+    def reserve(
+        self,
+        offer_id: str,
+        amount: float,
+        day: Optional[str] = None,
+        ttl: Optional[int] = None
+    ) -> Dict:
+        """
+        Reserve an offer's amount against today's spending limit.
+
+        Args:
+            offer_id: Offer UUID (reserving it again is a no-op)
+            amount: Offer amount in USD
+            day: UTC day bucket (YYYY-MM-DD), defaults to today
+            ttl: Seconds until the reservation expires unless confirmed
+                (defaults to settings.spending_reservation_ttl, the offer
+                lifetime)
+
+        Returns:
+            {"reserved": bool, "spent_today": float, "remaining": float}
+        """
+        day = day or self._today()
+        limit = settings.daily_spending_limit
+        now = time.time()
+        expires_at = now + (ttl or settings.spending_reservation_ttl)
+        try:
+            reserved, spent = self._reserve(
+                keys=self._day_keys(day) + [self.OFFER_KEY_PREFIX + offer_id],
+                args=[now, amount, limit, self.TTL_SECONDS, day, expires_at, offer_id]
+            )
+        except Exception as e:
+            logger.error("spending_ledger_unavailable", offer_id=offer_id, error=str(e))
+            return {"reserved": True, "spent_today": None, "remaining": None}
+
+        spent = float(spent)
+        result = {
+            "reserved": bool(reserved),
+            "spent_today": round(spent, 2),
+            "remaining": round(max(0.0, limit - spent), 2)
+        }
+        if not result["reserved"]:
+            logger.warning("daily_spending_limit_reached", offer_id=offer_id, amount=amount, **result)
+        return result
+
+    def release(self, offer_id: str) -> bool:
+        """
+        Release an offer's reservation (declined, or expired before the
+        reservation itself timed out).
+
+        Accepted (confirmed) offers can still be released, e.g. when the
+        purchase is cancelled.
+
+        Returns:
+            True if a reservation was released
+        """
+        try:
+            released = bool(self._release(
+                keys=[self.OFFER_KEY_PREFIX + offer_id],
+                args=[
+                    time.time(), self.DAY_KEY_PREFIX, self.AMOUNTS_KEY_PREFIX,
+                    self.EXPIRIES_KEY_PREFIX, offer_id
+                ]
+            ))
+        except Exception as e:
+            logger.error("spending_ledger_unavailable", offer_id=offer_id, error=str(e))
+            return False
+
+        if released:
+            logger.info("spending_reservation_released", offer_id=offer_id)
+        return released
+
+    def confirm(self, offer_id: str) -> bool:
+        """
+        Keep an accepted offer's reservation for the rest of its day (it is
+        real spend, so it must not expire with the offer).
+
+        Returns:
+            True if a live reservation was confirmed
+        """
+        try:
+            confirmed = bool(self._confirm(
+                keys=[self.OFFER_KEY_PREFIX + offer_id],
+                args=[self.EXPIRIES_KEY_PREFIX, offer_id]
+            ))
+        except Exception as e:
+            logger.error("spending_ledger_unavailable", offer_id=offer_id, error=str(e))
+            return False
+
+        if confirmed:
+            logger.info("spending_reservation_confirmed", offer_id=offer_id)
+        return confirmed
+
+    def status(self, day: Optional[str] = None) -> Dict:
+        """Spending so far for a day (defaults to today)."""
+        day = day or self._today()
+        spent = float(self._status(keys=self._day_keys(day), args=[time.time()]))
+        return {
+            "day": day,
+            "spent": round(spent, 2),
+            "limit": settings.daily_spending_limit,
+            "remaining": round(max(0.0, settings.daily_spending_limit - spent), 2)
+        }
+
+    def _day_keys(self, day: str) -> List[str]:
+        return [
+            self.DAY_KEY_PREFIX + day,
+            self.AMOUNTS_KEY_PREFIX + day,
+            self.EXPIRIES_KEY_PREFIX + day
+        ]
+
+    def _today(self) -> str:
+        return datetime.now(tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+# Global instance
+spending_ledger = SpendingLedger()
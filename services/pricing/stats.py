@@ -0,0 +1,190 @@
+"""
+Shared price statistics for marketplace stats and FMV.
+
+Features:
+- Weighted quantiles: sort once, cumulative weights, every requested
+  quantile interpolated in the same pass (row-wise for 2-D inputs)
+- Grouped variant (e.g. per marketplace source) in the same single sort
+- Bootstrap confidence intervals for the (weighted) median and mean from
+  a single resampling matrix
+"""
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+
+def weighted_quantiles(
+    values: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+    quantiles: Sequence[float] = (0.5,),
+    presorted: bool = False
+) -> np.ndarray:
+    """
+    Weighted quantiles along the last axis.
+
+    Each value sits at the midpoint of its cumulative weight,
+    (cumsum - w/2) / total, and quantiles interpolate linearly between
+    those positions (clamped to the smallest/largest value). With equal
+    weights the median matches np.median.
+
+    Args:
+        values: Values, 1-D or (rows x n)
+        weights: Positive weights, same shape as values (default: equal)
+        quantiles: Quantiles in [0, 1]
+        presorted: Values (and weights) are already sorted along the last axis
+
+    Returns:
+        Array of shape values.shape[:-1] + (len(quantiles),)
+    """
+    values = np.asarray(values, dtype=float)
+    if weights is None:
+        weights = np.ones_like(values)
+    else:
+        weights = np.broadcast_to(np.asarray(weights, dtype=float), values.shape)
+
+    if not presorted:
+        order = np.argsort(values, axis=-1, kind="stable")
+        values = np.take_along_axis(values, order, axis=-1)
+        weights = np.take_along_axis(weights, order, axis=-1)
+
+    cumulative = np.cumsum(weights, axis=-1)
+    positions = (cumulative - weights / 2) / cumulative[..., -1:]
+
+    q = np.asarray(quantiles, dtype=float)
+    n = values.shape[-1]
+
+    # Per row and quantile: the first position above q
+    above = (positions[..., None, :] <= q[:, None]).sum(axis=-1)
+    hi = np.minimum(above, n - 1)
+    lo = np.maximum(above - 1, 0)
+
+    p_lo = np.take_along_axis(positions, lo, axis=-1)
+    p_hi = np.take_along_axis(positions, hi, axis=-1)
+    v_lo = np.take_along_axis(values, lo, axis=-1)
+    v_hi = np.take_along_axis(values, hi, axis=-1)
+
+    span = p_hi - p_lo
+    frac = np.divide(q - p_lo, span, out=np.zeros_like(span), where=span > 0)
+    return v_lo + np.clip(frac, 0.0, 1.0) * (v_hi - v_lo)
+
+
+def grouped_weighted_quantiles(
+    values: np.ndarray,
+    weights: np.ndarray,
+    groups: np.ndarray,
+    n_groups: int,
+    quantiles: Sequence[float] = (0.5,)
+) -> np.ndarray:
+    """
+    Weighted quantiles per group from one sort of all values.
+
+    Same definition as weighted_quantiles. Values are sorted by (group,
+    value); each group's positions lie in (0, 1), so offsetting them by
+    the group code gives one increasing key, and a single searchsorted
+    finds every group's quantiles.
+
+    Args:
+        values: Values
+        weights: Positive weights per value
+        groups: Group code per value (0 .. n_groups - 1)
+        n_groups: Number of groups
+        quantiles: Quantiles in [0, 1]
+
+    Returns:
+        Array of shape (n_groups, len(quantiles)); NaN for empty groups
+    """
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    groups = np.asarray(groups, dtype=np.int64)
+    q = np.asarray(quantiles, dtype=float)
+    if len(values) == 0:
+        return np.full((n_groups, len(q)), np.nan)
+
+    order = np.lexsort((values, groups))
+    values, weights, groups = values[order], weights[order], groups[order]
+
+    counts = np.bincount(groups, minlength=n_groups)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    totals = np.bincount(groups, weights=weights, minlength=n_groups)
+
+    cumulative = np.cumsum(weights)
+    before = np.concatenate(([0.0], cumulative))[starts]
+    positions = (cumulative - before[groups] - weights / 2) / totals[groups]
+    key = groups + positions
+
+    above = np.searchsorted(key, np.arange(n_groups)[:, None] + q[None, :], side="right")
+    last = np.maximum(ends - 1, 0)[:, None]
+    hi = np.clip(above, starts[:, None], last)
+    lo = np.clip(above - 1, starts[:, None], last)
+
+    span = positions[hi] - positions[lo]
+    frac = np.divide(q[None, :] - positions[lo], span, out=np.zeros(span.shape), where=span > 0)
+    result = values[lo] + np.clip(frac, 0.0, 1.0) * (values[hi] - values[lo])
+    result[counts == 0] = np.nan
+    return result
+
+
+def bootstrap_intervals(
+    prices: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+    resamples: int = 1000,
+    confidence: float = 0.95,
+    rng: Optional[np.random.Generator] = None
+) -> Dict[str, Tuple[float, float]]:
+    """
+    Bootstrap confidence intervals for the median and mean (both weighted
+    when weights are given).
+
+    One (resamples x n) index matrix is drawn into the sorted prices, so
+    each resample's median comes from one np.partition (or, weighted, one
+    integer sort and weighted_quantiles) and means are row sums; there is
+    no per-resample loop.
+
+    Args:
+        prices: Sale prices
+        weights: Optional per-price weights (e.g. recency)
+        resamples: Bootstrap resamples
+        confidence: Interval coverage (0.95 -> 2.5th to 97.5th percentile)
+        rng: Random generator (defaults to a fresh one)
+
+    Returns:
+        {"median": (low, high), "mean": (low, high)}
+    """
+    prices = np.asarray(prices, dtype=float)
+    rng = rng or np.random.default_rng()
+    n = len(prices)
+
+    # Sorted order: index order is price order, so order statistics of
+    # the indices are order statistics of the prices
+    order = np.argsort(prices, kind="stable")
+    prices = prices[order]
+    idx = rng.integers(0, n, size=(resamples, n), dtype=np.int32)
+
+    if weights is None:
+        # One partition finds the upper middle; for even n the lower middle
+        # is the largest index left of it
+        half = n // 2
+        parted = np.partition(idx, half, axis=1)
+        upper = parted[:, half]
+        lower = parted[:, :half].max(axis=1) if n % 2 == 0 else upper
+        medians = (prices[lower] + prices[upper]) / 2
+        means = np.take(prices, idx).mean(axis=1)
+    else:
+        # Sorted indices give each resample's prices already in order
+        w = np.asarray(weights, dtype=float)[order]
+        idx.sort(axis=1)
+        sample_weights = np.take(w, idx)
+        medians = weighted_quantiles(
+            np.take(prices, idx), sample_weights, (0.5,), presorted=True
+        )[:, 0]
+        means = np.take(prices * w, idx).sum(axis=1) / sample_weights.sum(axis=1)
+
+    tail = (1.0 - confidence) / 2
+    (median_low, median_high), (mean_low, mean_high) = weighted_quantiles(
+        np.stack([medians, means]), quantiles=(tail, 1 - tail)
+    )
+
+    return {
+        "median": (float(median_low), float(median_high)),
+        "mean": (float(mean_low), float(mean_high))
+    }
@@ -0,0 +1,232 @@
+"""
+Per-product FMV trend tracking.
+
+Every freshly calculated FMV for a canonical product is folded into a small
+Redis hash of exponentially weighted averages, so the quote path can apply
+trend and seasonal adjustments with one read instead of a historical query.
+
+Features:
+- Time-decayed EWMAs (fast and slow) for irregularly spaced observations
+- At most one observation per product per interval, so quote volume
+  can't unlock trend bonuses; snapshots also need days of history
+- Trend slope from the gap between the two EWMAs
+- Monthly seasonal index (time-weighted EWMA of FMV relative to the slow
+  baseline)
+- Fixed-size ring buffer of raw observations for charts and backfills
+- One atomic Lua update per observation; O(1) snapshot reads
+"""
+import structlog
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from services.cache.redis_client import redis_cache
+
+logger = structlog.get_logger()
+
+
+# KEYS[1] state hash, KEYS[2] history list
+# ARGV[1] fmv, ARGV[2] timestamp, ARGV[3] month, ARGV[4] fast tau (s),
+# ARGV[5] slow tau (s), ARGV[6] seasonal tau (s), ARGV[7] ring size,
+# ARGV[8] ttl, ARGV[9] min interval (s), ARGV[10] max seasonal step (s)
+OBSERVE_SCRIPT = """
+local fmv = tonumber(ARGV[1])
+local ts = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'level', 'baseline', 'last_ts')
+local level = tonumber(state[1])
+local baseline = tonumber(state[2])
+local last_ts = tonumber(state[3])
+local step = 0
+if not level then
+    level = fmv
+    baseline = fmv
+    last_ts = ts
+    redis.call('HSET', KEYS[1], 'first_ts', ts)
+else
+    -- One observation per interval: quote volume must not drive the state
+    if ts - last_ts < tonumber(ARGV[9]) then
+        return false
+    end
+    local dt = ts - last_ts
+    level = level + (1 - math.exp(-dt / tonumber(ARGV[4]))) * (fmv - level)
+    baseline = baseline + (1 - math.exp(-dt / tonumber(ARGV[5]))) * (fmv - baseline)
+    last_ts = ts
+    step = math.min(dt, tonumber(ARGV[10]))
+end
+local season_field = 'season:' .. ARGV[3]
+local ratio = fmv / baseline
+local season = tonumber(redis.call('HGET', KEYS[1], season_field))
+if season then
+    season = season + (1 - math.exp(-step / tonumber(ARGV[6]))) * (ratio - season)
+else
+    season = ratio
+end
+redis.call('HSET', KEYS[1], 'level', level, 'baseline', baseline, 'last_ts', last_ts, season_field, season)
+redis.call('HINCRBY', KEYS[1], 'n', 1)
+redis.call('HINCRBYFLOAT', KEYS[1], 'season_days:' .. ARGV[3], step / 86400)
+redis.call('LPUSH', KEYS[2], ARGV[2] .. '|' .. ARGV[1])
+redis.call('LTRIM', KEYS[2], 0, tonumber(ARGV[7]) - 1)
+redis.call('EXPIRE', KEYS[1], ARGV[8])
+redis.call('EXPIRE', KEYS[2], ARGV[8])
+return tostring(level)
+"""
+
+
+class PriceTrendTracker:
+    """Incremental FMV trend and seasonality per product and condition."""
+
+    KEY_PREFIX = "trend:"
+
+    # EWMA time constants (days)
+    FAST_TAU_DAYS = 7.0
+    SLOW_TAU_DAYS = 60.0
+
+    # Seasonal index time constant (days); each observation is weighted by
+    # the time since the previous one, capped so one point after a long
+    # gap doesn't overwrite the month
+    SEASONAL_TAU_DAYS = 10.0
+    SEASONAL_MAX_STEP_DAYS = 1.0
+
+    # At most one observation per product and condition per interval
+    # (repeat quotes within it are ignored)
+    MIN_OBSERVATION_INTERVAL_SECONDS = 6 * 3600
+
+    # Raw observations kept per product (ring buffer)
+    HISTORY_SIZE = 120
+
+    # Keep state past a full year so seasonal indices survive
+    TTL_SECONDS = 400 * 86400
+
+    # Below these the signal is noise; snapshot reports no trend
+    MIN_OBSERVATIONS = 5
+    MIN_HISTORY_DAYS = 7.0
+    MIN_SEASON_DAYS = 7.0
+
+    def __init__(self):
+        self._observe = redis_cache.client.register_script(OBSERVE_SCRIPT)
+
+    def observe(
+        self,
+        product_id: str,
+        condition: str,
+        fmv: float,
+        at: Optional[datetime] = None
+    ) -> bool:
+        """
+        Fold a freshly calculated FMV into the product's trend.
+
+        Args:
+            product_id: Canonical product id
+            condition: Item condition (each condition has its own series)
+            fmv: Fair Market Value in USD
+            at: Observation time (defaults to now)
+
+        Returns:
+            True if recorded (False within the observation interval of the
+            previous one, or when Redis is unavailable)
+        """
+        if fmv <= 0:
+            return False
+
+        at = at or datetime.now(tz=timezone.utc)
+        key = self._key(product_id, condition)
+        try:
+            level = self._observe(
+                keys=[key, key + ":history"],
+                args=[
+                    fmv,
+                    int(at.timestamp()),
+                    at.month,
+                    self.FAST_TAU_DAYS * 86400,
+                    self.SLOW_TAU_DAYS * 86400,
+                    self.SEASONAL_TAU_DAYS * 86400,
+                    self.HISTORY_SIZE,
+                    self.TTL_SECONDS,
+                    self.MIN_OBSERVATION_INTERVAL_SECONDS,
+                    self.SEASONAL_MAX_STEP_DAYS * 86400
+                ]
+            )
+        except Exception as e:
+            logger.error("price_trend_observe_failed", product_id=product_id, error=str(e))
+            return False
+        return level is not None
+
+    def snapshot(
+        self,
+        product_id: Optional[str],
+        condition: str,
+        at: Optional[datetime] = None
+    ) -> Optional[Dict]:
+        """
+        Current trend for a product (one Redis read).
+
+        Args:
+            product_id: Canonical product id
+            condition: Item condition
+            at: Time for the seasonal index (defaults to now)
+
+        Returns:
+            {"level", "baseline", "trend_per_day", "seasonal_index",
+             "observations"}, or None without enough history
+        """
+        if not product_id:
+            return None
+
+        try:
+            state = redis_cache.client.hgetall(self._key(product_id, condition))
+        except Exception as e:
+            logger.error("price_trend_read_failed", product_id=product_id, error=str(e))
+            return None
+
+        observations = int(state.get("n", 0))
+        if observations < self.MIN_OBSERVATIONS:
+            return None
+        history_days = (float(state["last_ts"]) - float(state["first_ts"])) / 86400
+        if history_days < self.MIN_HISTORY_DAYS:
+            return None
+
+        level = float(state["level"])
+        baseline = float(state["baseline"])
+        month = (at or datetime.now(tz=timezone.utc)).month
+
+        return {
+            "level": round(level, 2),
+            "baseline": round(baseline, 2),
+            # A linear trend of slope m keeps the fast EWMA m * (tau_slow - tau_fast) ahead
+            "trend_per_day": round(
+                (level - baseline) / baseline / (self.SLOW_TAU_DAYS - self.FAST_TAU_DAYS), 5
+            ),
+            "seasonal_index": round(self._seasonal_index(state, month), 4),
+            "observations": observations
+        }
+
+    def history(self, product_id: str, condition: str) -> List[Tuple[str, float]]:
+        """Raw observations, newest first, as (ISO timestamp, fmv)."""
+        raw = redis_cache.client.lrange(self._key(product_id, condition) + ":history", 0, -1)
+        points = []
+        for entry in raw:
+            ts, fmv = entry.split("|", 1)
+            points.append((
+                datetime.fromtimestamp(int(ts), tz=timezone.utc).isoformat(),
+                float(fmv)
+            ))
+        return points
+
+    def _seasonal_index(self, state: Dict[str, str], month: int) -> float:
+        """Month's index relative to the mean of the established months."""
+        established = {
+            m: float(state[f"season:{m}"])
+            for m in range(1, 13)
+            if float(state.get(f"season_days:{m}", 0)) >= self.MIN_SEASON_DAYS
+        }
+        if month not in established or len(established) < 2:
+            return 1.0
+
+        mean = sum(established.values()) / len(established)
+        return established[month] / mean if mean > 0 else 1.0
+
+    def _key(self, product_id: str, condition: str) -> str:
+        condition = condition.strip().title() if condition else "Unknown"
+        return f"{self.KEY_PREFIX}{product_id}:{condition}"
+
+
+# Global instance
+price_trends = PriceTrendTracker()
@@ -3,7 +3,7 @@ Condition assessment and multiplier calculation.
 Maps visual condition to pricing multipliers.
 """
 import structlog
-from typing import Dict
+from services.pricing.rules import pricing_rules
 
 logger = structlog.get_logger()
 
@@ -11,32 +11,9 @@ logger = structlog.get_logger()
 class ConditionAssessor:
     """Handles condition assessment and multiplier calculation."""
 
-    # Standard condition multipliers
-    CONDITION_MULTIPLIERS: Dict[str, float] = {
-        "New": 1.0,          # 100% - unopened, tags
-        "Like New": 0.925,   # 92.5% - no wear
-        "Good": 0.80,        # 80% - light wear
-        "Fair": 0.625,       # 62.5% - noticeable wear
-        "Poor": 0.40,        # 40% - heavy damage
-        "Unknown": 0.50      # 50% - default if uncertain
-    }
-
-    # Category-specific adjustments
-    # Some categories naturally show more wear (e.g., books, clothing)
-    CATEGORY_ADJUSTMENTS: Dict[str, Dict[str, float]] = {
-        "Books & Media": {
-            "Good": 0.85,  # Books with slight wear are still very usable
-            "Fair": 0.70,  # Well-worn books are common
-        },
-        "Clothing & Fashion": {
-            "Good": 0.75,  # Clothing wear is more visible
-            "Fair": 0.55,  # Worn clothing loses value quickly
-        },
-        "Tools & Equipment": {
-            "Good": 0.85,  # Tools with use marks are expected
-            "Fair": 0.70,  # Well-used tools are still valuable
-        }
-    }
+    # Condition multipliers, including category-specific overrides (some
+    # categories naturally show more wear, e.g. books, clothing), live in
+    # config/pricing_rules.json alongside the offer margins
 
     def get_condition_multiplier(
         self,
@@ -58,17 +35,8 @@ class ConditionAssessor:
         # Normalize condition string
         condition = condition.strip().title()
 
-        # Get base multiplier
-        base_multiplier = self.CONDITION_MULTIPLIERS.get(
-            condition,
-            self.CONDITION_MULTIPLIERS["Unknown"]
-        )
-
-        # Apply category-specific adjustment if exists
-        if category in self.CATEGORY_ADJUSTMENTS:
-            category_adj = self.CATEGORY_ADJUSTMENTS[category]
-            if condition in category_adj:
-                base_multiplier = category_adj[condition]
+        # Base multiplier with any category-specific adjustment applied
+        base_multiplier = pricing_rules.current.assessed_multiplier(category, condition)
 
         # Additional penalty for significant damage
         if damage_list and len(damage_list) > 0:
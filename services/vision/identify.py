@@ -16,6 +16,7 @@ from .models import (
 )
 from .seo import seo_title_generator
 from .ocr import serial_extractor
+from services.monitoring.metrics import metrics
 
 logger = structlog.get_logger()
 
@@ -87,15 +88,16 @@ class VisionIdentifier:
 
         try:
             # Call Claude Vision API
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=2048,
-                messages=[{
-                    "role": "user",
-                    "content": image_content
-                }],
-                temperature=0.3,  # Lower temperature for more consistent extraction
-            )
+            with metrics.time(metrics.llm_latency, call="identify"):
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=2048,
+                    messages=[{
+                        "role": "user",
+                        "content": image_content
+                    }],
+                    temperature=0.3,  # Lower temperature for more consistent extraction
+                )
 
             # Parse response into structured format
             result = self._parse_vision_response(response.content[0].text)
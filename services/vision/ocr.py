@@ -7,6 +7,7 @@ import structlog
 import re
 from typing import List, Optional, Dict, Any
 from config.settings import settings
+from services.monitoring.metrics import metrics
 
 logger = structlog.get_logger()
 
@@ -124,15 +125,16 @@ class SerialNumberExtractor:
         })
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[{
-                    "role": "user",
-                    "content": image_content
-                }],
-                temperature=0.0,  # Deterministic for OCR
-            )
+            with metrics.time(metrics.llm_latency, call="ocr"):
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=1024,
+                    messages=[{
+                        "role": "user",
+                        "content": image_content
+                    }],
+                    temperature=0.0,  # Deterministic for OCR
+                )
 
             # Parse response
             result = self._parse_ocr_response(response.content[0].text)
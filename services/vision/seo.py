@@ -6,6 +6,7 @@ import anthropic
 import structlog
 from typing import Optional
 from config.settings import settings
+from services.monitoring.metrics import metrics
 
 logger = structlog.get_logger()
 
@@ -64,15 +65,16 @@ class SEOTitleGenerator:
         )
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=150,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }],
-                temperature=0.7,  # Slightly higher for creative title generation
-            )
+            with metrics.time(metrics.llm_latency, call="seo_title"):
+                response = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=150,
+                    messages=[{
+                        "role": "user",
+                        "content": prompt
+                    }],
+                    temperature=0.7,  # Slightly higher for creative title generation
+                )
 
             seo_title = response.content[0].text.strip()
 
@@ -0,0 +1,641 @@
+"""
+Tests for marketplace service.
+"""
+import json
+import time
+import asyncio
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from services.marketplace.models import MarketplaceListing
+from services.marketplace.dedup import listing_deduplicator
+from services.marketplace.relevance import title_relevance_scorer
+from services.marketplace.deadline import Deadline
+from services.marketplace.catalog import ProductCatalog
+from services.marketplace.suggest import SuggestionIndex
+from services.marketplace.planner import query_planner
+from services.marketplace import planner as query_planner_module
+from services.marketplace import aggregator as aggregator_module
+from services.marketplace.prewarm import CountMinSketch, ResearchPrewarmer
+from services.marketplace import prewarm as prewarm_module
+from services.marketplace.projection import FieldProjection
+from services.middleware.compression import CompressionMiddleware
+from services.monitoring.metrics import metrics
+
+
+def _listing(title, price, source="ebay", url=None, seller=None):
+    return MarketplaceListing(
+        title=title,
+        price=price,
+        condition="Good",
+        source=source,
+        url=url,
+        seller=seller
+    )
+
+
+def test_dedup_collapses_cross_posts():
+    """Test that a relist and a cross-post of the same item are collapsed."""
+    listings = [
+        _listing("Apple AirPods Pro 2nd Gen MagSafe Case", 118.0, url="https://ebay.com/itm/1", seller="gadgetdeals"),
+        _listing("Apple AirPods Pro 2nd Gen MagSafe Case", 118.5, url="https://ebay.com/itm/2", seller="gadgetdeals"),
+        _listing("Apple AirPods Pro 2nd Gen MagSafe Case", 118.0, source="facebook"),
+        _listing("Sony WH-1000XM4 Wireless Headphones", 180.0),
+    ]
+
+    kept, groups = listing_deduplicator.deduplicate(listings)
+
+    assert len(kept) == 2
+    assert kept[0].url == "https://ebay.com/itm/1"
+    assert kept[0].collapsed_count == 2
+    assert len(groups) == 1
+    assert len(groups[0]["collapsed"]) == 2
+
+
+def test_dedup_keeps_same_title_different_price():
+    """Test that repeat sales of the same model at different prices are kept."""
+    listings = [
+        _listing("Apple iPhone 13 Pro 128GB Unlocked", 550.0),
+        _listing("Apple iPhone 13 Pro 128GB Unlocked", 535.0),
+        _listing("Apple iPhone 13 Pro 128GB Unlocked", 420.0),
+    ]
+
+    kept, groups = listing_deduplicator.deduplicate(listings)
+
+    assert len(kept) == 3
+    assert groups == []
+
+
+def test_dedup_does_not_chain_price_ladder():
+    """Test that distinct sales under a catalog title aren't merged through close prices."""
+    listings = [
+        _listing("Apple AirPods Pro 2nd Generation", round(100.0 + i * 0.6, 2),
+                 url=f"https://ebay.com/itm/{i}", seller=f"seller{i}")
+        for i in range(40)
+    ]
+    listings.append(_listing("Apple AirPods Pro 2nd Generation", 100.2, source="facebook"))
+
+    kept, groups = listing_deduplicator.deduplicate(listings)
+
+    # Only the cross-post is collapsed, into the first listing it matches
+    assert len(kept) == 40
+    assert len(groups) == 1
+    assert groups[0]["kept"]["price"] == 100.0
+    assert [c["source"] for c in groups[0]["collapsed"]] == ["facebook"]
+
+
+def test_relevance_filter_drops_accessories():
+    """Test that cases, parts and other models are dropped before stats."""
+    listings = [
+        _listing("Apple AirPods Pro 2nd Gen with MagSafe Charging Case", 118.0),
+        _listing("AirPods Pro - used, great condition", 110.0),
+        _listing("Apple AirPods Pro Gen 2 White", 121.0),
+        _listing("Silicone Case for Apple AirPods Pro", 12.0),
+        _listing("AirPods Pro Replacement Left Earbud", 45.0),
+        _listing("Apple AirPods 2nd Gen", 70.0),
+        _listing("Apple AirPods Pro Right Earbud A2083", 40.0),
+        _listing("Genuine Apple AirPods Pro Charging Case A2190", 35.0),
+        _listing("AirPods Pro Wireless Charger Pad", 15.0),
+        _listing("Apple AirPods Pro w/ Lightning Cable", 115.0),
+    ]
+
+    kept = title_relevance_scorer.filter_listings(listings, "Apple", "AirPods Pro")
+
+    assert [l.price for l in kept] == [118.0, 110.0, 121.0, 115.0]
+
+
+def test_relevance_filter_drops_sibling_models_and_cases():
+    """Test that a missing model token or a case brand drops the listing."""
+    listings = [
+        _listing("Apple iPhone 13 Pro 128GB Graphite Unlocked", 550.0),
+        _listing("iPhone 13 Pro 256GB Sierra Blue", 610.0),
+        _listing("Apple iPhone 13 Pro Max 128GB", 640.0),
+        _listing("Apple iPhone 13 128GB", 420.0),
+        _listing("OtterBox Defender Series iPhone 13 Pro", 30.0),
+    ]
+
+    relevance, is_accessory = title_relevance_scorer.score(
+        [l.title for l in listings], "Apple", "iPhone 13 Pro"
+    )
+
+    assert relevance[3] == 0.0
+    assert list(is_accessory) == [False, False, False, False, True]
+
+    # The reverse: larger or smaller siblings don't pass for the base model
+    titles = [
+        "Apple iPhone 13 128GB Midnight",
+        "Apple iPhone 13 Pro Max 256GB",
+        "Apple iPhone 13 mini",
+        "iPhone 13 128GB only used 3 months",
+        "Apple iPhone 13 box only",
+    ]
+    relevance, is_accessory = title_relevance_scorer.score(titles, "Apple", "iPhone 13")
+
+    assert relevance[0] == 1.0 and relevance[3] >= title_relevance_scorer.MIN_RELEVANCE
+    assert relevance[1] == 0.0 and relevance[2] == 0.0
+    assert list(is_accessory) == [False, False, False, False, True]
+
+
+def test_relevance_filter_keeps_listings_when_too_few_match():
+    """Test that the filter backs off instead of emptying the batch."""
+    listings = [
+        _listing("Vintage Walkman", 40.0),
+        _listing("Sony Walkman cassette player", 45.0),
+    ]
+
+    kept = title_relevance_scorer.filter_listings(listings, "Sony", "WM-10")
+
+    assert len(kept) == 2
+
+
+def test_deadline_from_header():
+    """Test deadline parsing from the caller's timeout header."""
+    assert Deadline.from_header("5000").budget == 4.5
+    assert Deadline.from_header("not-a-number").budget == Deadline.default().budget
+    assert Deadline.from_header("600000").budget == Deadline.default().budget
+
+
+def test_research_returns_partial_data_at_deadline(monkeypatch):
+    """Test that a slow source is cancelled and partial data is returned."""
+    ebay_listings = [
+        _listing("Apple AirPods Pro 2nd Gen", price)
+        for price in (110.0, 115.0, 118.0, 120.0, 125.0)
+    ]
+    cancelled = []
+
+    async def fast_ebay(**kwargs):
+        return ebay_listings
+
+    async def slow_facebook(**kwargs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return []
+
+    monkeypatch.setattr(aggregator_module.ebay_client, "search_sold_listings", fast_ebay)
+    monkeypatch.setattr(aggregator_module.facebook_client, "search_listings", slow_facebook)
+
+    result = asyncio.run(aggregator_module.marketplace_aggregator.research_product(
+        brand="Apple",
+        model="AirPods Pro",
+        category="Consumer Electronics",
+        deadline=Deadline(0.2)
+    ))
+
+    assert result["deadline_exceeded"] is True
+    assert result["data_freshness"] == "partial"
+    assert result["sources_checked"] == ["ebay"]
+    assert result["stats"]["count"] == 5
+    assert cancelled == [True]
+
+
+def _install_fake_sources(monkeypatch, prices):
+    """Serve eBay pages from a fixed price list and record requested limits."""
+    calls = []
+
+    async def fake_ebay(limit, offset=0, **kwargs):
+        calls.append(("ebay", limit, offset))
+        return [_listing(f"Apple AirPods Pro #{i}", p) for i, p in enumerate(prices[offset:offset + limit], offset)]
+
+    async def fake_facebook(limit, **kwargs):
+        calls.append(("facebook", limit, 0))
+        return []
+
+    monkeypatch.setattr(aggregator_module.ebay_client, "search_sold_listings", fake_ebay)
+    monkeypatch.setattr(aggregator_module.facebook_client, "search_listings", fake_facebook)
+    return calls
+
+
+def test_adaptive_sampling_stops_early_for_tight_prices(monkeypatch):
+    """Test that a low-variance commodity item is priced from one small batch."""
+    prices = [100.0 + (i % 5) for i in range(100)]
+    calls = _install_fake_sources(monkeypatch, prices)
+
+    result = asyncio.run(aggregator_module.marketplace_aggregator.research_product(
+        brand="Apple",
+        model="AirPods Pro",
+        category="Consumer Electronics",
+        adaptive=True
+    ))
+
+    assert result["sampling"]["reason"] == "stable"
+    assert result["sampling"]["batches"] == 1
+    assert result["stats"]["count"] == 25
+    assert ("ebay", 25, 0) in calls and len(calls) == 2
+
+
+def test_adaptive_sampling_expands_for_high_value_items(monkeypatch):
+    """Test that expensive items always get the full sample."""
+    prices = [900.0 + (i % 5) for i in range(100)]
+    calls = _install_fake_sources(monkeypatch, prices)
+
+    result = asyncio.run(aggregator_module.marketplace_aggregator.research_product(
+        brand="Apple",
+        model="AirPods Pro",
+        category="Consumer Electronics",
+        adaptive=True
+    ))
+
+    assert result["sampling"]["reason"] == "high_value"
+    assert result["sampling"]["batches"] == 2
+    assert ("ebay", 75, 25) in calls
+    assert result["stats"]["count"] == 100
+
+
+def test_catalog_resolves_identifiers_to_one_product():
+    """Test UPC, model number and alias lookups return the same canonical id."""
+    catalog = ProductCatalog()
+    product_id = catalog.register(
+        brand="Apple",
+        model="iPhone 13 Pro",
+        category="Phones & Tablets",
+        upc="194252707135",
+        model_number="A2483",
+        storage="256GB",
+        aliases=["Apple iPhone 13 Pro 256GB Sierra Blue Unlocked"]
+    )
+
+    assert product_id == "apple/iphone-13-pro/256gb"
+    assert catalog.resolve(upc="1942 5270 7135") == product_id
+    assert catalog.resolve(model_number="a2483") == product_id
+    assert catalog.resolve(brand="apple", model="iPhone 13 Pro 256 GB") == product_id
+    assert catalog.resolve(text="iphone 13 pro 256gb sierra blue") == product_id
+    assert catalog.resolve(text="Samsung Galaxy S21") is None
+    # A sibling model must not resolve to this one
+    assert catalog.resolve(brand="Apple", model="iPhone 13") is None
+
+
+def test_catalog_storage_variants_keep_their_own_ids():
+    """Test that a storage-less name never resolves to one storage variant."""
+    catalog = ProductCatalog()
+    small = catalog.register(brand="Apple", model="iPhone 13", storage="128GB")
+    large = catalog.register(brand="Apple", model="iPhone 13", storage="256GB")
+
+    assert catalog.resolve(brand="Apple", model="iPhone 13 256GB") == large
+    assert catalog.resolve(text="apple iphone 13 128 gb") == small
+    # The bare name is the storage-less product's, not the first variant's
+    assert catalog.resolve(brand="Apple", model="iPhone 13") is None
+    base = catalog.register(brand="Apple", model="iPhone 13")
+    assert base == "apple/iphone-13"
+    assert catalog.resolve(brand="Apple", model="iPhone 13") == base
+
+
+def test_research_never_injects_unrequested_storage(monkeypatch):
+    """Test that a storage-less query isn't priced under a storage variant."""
+    catalog = ProductCatalog()
+    catalog.register(brand="Apple", model="iPhone 13", storage="128GB", model_number="A2482")
+    catalog.register(brand="Apple", model="iPhone 13", storage="256GB")
+    monkeypatch.setattr(aggregator_module, "product_catalog", catalog)
+    queries = []
+
+    async def fake_ebay(query, **kwargs):
+        queries.append(query)
+        return [_listing(f"Apple iPhone 13 #{i}", 400.0 + i) for i in range(6)]
+
+    async def fake_facebook(**kwargs):
+        return []
+
+    monkeypatch.setattr(aggregator_module.ebay_client, "search_sold_listings", fake_ebay)
+    monkeypatch.setattr(aggregator_module.facebook_client, "search_listings", fake_facebook)
+
+    aggregator = aggregator_module.marketplace_aggregator
+    result = asyncio.run(aggregator.research_product(
+        brand="Apple", model="iPhone 13", category="Phones", stratify_conditions=False
+    ))
+    assert result["product_id"] == "apple/iphone-13"
+    assert queries == ["Apple iPhone 13"]
+
+    # Storage named by the caller selects the variant
+    result = asyncio.run(aggregator.research_product(
+        brand="Apple", model="iPhone 13", category="Phones", stratify_conditions=False,
+        metadata={"storage": "256GB"}
+    ))
+    assert result["product_id"] == "apple/iphone-13/256gb"
+
+def test_catalog_snapshot_round_trip():
+    """Test that a snapshot restores ids and identifier indexes."""
+    catalog = ProductCatalog()
+    catalog.register(brand="Sony", model="PlayStation 5", upc="711719541028")
+
+    restored = ProductCatalog()
+    restored.load_snapshot(catalog.snapshot())
+
+    assert restored.resolve(upc="711719541028") == "sony/playstation-5"
+
+
+def test_suggestions_ranked_by_popularity():
+    """Test prefix suggestions match any word and rank popular names first."""
+    index = SuggestionIndex()
+    for _ in range(3):
+        index.record("Apple iPhone 13 Pro", product_id="apple/iphone-13-pro")
+    index.record("Apple iPhone 13 Mini", product_id="apple/iphone-13-mini")
+    index.record("Apple iPad Air")
+
+    assert index.suggest("iph") == []  # Nothing served until the next rebuild
+
+    index.rebuild()
+
+    names = [s["text"] for s in index.suggest("iph")]
+    assert names[:2] == ["Apple iPhone 13 Pro", "Apple iPhone 13 Mini"]
+    assert "Apple iPad Air" not in names
+    assert [s["product_id"] for s in index.suggest("13 pro")][0] == "apple/iphone-13-pro"
+    assert index.suggest("apple ipa")[0]["text"] == "Apple iPad Air"
+
+
+def test_suggestion_queries_are_capped(monkeypatch):
+    """Test raw queries are bounded while catalog products are always kept."""
+    monkeypatch.setattr(SuggestionIndex, "MAX_QUERY_ENTRIES", 2)
+    monkeypatch.setattr(SuggestionIndex, "MAX_PENDING", 3)
+    index = SuggestionIndex()
+    index.record("Apple iPhone 13 Pro", product_id="apple/iphone-13-pro")
+    index.record("nintendo switch", weight=5)
+    index.record("nintendo ds", weight=3)
+    index.record("nintendo wii")  # Over the pending buffer, dropped
+    index.rebuild()
+
+    index.record("nintendo gamecube")  # Least popular query, evicted
+    index.rebuild()
+
+    names = [s["text"] for s in index.suggest("nin")]
+    assert names == ["nintendo switch", "nintendo ds"]
+    assert index.suggest("iph")[0]["product_id"] == "apple/iphone-13-pro"
+
+
+def test_condition_stratified_stats_served_from_one_fetch(monkeypatch):
+    """Test one all-conditions fetch yields per-condition stats and cache hits."""
+    calls = []
+    store = {}
+
+    async def fake_ebay(condition=None, **kwargs):
+        calls.append(condition)
+        return [
+            _listing(f"Apple AirPods Pro #{i}", base + 5 * i).model_copy(update={"condition_code": code})
+            for code, base in (("Good", 100.0), ("Fair", 60.0))
+            for i in range(6)
+        ]
+
+    async def fake_facebook(**kwargs):
+        return []
+
+    async def fake_get(key):
+        return store.get(key)
+
+    async def fake_set(key, value, ttl=None):
+        store[key] = json.loads(json.dumps(value))
+        return True
+
+    monkeypatch.setattr(aggregator_module.ebay_client, "search_sold_listings", fake_ebay)
+    monkeypatch.setattr(aggregator_module.facebook_client, "search_listings", fake_facebook)
+    monkeypatch.setattr(aggregator_module.redis_cache, "get", fake_get)
+    monkeypatch.setattr(aggregator_module.redis_cache, "set", fake_set)
+
+    aggregator = aggregator_module.marketplace_aggregator
+    good = asyncio.run(aggregator.research_product(
+        brand="Apple", model="AirPods Pro", category="Consumer Electronics",
+        condition="Good", stratify_conditions=True
+    ))
+    fair = asyncio.run(aggregator.research_product(
+        brand="Apple", model="AirPods Pro", category="Consumer Electronics",
+        condition="Fair", stratify_conditions=True
+    ))
+
+    unspecified = asyncio.run(aggregator.research_product(
+        brand="Apple", model="AirPods Pro", category="Consumer Electronics",
+        condition=None, stratify_conditions=True
+    ))
+    asyncio.run(aggregator.research_product(
+        brand="Apple", model="AirPods Pro", category="Consumer Electronics",
+        condition="New", stratify_conditions=True
+    ))
+
+    # New isn't part of the used fetch, so it gets its own query
+    assert calls == [aggregator_module.ebay_client.ALL_USED_CONDITIONS, "New"]
+    assert good["cache_hit"] is False and fair["cache_hit"] is True
+    assert good["stats"]["median"] == 112.5
+    assert fair["stats"]["median"] == 72.5
+    assert set(fair["condition_stats"]) == {"Good", "Fair"}
+    assert all(l.condition_code == "Fair" for l in fair["listings"])
+    # Without a condition, stats come from the default set (no Fair units)
+    assert unspecified["stats"]["median"] == 112.5
+
+
+def test_query_planner_ranks_identifier_variants():
+    """Test that exact identifiers rank ahead of name searches."""
+    variants = query_planner.plan(
+        brand="Apple",
+        model="iPhone 13 Pro",
+        identifiers={"upc": "194252707135", "model_number": "A2483"},
+        metadata={"variant": "Pro", "storage": "256GB"}
+    )
+
+    assert [v.kind for v in variants] == ["gtin", "model_number", "full", "broad"]
+    assert variants[0].gtin == "194252707135"
+    assert variants[2].query == "Apple iPhone 13 Pro 256GB"
+    assert variants[3].query == "Apple iPhone 13 Pro"
+
+
+def test_query_fanout_stops_once_one_variant_is_sufficient(monkeypatch):
+    """Test that slower variants are cancelled after a sufficient sample."""
+    cancelled = []
+
+    async def fake_ebay(query, gtin=None, **kwargs):
+        if gtin:
+            return [
+                _listing(f"Apple iPhone 13 Pro 256GB #{i}", 600.0 + 7 * i, url=f"https://ebay.com/itm/{i}")
+                for i in range(24)
+            ]
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(query)
+            raise
+        return []
+
+    monkeypatch.setattr(query_planner_module.ebay_client, "search_sold_listings", fake_ebay)
+
+    variants = query_planner.plan(
+        brand="Apple",
+        model="iPhone 13 Pro",
+        identifiers={"upc": "194252707135", "model_number": "A2483"}
+    )
+    listings, report = asyncio.run(query_planner.search(
+        variants, "Apple", "iPhone 13 Pro", Deadline(10.0), limit=100
+    ))
+
+    assert len(listings) == 24
+    assert report["stopped_early_on"] == "gtin"
+    assert sorted(cancelled) == ["Apple A2483", "Apple iPhone 13 Pro"]
+
+
+def test_source_latency_histogram_exposed():
+    """Test that source latencies are rendered as Prometheus histograms."""
+    metrics.observe_source("ebay", "ok", 0.12)
+
+    body, content_type = metrics.render()
+    text = body.decode()
+
+    assert content_type.startswith("text/plain")
+    assert 'marketplace_source_request_seconds_bucket{le="0.25",outcome="ok",source="ebay"}' in text
+    assert "llm_call_seconds" in text and "pricing_stage_seconds" in text
+
+
+def test_count_min_sketch_never_undercounts():
+    """Test sketch estimates are at least the true counts."""
+    sketch = CountMinSketch(width=64, depth=4)
+    for i in range(200):
+        sketch.add(f"product-{i % 20}")
+
+    assert all(sketch.estimate(f"product-{i}") >= 10 for i in range(20))
+    sketch.decay()
+    assert sketch.estimate("product-0") >= 5
+
+
+def test_prewarmer_refreshes_hot_products_first(monkeypatch):
+    """Test hot products are refreshed before the long tail, within budget."""
+    monkeypatch.setattr(prewarm_module.settings, "prewarm_top_n", 1)
+    prewarmer = ResearchPrewarmer()
+    for _ in range(5):
+        prewarmer.record("Apple", "iPhone 13 Pro", "Phones & Tablets")
+    for _ in range(3):
+        prewarmer.record("Sony", "PlayStation 5", "Video Games")
+    prewarmer.record("Sony", "WM-10", "Consumer Electronics", refreshed=True)
+
+    peak_hour = prewarm_module.settings.prewarm_off_peak_end_hour
+    off_peak_hour = prewarm_module.settings.prewarm_off_peak_start_hour
+    now = time.monotonic()
+
+    assert prewarmer.plan_refreshes(5, now, peak_hour) == [
+        "apple/iphone-13-pro|Phones & Tablets"
+    ]
+    assert prewarmer.plan_refreshes(5, now, off_peak_hour) == [
+        "apple/iphone-13-pro|Phones & Tablets",
+        "sony/playstation-5|Video Games"
+    ]
+    assert len(prewarmer.plan_refreshes(1, now, off_peak_hour)) == 1
+
+
+def test_prewarmer_charges_query_variants_against_budget(monkeypatch):
+    """Test a product with storage costs two requests (broad + full variant)."""
+    catalog = ProductCatalog()
+    catalog.register(brand="Apple", model="iPhone 13 Pro", storage="256GB")
+    monkeypatch.setattr(prewarm_module, "product_catalog", catalog)
+
+    prewarmer = ResearchPrewarmer()
+    prewarmer.record("Apple", "iPhone 13 Pro", "Phones & Tablets", product_id="apple/iphone-13-pro/256gb")
+    hour = prewarm_module.settings.prewarm_off_peak_end_hour
+
+    assert prewarmer.plan_refreshes(1, time.monotonic(), hour) == []
+    assert prewarmer.plan_refreshes(2, time.monotonic(), hour) == ["apple/iphone-13-pro/256gb|Phones & Tablets"]
+
+
+def test_prewarm_elects_one_warmer_and_dedupes_refreshes(monkeypatch):
+    """Test workers share one budget per tick and never refresh a product twice."""
+    store = {}
+
+    class FakeRedis:
+        def set(self, key, value, nx=False, ex=None):
+            if nx and key in store:
+                return None
+            store[key] = value
+            return True
+
+    refreshed = []
+
+    async def research_product(**kwargs):
+        refreshed.append(kwargs["model"])
+
+    monkeypatch.setattr(prewarm_module.redis_cache, "client", FakeRedis())
+    monkeypatch.setattr(prewarm_module.settings, "condition_stratified_stats", True)
+    monkeypatch.setattr(prewarm_module.marketplace_aggregator, "research_product", research_product)
+
+    workers = [ResearchPrewarmer(), ResearchPrewarmer()]
+    for worker in workers:
+        worker.record("Apple", "iPhone 13 Pro", "Phones & Tablets")
+
+    assert asyncio.run(workers[0].warm_once()) == 1
+    assert asyncio.run(workers[1].warm_once()) == 0  # Lock held this tick
+
+    # Next tick: the lock is free, but the product was already refreshed
+    del store[ResearchPrewarmer.LOCK_KEY]
+    assert asyncio.run(workers[1].warm_once()) == 0
+    assert refreshed == ["iPhone 13 Pro"]
+
+
+def test_field_projection_builds_only_requested_fields():
+    """Test that excluded fields are never built and sub-fields are selected."""
+    built = []
+
+    def listings():
+        built.append("listings")
+        return [{"title": "AirPods Pro", "price": 118.0, "url": "https://ebay.com/itm/1"}]
+
+    def stats():
+        built.append("stats")
+        return {"count": 1}
+
+    projection = FieldProjection.parse("listings.price, sources_checked")
+    body = projection.build({
+        "listings": listings,
+        "stats": stats,
+        "sources_checked": lambda: ["ebay"]
+    })
+
+    assert body == {"listings": [{"price": 118.0}], "sources_checked": ["ebay"]}
+    assert built == ["listings"]
+    assert FieldProjection.parse("") is None
+
+
+def test_compression_middleware_only_compresses_large_responses():
+    """Test gzip negotiation and the size threshold."""
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    async def large():
+        return {"listings": [{"title": "Apple AirPods Pro", "price": 118.0}] * 50}
+
+    @app.get("/small")
+    async def small():
+        return {"count": 1}
+
+    client = TestClient(app)
+    large_response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    small_response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    refused_response = client.get("/large", headers={"Accept-Encoding": "gzip;q=0, identity"})
+
+    assert large_response.headers["content-encoding"] == "gzip"
+    assert len(large_response.json()["listings"]) == 50
+    assert "content-encoding" not in small_response.headers
+    assert "content-encoding" not in refused_response.headers
+
+
+def test_statistics_weight_recent_sales_in_quantiles():
+    """Median and percentiles share one recency-weighted quantile pass."""
+    import numpy as np
+    from services.pricing.stats import weighted_quantiles
+
+    values = np.array([30.0, 10.0, 20.0])
+    assert weighted_quantiles(values, quantiles=(0.5,))[0] == 20.0
+    assert weighted_quantiles(values, np.array([8.0, 1.0, 1.0]), (0.5,))[0] > 25.0
+    # Row-wise for 2-D input
+    rows = weighted_quantiles(np.array([[1.0, 2.0, 3.0], [4.0, 6.0, 5.0]]), quantiles=(0.0, 0.5, 1.0))
+    assert rows.tolist() == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+
+    listings = [_listing(f"Item {i}", price) for i, price in enumerate([100, 100, 100, 140, 140])]
+    aggregator = aggregator_module.marketplace_aggregator
+    even = aggregator._compute_statistics(listings)
+    recent_high = aggregator._compute_statistics(listings, weights=[0.5, 0.5, 0.5, 1.0, 1.0])
+
+    assert even.median == 100.0
+    assert recent_high.median > even.median
+    assert recent_high.percentiles["p50"] == recent_high.median
+    assert recent_high.median_ci is not None and recent_high.mean_ci is not None
+
+
+def test_outlier_fence_uses_linear_percentiles():
+    """The IQR fence keeps numpy's linear interpolation (108 is outside 107.5)."""
+    prices = [100, 101, 102, 103, 104, 108]
+    listings = [_listing(f"Item {i}", price) for i, price in enumerate(prices)]
+    filtered = aggregator_module.marketplace_aggregator._filter_outliers(listings)
+    assert [l.price for l in filtered] == [100, 101, 102, 103, 104]
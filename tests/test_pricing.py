@@ -1,7 +1,11 @@
 """
 Tests for pricing service.
 """
+import json
 import pytest
+from datetime import datetime, timezone, timedelta
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
 from services.pricing.offer import offer_engine
 from services.pricing.fmv import fmv_engine
 
@@ -85,3 +89,604 @@ def test_fmv_low_confidence():
 
     assert result.confidence < 70  # Lower confidence
     assert result.data_quality == "Low"
+
+
+def test_fmv_batch_matches_single_calculation():
+    """Batch FMV gives the same results as per-item calculation."""
+    now = datetime.now(tz=timezone.utc)
+    items = [
+        {
+            "marketplace_stats": {
+                "count": 25,
+                "median": 100.0,
+                "mean": 104.0,
+                "std_dev": 12.0,
+                "listings": [
+                    {
+                        "price": 80.0 + i * 3.1,
+                        "title": f"Listing {i}",
+                        "condition": "Good",
+                        "sold_date": (now - timedelta(days=i * 4)).isoformat(),
+                        "source": "ebay",
+                        "url": f"https://ebay.com/itm/{i}"
+                    }
+                    for i in range(12)
+                ]
+            },
+            "category": "Gaming",
+            "condition": "Good",
+            "data_freshness": "cached"
+        },
+        {
+            "marketplace_stats": {"count": 4, "median": 40.0, "mean": 52.0, "std_dev": 25.0},
+            "category": "Collectibles & Vintage",
+            "condition": "Fair",
+            "data_freshness": None
+        }
+    ]
+
+    batch = fmv_engine.calculate_fmv_batch(items)
+
+    assert len(batch) == 2
+    for item, result in zip(items, batch):
+        single = fmv_engine.calculate_fmv(**item)
+        assert result.fmv == single.fmv
+        assert result.confidence == single.confidence
+        assert result.data_quality == single.data_quality
+        assert result.confidence_factors == single.confidence_factors
+        assert [c.price for c in result.comparable_sales] == [c.price for c in single.comparable_sales]
+
+
+def test_optimizer_sweep_returns_only_adjustments():
+    """Columnar sweep applies the per-offer rules and drops unchanged offers."""
+    from services.pricing.optimizer import price_optimizer
+
+    now = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    result = price_optimizer.sweep(
+        offer_id=["stale", "hot", "floored", "fresh"],
+        current_price=[100.0, 100.0, 60.0, 100.0],
+        original_offer=[50.0, 50.0, 50.0, 50.0],
+        created_at=[
+            "2026-01-15T00:00:00Z",  # 45 days, few views: -15%
+            "2026-01-15T00:00:00Z",  # 45 days, 300 views: high velocity
+            "2026-01-15T00:00:00+00:00",  # Already at the $60 floor
+            "2026-02-27T00:00:00Z"  # 2 days old
+        ],
+        view_count=[10, 300, 10, 0],
+        now=now
+    )
+
+    assert result["offer_id"] == ["stale"]
+    assert result["recommended_price"] == [85.0]
+    assert result["reason"] == ["time_decay_15pct_45days_10views"]
+
+    result = price_optimizer.sweep(
+        offer_id=["floored"],
+        current_price=[68.0],
+        original_offer=[50.0],
+        created_at=["2026-01-15T00:00:00Z"],
+        view_count=[10],
+        now=now
+    )
+
+    assert result["recommended_price"] == [60.0]
+    assert result["reason"] == ["price_floor_enforced_at_60"]
+
+
+def test_optimize_prices_stream_ndjson(monkeypatch):
+    """NDJSON offers are analyzed in chunks and adjustments streamed back."""
+    from services.pricing import router as pricing_router
+
+    monkeypatch.setattr(pricing_router, "STREAM_CHUNK_SIZE", 2)
+    app = FastAPI()
+    app.include_router(pricing_router.router)
+
+    created = (datetime.now(tz=timezone.utc) - timedelta(days=45)).isoformat()
+    offers = [
+        {"offer_id": f"offer-{i}", "current_price": 100.0, "original_offer": 50.0,
+         "created_at": created, "view_count": 10}
+        for i in range(5)
+    ]
+    body = "\n".join(json.dumps(offer) for offer in offers) + "\n{not json}\n"
+
+    response = TestClient(app).post("/optimize-prices/stream", content=body)
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line["offer_id"] for line in lines if "offer_id" in line] == [f"offer-{i}" for i in range(5)]
+    assert [line["line"] for line in lines if "error" in line] == [6]
+    assert lines[-1] == {"done": True, "total_offers": 5, "adjustments_recommended": 5}
+
+
+class _FakeSchedulerRedis:
+    """Just enough of Redis for the repricing scheduler (claim script in Python)."""
+
+    def __init__(self):
+        self.hashes, self.zsets = {}, {}
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def hdel(self, key, field):
+        return int(self.hashes.get(key, {}).pop(field, None) is not None)
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        return int(self.zsets.get(key, {}).pop(member, None) is not None)
+
+    def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    def pipeline(self, transaction=True):
+        client, calls = self, []
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return lambda *args: calls.append((name, args))
+
+            def execute(self):
+                return [getattr(client, name)(*args) for name, args in calls]
+
+        return Pipeline()
+
+    def register_script(self, script):
+        def claim(keys, args):
+            due_key, offers_key = keys
+            cutoff, limit, lease = args
+            due = sorted((score, oid) for oid, score in self.zsets.get(due_key, {}).items() if score <= cutoff)
+            claimed = []
+            for _, offer_id in due[:None if limit < 0 else limit]:
+                self.zsets[due_key][offer_id] = lease
+                claimed.append(self.hashes[offers_key][offer_id])
+            return claimed
+        return claim
+
+
+def test_repricing_scheduler_only_returns_offers_at_boundaries(monkeypatch):
+    """Offers are evaluated once, then only when a decay boundary passes."""
+    from services.pricing import scheduler as scheduler_module
+
+    fake = _FakeSchedulerRedis()
+    monkeypatch.setattr(scheduler_module.redis_cache, "client", fake)
+    scheduler = scheduler_module.RepricingScheduler()
+    created = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    scheduler.upsert({
+        "offer_id": "quiet",
+        "current_price": 100.0,
+        "original_offer": 50.0,
+        "created_at": "2026-03-01T00:00:00Z",
+        "view_count": 4
+    })
+
+    # First run: never evaluated, due at once; nothing to adjust on day 3
+    first = scheduler.due_now(now=created + timedelta(days=3))
+    assert first["evaluated"] == 1
+    assert first["adjustments"]["offer_id"] == []
+
+    # Nothing changes before the day-7 boundary
+    assert scheduler.due_now(now=created + timedelta(days=6))["evaluated"] == 0
+
+    week = scheduler.due_now(now=created + timedelta(days=7, hours=1))
+    assert week["evaluated"] == 1
+    assert week["adjustments"]["offer_id"] == ["quiet"]
+
+    # State lives in Redis: another worker's scheduler sees the same schedule
+    other = scheduler_module.RepricingScheduler()
+    assert other.due_now(now=created + timedelta(days=8))["evaluated"] == 0
+    assert other.due_now(now=created + timedelta(days=14, hours=1))["evaluated"] == 1
+
+    assert scheduler.remove("quiet") is True
+    assert scheduler.due_now(now=created + timedelta(days=60))["evaluated"] == 0
+
+
+def test_quote_cache_round_trip(monkeypatch):
+    """Cached FMV results come back intact for the same product fingerprint only."""
+    import asyncio
+    from services.pricing import quote_cache as quote_cache_module
+
+    store = {}
+
+    async def fake_get(key):
+        return store.get(key)
+
+    async def fake_set(key, value, ttl=None):
+        store[key] = json.loads(json.dumps(value))
+        return True
+
+    monkeypatch.setattr(quote_cache_module.redis_cache, "get", fake_get)
+    monkeypatch.setattr(quote_cache_module.redis_cache, "set", fake_set)
+    cache = quote_cache_module.quote_cache
+
+    fmv = fmv_engine.calculate_fmv(
+        marketplace_stats={
+            "count": 30, "median": 118.0, "mean": 121.0, "std_dev": 10.0,
+            "listings": [{"price": 118.0, "title": "AirPods Pro", "condition": "Good",
+                          "sold_date": "2026-02-08T14:30:00Z", "source": "ebay"}]
+        },
+        category="Consumer Electronics",
+        condition="Good"
+    )
+    asyncio.run(cache.set("apple/airpods-pro", "Good", "Consumer Electronics", fmv))
+
+    hit = asyncio.run(cache.get("apple/airpods-pro", "good", "Consumer Electronics"))
+    miss = asyncio.run(cache.get("apple/airpods-pro", "Fair", "Consumer Electronics"))
+
+    assert hit is not None and miss is None
+    cached_fmv, freshness = hit
+    assert cached_fmv == fmv
+    assert freshness["age_seconds"] >= 0
+
+
+def test_offer_reserves_daily_spending(monkeypatch):
+    """Issued offers are reserved against the daily limit; quotes are not."""
+    from services.pricing.spending import spending_ledger
+    from config.settings import settings
+
+    calls = []
+
+    def fake_reserve(keys, args):
+        calls.append((keys, args))
+        return [0, "9990"]  # Over the limit
+
+    def unavailable(keys, args):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(spending_ledger, "_reserve", fake_reserve)
+
+    quote = offer_engine.calculate_offer(fmv=100.0, condition="Good", category="Gaming")
+    issued = offer_engine.calculate_offer(
+        fmv=100.0, condition="Good", category="Gaming", offer_id="offer-1"
+    )
+
+    assert quote["spending"] is None
+    assert len(calls) == 1
+    keys, args = calls[0]
+    assert keys == [
+        "spending:day:" + keys[0][-10:], "spending:amounts:" + keys[0][-10:],
+        "spending:expiries:" + keys[0][-10:], "spending:offer:offer-1"
+    ]
+    now, amount = args[0], args[1]
+    assert amount == issued["offer_amount"]
+    # Unconfirmed reservations expire with the offer
+    assert args[5] == pytest.approx(now + settings.spending_reservation_ttl)
+    assert issued["spending"]["reserved"] is False
+    assert issued["spending"]["remaining"] == 10.0
+
+    # Redis outages don't block quoting
+    monkeypatch.setattr(spending_ledger, "_reserve", unavailable)
+    assert spending_ledger.reserve("offer-2", 50.0)["reserved"] is True
+
+
+def test_inventory_index_feeds_saturation(monkeypatch):
+    """Inventory events update counts; offers for saturated products drop."""
+    from services.cache.redis_client import redis_cache
+    from services.pricing.inventory import InventoryIndex
+
+    class FakeRedis:
+        def __init__(self):
+            self.hash = {}
+
+        def hincrby(self, name, key, amount):
+            self.hash[key] = self.hash.get(key, 0) + amount
+            return self.hash[key]
+
+        def hgetall(self, name):
+            return {key: str(value) for key, value in self.hash.items()}
+
+        def register_script(self, script):
+            def record(keys, args):
+                # Increment and clamp in one step, as the Lua script does
+                field, delta = args
+                self.hash[field] = max(0, self.hash.get(field, 0) + delta)
+                return self.hash[field]
+            return record
+
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_cache, "client", fake)
+
+    index = InventoryIndex()
+    index.record_event("sony/wh-1000xm4", "Consumer Electronics", "acquired", 12)
+    index.record_event("sony/wh-1000xm4", "Consumer Electronics", "sold", 1)
+    assert index.count("sony/wh-1000xm4", "Consumer Electronics") == 11
+    assert index.count("sony/wh-1000xm5", "Consumer Electronics") == 0
+
+    # Never negative, even when sales predate the index
+    assert index.record_event("apple/airpods", "Consumer Electronics", "sold", 3) == 0
+
+    # Another worker's events arrive on sync
+    fake.hincrby(InventoryIndex.REDIS_KEY, "apple/airpods|Consumer Electronics", 2)
+    assert index.sync() == 2
+    assert index.count("apple/airpods", "Consumer Electronics") == 2
+    assert index.category_counts["Consumer Electronics"] == 13
+
+    saturated = offer_engine.calculate_offer(
+        fmv=100.0, condition="Good", category="Consumer Electronics",
+        inventory_count=index.count("sony/wh-1000xm4", "Consumer Electronics")
+    )
+    fresh = offer_engine.calculate_offer(
+        fmv=100.0, condition="Good", category="Consumer Electronics"
+    )
+    assert saturated["offer_amount"] < fresh["offer_amount"]
+
+
+def test_price_trend_snapshot_drives_adjustments(monkeypatch):
+    """Trend state read in one call feeds seasonal and velocity bonuses."""
+    from datetime import datetime, timezone
+    from services.cache.redis_client import redis_cache
+    from services.pricing.trends import PriceTrendTracker
+
+    tracker = PriceTrendTracker()
+    state = {
+        "level": "110.0", "baseline": "100.0", "n": "40",
+        "first_ts": "0", "last_ts": str(200 * 86400),
+        "season:12": "1.2", "season_days:12": "12.5",
+        "season:6": "0.9", "season_days:6": "20",
+        "season:3": "0.9", "season_days:3": "1.5"  # Too little to count
+    }
+    reads = []
+
+    def fake_hgetall(key):
+        reads.append(key)
+        return state
+
+    monkeypatch.setattr(redis_cache.client, "hgetall", fake_hgetall)
+
+    december = tracker.snapshot("nintendo/switch-oled", "good", at=datetime(2026, 12, 1, tzinfo=timezone.utc))
+    march = tracker.snapshot("nintendo/switch-oled", "Good", at=datetime(2026, 3, 1, tzinfo=timezone.utc))
+
+    assert reads == ["trend:nintendo/switch-oled:Good"] * 2
+    assert december["seasonal_index"] == round(1.2 / 1.05, 4)
+    assert march["seasonal_index"] == 1.0
+    # 10% gap across (60 - 7) days of EWMA lag
+    assert december["trend_per_day"] == round(0.1 / 53, 5)
+
+    state["n"] = "2"
+    assert tracker.snapshot("nintendo/switch-oled", "Good") is None
+    # Many observations crammed into a short span don't count either
+    state.update({"n": "40", "last_ts": str(2 * 86400)})
+    assert tracker.snapshot("nintendo/switch-oled", "Good") is None
+    state["last_ts"] = str(200 * 86400)
+
+    boosted = offer_engine.calculate_offer(fmv=100.0, condition="Good", category="Gaming", trend=december)
+    plain = offer_engine.calculate_offer(fmv=100.0, condition="Good", category="Gaming")
+
+    assert boosted["adjustments"]["seasonal_demand"] == 0.1
+    assert boosted["adjustments"]["market_velocity"] == 0.05
+    assert plain["adjustments"]["seasonal_demand"] == 0.0
+    assert boosted["offer_amount"] > plain["offer_amount"]
+
+
+def test_backtest_replays_offer_variants(tmp_path):
+    """Outcomes replay through margin variants with acceptance-adjusted results."""
+    import numpy as np
+    from services.pricing.backtest import BacktestEngine, load_outcomes, margin_grid, run_backtest
+
+    path = tmp_path / "outcomes.csv"
+    rows = ["id,product_identifier,fmv,offer_amount,condition,category,accepted,created_at"]
+    for i in range(200):
+        ratio = 0.3 + (i % 10) * 0.05  # 0.30 .. 0.75 of FMV
+        accepted = "t" if ratio >= 0.5 else "f"
+        rows.append(f"{i},p{i},100.00,{100 * ratio:.2f},good,Gaming,{accepted},2026-01-01")
+    rows.append("x,p,,50.00,Good,Gaming,t,2026-01-01")  # Missing FMV is dropped
+    path.write_text("\n".join(rows) + "\n")
+
+    outcomes = load_outcomes(str(path))
+    assert len(outcomes) == 200
+
+    # Replays match the live engine for the current rules
+    engine = BacktestEngine(outcomes)
+    replayed = offer_engine.calculate_base_offers(
+        outcomes.fmv, outcomes.condition_codes, outcomes.category_codes,
+        outcomes.conditions, outcomes.categories
+    )
+    live = offer_engine.calculate_offer(fmv=100.0, condition="good", category="Gaming")
+    assert np.all(replayed == live["offer_amount"])
+
+    # Acceptance curve is monotone in the offer ratio
+    low, high = engine.acceptance(np.array([0.35, 0.7]), np.array([0, 0]))
+    assert low < high
+
+    report = run_backtest(outcomes, margin_grid("Gaming", 0.40, 0.70, 0.15), workers=1)
+    names = [v["name"] for v in report["variants"]]
+    assert "current" in names and len(names) == 4
+    assert report["historical"]["accepted"] == 120
+
+    by_name = {v["name"]: v for v in report["variants"]}
+    assert by_name["Gaming margin 0.400"]["expected_acceptance_rate"] < \
+        by_name["Gaming margin 0.700"]["expected_acceptance_rate"]
+    margins = [v["expected_margin"] for v in report["variants"]]
+    assert margins == sorted(margins, reverse=True)
+
+
+def test_fmv_range_reflects_price_dispersion():
+    """FMV ranges come from bootstrap intervals, not a fixed ±20% band."""
+    import numpy as np
+    from services.pricing.stats import bootstrap_intervals
+
+    rng = np.random.default_rng(7)
+    tight = rng.normal(100, 2, 300)
+    wide = rng.normal(100, 40, 300).clip(5)
+
+    def stats_for(prices):
+        return {
+            "count": len(prices),
+            "median": float(np.median(prices)),
+            "mean": float(np.mean(prices)),
+            "std_dev": float(np.std(prices)),
+            "listings": [{"price": float(p), "title": "Item", "condition": "Good"} for p in prices]
+        }
+
+    tight_fmv = fmv_engine.calculate_fmv(stats_for(tight), "Gaming", "Good")
+    wide_fmv = fmv_engine.calculate_fmv(stats_for(wide), "Gaming", "Good")
+
+    tight_width = tight_fmv.range["high"] - tight_fmv.range["low"]
+    wide_width = wide_fmv.range["high"] - wide_fmv.range["low"]
+    assert tight_fmv.range["low"] <= tight_fmv.fmv <= tight_fmv.range["high"]
+    assert tight_width < 0.05 * tight_fmv.fmv < wide_width
+
+    # Intervals cached with the stats are used as-is
+    cached = {**stats_for(tight), "median_ci": [99.0, 101.0], "mean_ci": [98.0, 102.0]}
+    assert fmv_engine.calculate_fmv(cached, "Gaming", "Good").range["low"] < 99.0
+
+    # Too few listings: fixed band
+    sparse = fmv_engine.calculate_fmv(stats_for(tight[:3]), "Gaming", "Good")
+    assert abs(sparse.range["high"] - sparse.fmv * 1.2) < 0.02
+
+    # Weighted means shift toward the heavily weighted prices
+    intervals = bootstrap_intervals(
+        np.array([10.0] * 10 + [20.0] * 10),
+        weights=np.array([1.0] * 10 + [9.0] * 10),
+        rng=np.random.default_rng(0)
+    )
+    assert intervals["mean"][0] > 15.0
+
+
+def test_fmv_fuses_sources_with_contributions():
+    """Per-source stats are fused; missing or thin sources degrade gracefully."""
+    from services.pricing.fusion import source_fusion
+
+    sources = {
+        "ebay": {"count": 40, "median": 100.0, "mean": 100.0, "std_dev": 10.0},
+        "facebook": {"count": 10, "median": 80.0, "mean": 80.0, "std_dev": 30.0},
+        "amazon": {"count": 1, "median": 500.0, "mean": 500.0, "std_dev": 0.0}  # Too thin
+    }
+
+    configured = source_fusion.fuse(sources, method="configured")
+    assert set(configured["contributions"]) == {"ebay_sold", "other_sold"}
+    # 0.55 : 0.10 renormalized
+    assert abs(configured["fmv"] - (100 * 0.55 + 80 * 0.10) / 0.65) < 1e-9
+    assert abs(sum(c["weight"] for c in configured["contributions"].values()) - 1.0) < 1e-3
+
+    # Inverse variance trusts the deep, tight source even more
+    fused = source_fusion.fuse(sources, method="inverse_variance")
+    assert fused["contributions"]["ebay_sold"]["weight"] > configured["contributions"]["ebay_sold"]["weight"]
+
+    # Only thin data: the deepest source alone
+    thin = source_fusion.fuse({"amazon": sources["amazon"]}, method="configured")
+    assert thin["fmv"] == 500.0
+
+    # Stats without per-source data price exactly as before (eBay only)
+    legacy = fmv_engine.calculate_fmv(
+        {"count": 20, "median": 100.0, "mean": 111.0, "std_dev": 10.0, "listings": []},
+        "Gaming", "Good"
+    )
+    assert legacy.fmv == round(100.0 * 0.45 / 0.55 + 111.0 * 0.10 / 0.55, 2)
+    assert legacy.sources["ebay_sold"]["weight"] == 1.0
+
+    multi = fmv_engine.calculate_fmv(
+        {"count": 50, "median": 96.0, "mean": 96.0, "std_dev": 15.0, "listings": [], "sources": sources},
+        "Gaming", "Good"
+    )
+    assert multi.fmv == round(configured["fmv"], 2)
+    assert set(multi.sources) == {"ebay_sold", "other_sold"}
+
+
+def test_aggregator_source_stats_in_one_pass():
+    """Aggregator stats carry per-source stats for fusion."""
+    from services.marketplace.aggregator import marketplace_aggregator
+    from services.marketplace.models import MarketplaceListing
+
+    listings = [
+        MarketplaceListing(title=f"Item {i}", price=price, source=source, condition="Used")
+        for i, (price, source) in enumerate(
+            [(100, "ebay"), (110, "ebay"), (120, "ebay"), (60, "facebook"), (80, "facebook")]
+        )
+    ]
+    stats = marketplace_aggregator._compute_statistics(listings, weights=[1.0] * 5)
+
+    assert stats.sources["ebay"]["count"] == 3
+    assert stats.sources["ebay"]["median"] == 110.0
+    assert stats.sources["facebook"]["mean"] == 70.0
+    assert abs(stats.sources["facebook"]["std_dev"] - 10.0) < 1e-9
+
+
+def test_pricing_rules_compile_and_hot_swap(tmp_path, monkeypatch):
+    """One rules file feeds offers, vision and confidence; new versions swap in."""
+    import os
+    from services.cache.redis_client import redis_cache
+    from services.pricing.rules import DEFAULT_RULES_PATH, PricingRules
+
+    with open(DEFAULT_RULES_PATH) as f:
+        document = json.load(f)
+
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(document))
+    monkeypatch.setattr(redis_cache.client, "get", lambda key: None)
+
+    rules = PricingRules(str(path))
+    compiled = rules.current
+    assert compiled.margin("Books & Media") == 0.35
+    assert compiled.margin("Not A Category") == 0.50
+    assert compiled.condition_multiplier("like new") == 0.925
+    assert compiled.assessed_multiplier("Books & Media", "Good") == 0.85
+    assert compiled.assessed_multiplier("Gaming", "Good") == 0.80
+
+    # Batch lookups are array indexing over codes
+    codes = compiled.category_codes_for(["Gaming", "Books & Media", "???"])
+    assert compiled.margins[codes].tolist() == [0.60, 0.35, 0.50]
+
+    # Broken documents never replace working rules
+    path.write_text(json.dumps({**document, "version": 2, "category_margins": {"Gaming": 3.0}}))
+    os.utime(path, (1, 1))
+    assert rules.check_for_updates() is False
+    assert rules.current is compiled
+
+    # Malformed sections are rejected, not raised out of the reload loop
+    path.write_text(json.dumps({**document, "version": 2, "category_condition_multipliers": {"Gaming": 0.8}}))
+    os.utime(path, (2, 2))
+    assert rules.check_for_updates() is False
+    assert rules.current is compiled
+
+    # An edit that keeps the version is ignored (and warned about)
+    path.write_text(json.dumps({**document, "category_margins": {**document["category_margins"], "Gaming": 0.1}}))
+    os.utime(path, (3, 3))
+    assert rules.check_for_updates() is False
+    assert rules.current.margin("Gaming") == 0.60
+
+    # A newer version from Redis swaps in atomically
+    newer = json.loads(json.dumps(document))
+    newer["version"] = 3
+    newer["category_margins"]["Gaming"] = 0.55
+    monkeypatch.setattr(redis_cache.client, "get", lambda key: json.dumps(newer))
+    assert rules.check_for_updates() is True
+    assert rules.current.version == 3
+    assert rules.current.margin("Gaming") == 0.55
+    assert compiled.margin("Gaming") == 0.60  # Old snapshot untouched
+
+    # Quotes report the rules they were priced with
+    offer = offer_engine.calculate_offer(fmv=100.0, condition="Good", category="Gaming")
+    assert offer["base_calculation"]["rules_version"] == 1
+
+
+def test_benchmark_suite_and_regression_gate(tmp_path):
+    """Benchmarks run at small scale; compare fails only on real slowdowns."""
+    from services.pricing import benchmark
+
+    results = benchmark.run_benchmarks(scales=(10,), repeats=1)
+    assert set(results["results"]) == {f"{name}/10" for name in benchmark.BENCHMARKS}
+    assert all(r["seconds"] > 0 for r in results["results"].values())
+
+    # Generators are seeded: same data every run
+    assert benchmark.synthetic_listings(5) == benchmark.synthetic_listings(5)
+
+    def document(**seconds):
+        return {
+            "version": benchmark.BASELINE_VERSION,
+            "results": {key.replace("_10", "/10"): {"seconds": s} for key, s in seconds.items()}
+        }
+
+    baseline = document(fmv_10=0.100, offer_10=0.100, tiny_10=0.0001)
+    current = document(fmv_10=0.120, offer_10=0.150, tiny_10=0.0005)
+    report = benchmark.compare(baseline, current, threshold=0.25)
+    assert report["passed"] is False
+    # +20% is within threshold; 5x on a sub-millisecond run is noise
+    assert report["regressions"] == ["offer/10"]
+
+    baseline_path = tmp_path / "baseline.json"
+    current_path = tmp_path / "current.json"
+    baseline_path.write_text(json.dumps(baseline))
+    current_path.write_text(json.dumps(current))
+    assert benchmark.main(["compare", str(baseline_path), str(current_path)]) == 1
+    assert benchmark.main(["compare", str(baseline_path), str(current_path), "--threshold", "0.6"]) == 0